@@ -0,0 +1,308 @@
+"""
+Static asset pipeline.
+
+Minifies and bundles the stylesheets and scripts under static/ into
+content-hashed files in static/dist/, and writes a manifest mapping
+logical names to hashed URLs. Templates call `asset_tags('base.css')` or
+`asset_url('js/voice-assistant.js')`; fingerprinted files are served with
+`Cache-Control: immutable`, so repeat visits never revalidate them and a
+deploy changes the URL instead of relying on expiry. The same manifest
+versions the service worker's precached app shell, served from /sw.js.
+
+Runs at app import (once in the gunicorn master with preload_app) or
+ahead of time with `python asset_pipeline.py`.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Bundles loaded on every page from base.html; order matters for the cascade
+BUNDLES = {
+    'base.css': [
+        'css/styles.css',
+        'css/farmer-ui-enhanced.css',
+        'css/dashboard-enhancements.css',
+        'css/index-enhancements.css',
+        'css/scanner-enhancements.css',
+    ],
+    'base.js': [
+        'js/app.js',
+        'js/multilingual.js',
+        'js/farmer-ui-enhanced.js',
+    ],
+}
+
+# The service worker must keep a stable URL and scope
+UNHASHED = {'js/sw.js'}
+
+# Unhashed files the offline shell needs besides the bundles
+SHELL_STATIC = ['manifest.json', 'icons/icon-192.png', 'icons/icon-512.png']
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)', re.S)
+# Whole @import rules; the URL may itself contain ';' (Google Fonts: wght@300;400)
+_CSS_IMPORT = re.compile(r'@import\s+(?:url\(\s*(?:([\'"]).*?\1|[^)]*?)\s*\)|([\'"]).*?\2)[^;]*;')
+
+_manifest = None
+_service_worker = None
+
+
+def minify_css(source):
+    """Drop comments and redundant whitespace, leaving quoted strings untouched"""
+    out = []
+    pos = 0
+    for match in _CSS_TOKENS.finditer(source):
+        out.append(_squeeze_css(source[pos:match.start()]))
+        if match.group(1):
+            out.append(match.group(1))
+        pos = match.end()
+    out.append(_squeeze_css(source[pos:]))
+    return ''.join(out).strip()
+
+
+def _squeeze_css(chunk):
+    chunk = re.sub(r'\s+', ' ', chunk)
+    return re.sub(r'\s*([{};,])\s*', r'\1', chunk)
+
+
+def minify_js(source):
+    """Conservative JS minification: strip indentation and blank lines only
+
+    Lines inside multi-line template literals are kept exactly as written,
+    since their whitespace is part of the string.
+    """
+    out = []
+    in_template = False
+    in_comment = False
+    for line in source.splitlines():
+        starts_in_template = in_template
+        in_template, in_comment = _scan_js_line(line, in_template, in_comment)
+        if starts_in_template or in_template:
+            if not starts_in_template:
+                line = line.lstrip()
+            if not in_template:
+                line = line.rstrip()
+            out.append(line)
+        elif line.strip():
+            out.append(line.strip())
+    return '\n'.join(out) + '\n'
+
+
+def _scan_js_line(line, in_template, in_comment):
+    """Track template literal and block comment state across one line"""
+    quote = None
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if in_comment:
+            if line.startswith('*/', i):
+                in_comment = False
+                i += 1
+        elif in_template or quote:
+            if char == '\\':
+                i += 1
+            elif in_template and char == '`':
+                in_template = False
+            elif quote and char == quote:
+                quote = None
+        elif char == '`':
+            in_template = True
+        elif char in '\'"':
+            quote = char
+        elif line.startswith('//', i):
+            break
+        elif line.startswith('/*', i):
+            in_comment = True
+            i += 1
+        i += 1
+    return in_template, in_comment
+
+
+def _read(relative_path):
+    with open(os.path.join(STATIC_DIR, relative_path), encoding='utf-8') as f:
+        return f.read()
+
+
+def _minify(relative_path, source):
+    if relative_path.endswith('.css'):
+        return minify_css(source)
+    if relative_path.endswith('.js'):
+        return minify_js(source)
+    return source
+
+
+def _bundle_css(sources):
+    # @import is only valid at the top of a stylesheet, so hoist them out of each part
+    imports = []
+    bodies = []
+    for source in sources:
+        for match in _CSS_IMPORT.finditer(source):
+            rule = match.group(0)
+            if rule not in imports:
+                imports.append(rule)
+        bodies.append(_CSS_IMPORT.sub('', source))
+    return ''.join(imports) + '\n'.join(bodies)
+
+
+def _write_hashed(logical_name, content):
+    data = content.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(logical_name)
+    hashed_name = f"{stem}.{digest}{ext}"
+    target = os.path.join(DIST_DIR, hashed_name)
+
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Atomic write: several workers may build at the same time without preload
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+    return f"dist/{hashed_name}", digest, len(data)
+
+
+def build_assets():
+    """Build every bundle and fingerprinted file; returns the manifest"""
+    manifest = {'files': {}, 'bundles': {}}
+    os.makedirs(DIST_DIR, exist_ok=True)
+
+    for folder in ('css', 'js'):
+        for filename in sorted(os.listdir(os.path.join(STATIC_DIR, folder))):
+            relative_path = f"{folder}/{filename}"
+            if relative_path in UNHASHED or not filename.endswith(('.css', '.js')):
+                continue
+            path, digest, size = _write_hashed(relative_path, _minify(relative_path, _read(relative_path)))
+            manifest['files'][relative_path] = {'path': path, 'hash': digest, 'bytes': size}
+
+    for bundle_name, members in BUNDLES.items():
+        sources = [_minify(member, _read(member)) for member in members]
+        content = _bundle_css(sources) if bundle_name.endswith('.css') else ';\n'.join(sources)
+        path, digest, size = _write_hashed(bundle_name, content)
+        manifest['bundles'][bundle_name] = {'path': path, 'hash': digest, 'bytes': size, 'members': members}
+
+    fd, tmp_path = tempfile.mkstemp(dir=DIST_DIR)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+    # Drop fingerprints left over from previous builds
+    current = {entry['path'] for section in manifest.values() for entry in section.values()}
+    for root, _, filenames in os.walk(DIST_DIR):
+        for filename in filenames:
+            path = os.path.relpath(os.path.join(root, filename), STATIC_DIR).replace(os.sep, '/')
+            if path.startswith('dist/') and path not in current and filename != 'manifest.json':
+                try:
+                    os.remove(os.path.join(root, filename))
+                except OSError:
+                    pass
+    return manifest
+
+
+def load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {'files': {}, 'bundles': {}}
+    return _manifest
+
+
+def asset_url(relative_path):
+    """Fingerprinted URL for a static file, falling back to the plain static URL"""
+    from flask import url_for
+
+    entry = load_manifest()['files'].get(relative_path)
+    return url_for('static', filename=entry['path'] if entry else relative_path)
+
+
+def asset_tags(bundle_name):
+    """<link>/<script> tags for a bundle, or one tag per member if it was not built"""
+    from flask import url_for
+    from markupsafe import Markup, escape
+
+    bundle = load_manifest()['bundles'].get(bundle_name)
+    urls = ([url_for('static', filename=bundle['path'])] if bundle
+            else [url_for('static', filename=member) for member in BUNDLES[bundle_name]])
+
+    if bundle_name.endswith('.css'):
+        tags = [f'<link rel="stylesheet" href="{escape(url)}">' for url in urls]
+    else:
+        tags = [f'<script src="{escape(url)}"></script>' for url in urls]
+    return Markup('\n    '.join(tags))
+
+
+def precache_manifest():
+    """Shell URLs for the service worker plus a version that changes with any of them"""
+    from flask import url_for
+
+    manifest = load_manifest()
+    urls = [url_for('offline')]
+    for bundle_name, members in BUNDLES.items():
+        bundle = manifest['bundles'].get(bundle_name)
+        urls += [url_for('static', filename=bundle['path'])] if bundle else [
+            url_for('static', filename=member) for member in members
+        ]
+    urls += [url_for('static', filename=path) for path in SHELL_STATIC]
+
+    digest = hashlib.sha256(json.dumps(urls).encode())
+    shell_files = [os.path.join(STATIC_DIR, path) for path in SHELL_STATIC + ['js/sw.js']]
+    shell_files.append(os.path.join(os.path.dirname(STATIC_DIR), 'templates', 'offline.html'))
+    for path in shell_files:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+    return {
+        'version': digest.hexdigest()[:12],
+        'urls': urls,
+        'offline': url_for('offline'),
+        'snapshot': url_for('dashboard_snapshot'),
+    }
+
+
+def service_worker():
+    """/sw.js: the worker script with the precache manifest inlined, served at root scope"""
+    global _service_worker
+    from flask import Response
+
+    if _service_worker is None:
+        _service_worker = f"self.__PRECACHE__ = {json.dumps(precache_manifest())};\n" + _read('js/sw.js')
+
+    response = Response(_service_worker, mimetype='application/javascript')
+    # Browsers must see a new manifest as soon as a deploy changes it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def add_immutable_headers(response):
+    from flask import request
+
+    if request.path.startswith('/static/dist/') and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def init_app(app):
+    global _manifest
+    if os.environ.get('ASSET_PIPELINE', 'true').lower() == 'true':
+        try:
+            _manifest = build_assets()
+        except Exception as e:
+            print(f"Asset build failed, serving unbundled files: {e}")
+    app.jinja_env.globals.update(asset_url=asset_url, asset_tags=asset_tags)
+    app.add_url_rule('/sw.js', 'service_worker', service_worker)
+    app.after_request(add_immutable_headers)
+
+
+if __name__ == '__main__':
+    built = build_assets()
+    for name, entry in {**built['bundles'], **built['files']}.items():
+        print(f"{entry['bytes']:>8}  {name} -> {entry['path']}")
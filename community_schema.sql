@@ -87,4 +87,46 @@ CREATE POLICY "Users can insert replies" ON community_replies FOR INSERT WITH CH
 CREATE POLICY "Users can update their own replies" ON community_replies FOR UPDATE USING (true);
 
 CREATE POLICY "Anyone can view votes" ON community_votes FOR SELECT USING (true);
-CREATE POLICY "Users can manage their own votes" ON community_votes FOR ALL USING (true);
\ No newline at end of file
+CREATE POLICY "Users can manage their own votes" ON community_votes FOR ALL USING (true);
+
+-- Full-text search (used when COMMUNITY_SEARCH_BACKEND=postgres)
+-- The 'simple' configuration keeps Devanagari words intact; there is no Hindi stemmer in core Postgres
+ALTER TABLE community_posts ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(content, '')), 'B')
+    ) STORED;
+
+CREATE INDEX idx_community_posts_search ON community_posts USING GIN(search_vector);
+
+CREATE OR REPLACE FUNCTION search_community_posts(
+    search_query TEXT,
+    search_category TEXT DEFAULT NULL,
+    result_limit INTEGER DEFAULT 20,
+    after_rank DOUBLE PRECISION DEFAULT NULL,
+    after_id TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID, farmer_id UUID, title VARCHAR, content TEXT, category VARCHAR, tags TEXT[],
+    is_question BOOLEAN, is_solved BOOLEAN, upvotes INTEGER, downvotes INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE, search_score DOUBLE PRECISION
+) AS $$
+    WITH ranked AS (
+        SELECT p.*, round(ts_rank_cd(p.search_vector, q)::numeric, 6)::double precision AS search_score
+        FROM community_posts p, plainto_tsquery('simple', search_query) q
+        WHERE p.search_vector @@ q
+          AND (search_category IS NULL OR p.category = search_category)
+    )
+    SELECT id, farmer_id, title, content, category, tags, is_question, is_solved,
+           upvotes, downvotes, created_at, search_score
+    FROM ranked
+    WHERE after_rank IS NULL
+       OR search_score < after_rank
+       OR (search_score = after_rank AND id::text > after_id)
+    ORDER BY search_score DESC, id::text ASC
+    LIMIT result_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Keyset pagination on (created_at, id) for the community feed
+CREATE INDEX idx_community_posts_created_id ON community_posts(created_at DESC, id DESC);
+CREATE INDEX idx_community_posts_category_created_id ON community_posts(category, created_at DESC, id DESC);
@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 import os
 import json
+import re
 from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
 from werkzeug.utils import secure_filename
-from PIL import Image
 from dotenv import load_dotenv
 from translations import get_text, get_available_languages
+import response_optimizer
+import asset_pipeline
+from response_optimizer import conditional
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +19,34 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "krishi-sahayak-secret-key")
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+# Public origin for links printed into QR codes and certificates; never taken from the Host header
+app.config['BASE_URL'] = os.environ.get('BASE_URL', 'http://localhost:8000').rstrip('/')
+response_optimizer.init_app(app)
+asset_pipeline.init_app(app)
+
+# Persist compiled templates so recycled workers skip Jinja compilation
+from jinja2 import FileSystemBytecodeCache
+import tempfile
+from services.app_data import private_dir
+
+# Jinja loads the cached bytecode with marshal, so a directory another
+# local user could plant files in would let them run code in the app
+jinja_cache_dir = private_dir(os.environ.get('JINJA_CACHE_DIR') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), f'krishi-jinja-cache-{os.getuid()}'
+))
+# Without a safe directory, Jinja's default private temp directory does its own checks
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+
+def precompile_templates():
+    """Compile every template into the in-memory and bytecode caches"""
+    compiled = 0
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        try:
+            app.jinja_env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            print(f"Template precompile failed for {name}: {e}")
+    return compiled
 
 # Language support
 @app.context_processor
@@ -27,17 +58,35 @@ def inject_language():
         'available_languages': get_available_languages()
     }
 
-# Import services
-from services.weather_service import get_weather_data, get_weather_by_coordinates, get_weather_by_current_location
-from services.ai_service import analyze_plant_image
-from services.market_service import get_market_prices
-from services.alert_service import check_price_alerts, get_demo_alerts, create_alert_summary
-from services.market_guru import get_ai_market_prediction, get_market_insights
-from services.community_service import community_service
-from services.resource_optimizer import resource_optimizer
-from services.satellite_service import satellite_service
-from services.seed_calculator import seed_calculator
+# Services are imported on first use; see services/registry.py
+from services.registry import registry, lazy_import
+get_weather_data = lazy_import('services.weather_service', 'get_weather_data')
+get_weather_by_coordinates = lazy_import('services.weather_service', 'get_weather_by_coordinates')
+get_weather_by_current_location = lazy_import('services.weather_service', 'get_weather_by_current_location')
+analyze_plant_image = lazy_import('services.ai_service', 'analyze_plant_image')
+get_market_prices = lazy_import('services.market_service', 'get_market_prices')
+check_price_alerts = lazy_import('services.alert_service', 'check_price_alerts')
+get_demo_alerts = lazy_import('services.alert_service', 'get_demo_alerts')
+create_alert_summary = lazy_import('services.alert_service', 'create_alert_summary')
+get_ai_market_prediction = lazy_import('services.market_guru', 'get_ai_market_prediction')
+get_market_insights = lazy_import('services.market_guru', 'get_market_insights')
+community_service = lazy_import('services.community_service', 'community_service')
+resource_optimizer = lazy_import('services.resource_optimizer', 'resource_optimizer')
+satellite_service = lazy_import('services.satellite_service', 'satellite_service')
+seed_calculator = lazy_import('services.seed_calculator', 'seed_calculator')
+lazy_import('services.blockchain.working_passport_service', 'working_passport_service')
+lazy_import('services.pdf_certificate', 'generate_certificate_pdf')
+lazy_import('services.qr_service', 'generate_qr_code')
 from datetime import datetime
+
+# Warm-up runs in the gunicorn master when preload_app is on, so workers fork with templates compiled
+if os.environ.get('PRECOMPILE_TEMPLATES', 'true').lower() == 'true':
+    registry.add_warmup(precompile_templates)
+
+@registry.add_warmup
+def prime_community_categories():
+    """Load the long-lived community category cache during warm-up"""
+    community_service.get_categories()
 import dateutil.parser
 import requests
 
@@ -123,11 +172,15 @@ class UserWrapper:
             return self._original.get_crops()
         return []
 
+def public_url(path):
+    """Absolute URL under the configured BASE_URL"""
+    return f"{app.config['BASE_URL']}/{path.lstrip('/')}"
+
 def get_supabase_farmer(user_id):
-    """Get farmer from Supabase by ID"""
+    """Get farmer (with crops) by ID from the process profile cache"""
     try:
         from supabase_models.farmer import Farmer
-        farmer = Farmer.get_by_id(user_id)
+        farmer = Farmer.get_profile(user_id)
         return UserWrapper(farmer) if farmer else None
     except Exception as e:
         print(f"Supabase error: {e}")
@@ -305,6 +358,12 @@ def dashboard():
         flash('Profile not found. Please complete setup.', 'error')
         return redirect(url_for('profile'))
     
+    data = build_dashboard_data(farmer, session['user_id'])
+    # Embedded for the service worker's offline copy, so it never fetches the data a second time
+    return render_template('dashboard.html', user=farmer, snapshot=dashboard_snapshot_data(farmer, data), **data)
+
+def build_dashboard_data(farmer, user_id):
+    """Weather, market and alert data shown on the dashboard"""
     # Always use farmer's pincode for weather - no fallback to current location
     pincode = getattr(farmer, 'pincode', None) or '110001'
     weather_data = get_weather_data(pincode)
@@ -336,13 +395,51 @@ def dashboard():
     market_data = get_market_prices(unique_crops[:10])
     
     # Get price alerts for user's crops
-    alerts = check_price_alerts(crop_names, session['user_id'])
+    alerts = check_price_alerts(crop_names, user_id)
     alert_summary = create_alert_summary(alerts)
     
     # Get AI market predictions
     market_insights = get_market_insights(crop_names)
     
-    return render_template('dashboard.html', user=farmer, weather=weather_data, market_data=market_data, alerts=alerts, alert_summary=alert_summary, market_insights=market_insights)
+    return {
+        'weather': weather_data,
+        'market_data': market_data,
+        'alerts': alerts,
+        'alert_summary': alert_summary,
+        'market_insights': market_insights,
+    }
+
+def dashboard_snapshot_data(farmer, data):
+    """The /api/dashboard document for data from build_dashboard_data"""
+    return {
+        'success': True,
+        'farmer': {
+            'name': getattr(farmer, 'name', None),
+            'location': getattr(farmer, 'location', None),
+            'pincode': getattr(farmer, 'pincode', None),
+        },
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        **data
+    }
+
+@app.route('/api/dashboard')
+def dashboard_snapshot():
+    """Dashboard data as JSON; the service worker keeps the last copy for offline use"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+
+    farmer = get_supabase_farmer(session['user_id'])
+    if not farmer:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+
+    response = jsonify(dashboard_snapshot_data(farmer, build_dashboard_data(farmer, session['user_id'])))
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+@app.route('/offline')
+def offline():
+    """App shell precached by the service worker; renders the last dashboard snapshot"""
+    return render_template('offline.html')
 
 @app.route('/scanner', methods=['GET', 'POST'])
 def scanner():
@@ -370,6 +467,7 @@ def scanner():
         file.save(filepath)
         
         try:
+            from PIL import Image
             with Image.open(filepath) as img:
                 if img.mode != 'RGB':
                     img = img.convert('RGB')
@@ -568,8 +666,13 @@ def passport():
     from services.blockchain.working_passport_service import working_passport_service as passport_service
     blockchain_status = passport_service.get_blockchain_status()
     
-    passports_result = passport_service.get_user_passports(session['user_id'])
+    cursor = request.args.get('cursor')
+    passports_result = passport_service.get_user_passports(session['user_id'], cursor=cursor)
     passports = passports_result.get('passports', []) if passports_result['success'] else []
+    next_cursor = passports_result.get('next_cursor') if passports_result['success'] else None
+    # The heading shows every passport, not the size of this page
+    from supabase_models.digital_passport import DigitalPassport
+    passport_total = DigitalPassport.count_by_farmer_id(session['user_id'])
     
     print(f"DEBUG: Found {len(passports)} passports for user {session['user_id']}")
     for i, p in enumerate(passports):
@@ -585,8 +688,39 @@ def passport():
                          user_crops=crop_names, 
                          passports=passports,
                          blockchain_status=blockchain_status,
+                         cursor=cursor,
+                         next_cursor=next_cursor,
+                         passport_total=passport_total,
                          cache_buster=cache_buster)
 
+@app.route('/api/passports')
+@conditional
+def list_passports():
+    """JSON list of the user's passports with cursor pagination"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    from services.blockchain.working_passport_service import working_passport_service as passport_service
+    
+    limit = min(request.args.get('limit', 12, type=int), 50)
+    result = passport_service.get_user_passports(session['user_id'], limit=limit, cursor=request.args.get('cursor'))
+    if not result['success']:
+        return jsonify(result), 500
+    
+    return jsonify({
+        'success': True,
+        'passports': [{
+            'id': p.id,
+            'crop_type': p.crop_type,
+            'season': p.season,
+            'nft_token_id': p.nft_token_id,
+            'ipfs_hash': p.ipfs_hash,
+            'verified': p.verified,
+            'created_at': p.created_at.isoformat() if hasattr(p.created_at, 'isoformat') else p.created_at
+        } for p in result['passports']],
+        'next_cursor': result['next_cursor']
+    })
+
 @app.route('/logout')
 def logout():
     session.clear()
@@ -595,54 +729,17 @@ def logout():
 
 @app.route('/qr/<token_id>')
 def generate_qr(token_id):
-    """Generate QR code with comprehensive farmer and crop data"""
+    """QR code for a passport's certificate, as an image URL"""
     try:
-        from services.qr_service import generate_qr_code
         from supabase_models.digital_passport import DigitalPassport
         
-        # Get passport details
-        passport = DigitalPassport.get_by_token_id(token_id)
+        # Get passport details (shared with verify scans through the cache)
+        passport = DigitalPassport.get_cached_by_token_id(token_id)
         if not passport:
             return jsonify({'error': 'Passport not found'}), 404
         
-        # Get farmer details
-        farmer = get_supabase_farmer(passport.farmer_id)
-        if not farmer:
-            return jsonify({'error': 'Farmer not found'}), 404
-        
-        # Create comprehensive data for QR code
-        qr_data_content = {
-            'passport_id': token_id,
-            'farmer': {
-                'name': farmer.name,
-                'location': farmer.place,
-                'district': getattr(farmer, 'district', ''),
-                'state': getattr(farmer, 'state', ''),
-                'pincode': farmer.pincode,
-                'phone': farmer.phone,
-                'experience': getattr(farmer, 'farming_experience_years', 0)
-            },
-            'crop': {
-                'type': passport.crop_type,
-                'season': passport.season,
-                'harvest_date': str(passport.created_at) if passport.created_at else '',
-                'area': getattr(passport, 'area', 'N/A'),
-                'practices': 'Organic, Sustainable'
-            },
-            'verification': {
-                'blockchain': 'MONAD Testnet',
-                'ipfs_hash': passport.ipfs_hash,
-                'verified': True,
-                'verify_url': f"{request.host_url}verify/{token_id}"
-            }
-        }
-        
-        # Create QR code that links directly to PDF certificate
-        certificate_url = f"{request.host_url}certificate/{token_id}"
-        qr_image = generate_qr_code(certificate_url)
-        
         return jsonify({
-            'qr_code': qr_image,
+            'qr_code_url': url_for('qr_image', token_id=token_id, fmt='png'),
             'certificate_url': f"/certificate/{token_id}"
         })
         
@@ -650,20 +747,58 @@ def generate_qr(token_id):
         app.logger.error(f"Error generating QR code: {str(e)}")
         return jsonify({'error': f'Failed to generate QR code: {str(e)}'}), 500
 
+@app.route('/qr/<token_id>.<any(png, svg):fmt>')
+def qr_image(token_id, fmt):
+    """QR code image linking to the verify page, rendered once and cached"""
+    from services.qr_service import cached_qr_file, get_qr_image, MIMETYPES
+    from services import passport_claims
+    from flask import send_file, abort
+    
+    if not re.match(r'^[A-Za-z0-9_-]{1,64}$', token_id):
+        abort(404)
+    size = request.args.get('size', 10, type=int)
+    if not 1 <= size <= 20:
+        abort(400)
+    
+    # Fixed origin: a client-supplied Host header must not mint new cache entries.
+    # Scans land on /verify, which checks a signed claim without any lookup
+    verify_url = public_url(f"verify/{token_id}")
+    # Signed renders are filed under the plain URL and key, so a cached one
+    # needs no lookup either (the claim only holds fields fixed at issue)
+    key_id = passport_claims.key_id()
+    name = f"{verify_url}|{key_id}" if key_id else None
+    path = cached_qr_file(verify_url, size, fmt=fmt, name=name)
+    if not path:
+        from supabase_models.digital_passport import DigitalPassport
+        passport = DigitalPassport.get_cached_by_token_id(token_id)
+        if not passport:
+            abort(404)
+        data = verify_url
+        if key_id:
+            farmer = get_supabase_farmer(passport.farmer_id)
+            data = passport_claims.signed_url(verify_url, passport, getattr(farmer, 'name', ''))
+        # Not minted yet means not signed yet: keep looking it up until it is
+        _, path = get_qr_image(data, size, fmt=fmt, name=name if data != verify_url else None)
+    
+    response = send_file(path, mimetype=MIMETYPES[fmt], etag=os.path.basename(path)[:32],
+                         conditional=True, max_age=86400)
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
 @app.route('/verify/<token_id>')
 def verify_passport(token_id):
     """Public verification page for passports"""
-    from services.blockchain.working_passport_service import working_passport_service
+    from services import passport_claims
     
-    result = working_passport_service.verify_passport(token_id)
+    # A QR with a valid signed claim is verified from the URL alone, no database access
+    claim = passport_claims.verify_claim(request.args.get('c'), token_id)
+    if claim:
+        return render_template('verify.html', passport=passport_claims.claim_passport(claim), signed_claim=True)
     
-    if result['success']:
-        # Get passport details from database
-        from supabase_models.digital_passport import DigitalPassport
-        passport = DigitalPassport.get_by_token_id(token_id)
-        return render_template('verify.html', passport=passport)
-    else:
-        return render_template('verify.html', passport=None)
+    # Otherwise one lookup, shared with other scans of the same passport through the cache
+    from supabase_models.digital_passport import DigitalPassport
+    passport = DigitalPassport.get_cached_by_token_id(token_id)
+    return render_template('verify.html', passport=passport, signed_claim=False)
 
 @app.route('/qr-data/<token_id>')
 def show_qr_data(token_id):
@@ -980,6 +1115,7 @@ def get_crop_prediction(crop_name):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/market-insights')
+@conditional
 def get_user_market_insights():
     """Get market insights for user's crops"""
     if 'user_id' not in session:
@@ -1006,6 +1142,15 @@ def get_user_market_insights():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/internal/db-stats')
+def db_stats():
+    """Supabase query counts and latencies per table and route (enable with ENABLE_DB_STATS)"""
+    if os.getenv('ENABLE_DB_STATS', 'false').lower() != 'true':
+        return jsonify({'error': 'Not found'}), 404
+    
+    from config.database import get_query_stats
+    return jsonify(get_query_stats())
+
 # Community Chat Routes
 @app.route('/community')
 def community():
@@ -1022,19 +1167,28 @@ def community():
     categories_result = community_service.get_categories()
     categories = categories_result.get('categories', []) if categories_result['success'] else []
     
-    # Get recent posts
+    # Get recent posts (with farmer info) from the feed cache
     category = request.args.get('category', 'all')
-    posts_result = community_service.get_posts(category=category, limit=10)
+    cursor = request.args.get('cursor')
+    posts_result = community_service.get_feed_page(category=category, cursor=cursor, per_page=10)
     posts = posts_result.get('posts', []) if posts_result['success'] else []
+    next_cursor = posts_result.get('next_cursor') if posts_result['success'] else None
     
-    # Add farmer info to posts
-    for post in posts:
-        farmer_info = community_service.get_farmer_info(post['farmer_id'])
-        post['farmer_name'] = farmer_info['name']
-        post['farmer_place'] = farmer_info['place']
-        post['is_ai'] = farmer_info['is_ai']
+    return render_template('community.html', posts=posts, categories=categories, current_category=category,
+                           cursor=cursor, next_cursor=next_cursor)
+
+@app.route('/api/community/posts')
+@conditional
+def list_community_posts():
+    """JSON feed of community posts with cursor pagination"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
     
-    return render_template('community.html', posts=posts, categories=categories, current_category=category)
+    category = request.args.get('category', 'all')
+    result = community_service.get_feed_page(category=category, cursor=request.args.get('cursor'), per_page=10)
+    result.pop('cached', None)  # keep the body (and its ETag) stable across cache hits
+    
+    return jsonify(result)
 
 @app.route('/community/post/<post_id>')
 def community_post(post_id):
@@ -1068,7 +1222,20 @@ def community_post(post_id):
         reply['farmer_place'] = farmer_info['place']
         reply['is_ai'] = farmer_info['is_ai']
     
-    return render_template('community_post.html', post=post, replies=replies)
+    awaiting_ai_reply = bool(post.get('is_question')) and not any(r.get('is_ai_response') for r in replies)
+    
+    return render_template('community_post.html', post=post, replies=replies, awaiting_ai_reply=awaiting_ai_reply)
+
+@app.route('/api/community/post/<post_id>/ai-reply')
+def community_ai_reply_status(post_id):
+    """Poll whether the background AI reply for a post is ready"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    return jsonify({
+        'success': True,
+        'status': community_service.get_ai_reply_status(post_id)
+    })
 
 @app.route('/community/new', methods=['GET', 'POST'])
 def new_community_post():
@@ -1100,6 +1267,9 @@ def new_community_post():
             
             if result['success']:
                 flash('Post created successfully!', 'success')
+                if is_question and result.get('post'):
+                    # Land on the post so the AI reply shows up as soon as it is ready
+                    return redirect(url_for('community_post', post_id=result['post']['id']))
                 return redirect(url_for('community'))
             else:
                 flash(f'Error creating post: {result["error"]}', 'error')
@@ -1159,11 +1329,13 @@ def search_community():
     """Search community posts"""
     query = request.args.get('q', '').strip()
     category = request.args.get('category', 'all')
+    cursor = request.args.get('cursor')
+    limit = min(request.args.get('limit', 20, type=int), 50)
     
     if not query:
         return jsonify({'success': False, 'error': 'Search query required'}), 400
     
-    result = community_service.search_posts(query, category)
+    result = community_service.search_posts(query, category, limit=limit, cursor=cursor)
     
     if result['success']:
         # Add farmer info to posts
@@ -1317,12 +1489,14 @@ def get_satellite_data():
         if not lat or not lon:
             return jsonify({'success': False, 'error': 'Location required'}), 400
         
-        # Get satellite data with cache busting
         result = satellite_service.get_crop_health_data(lat, lon, farm_area)
         
-        # Add timestamp to force refresh
-        if result.get('success') and result.get('vegetation_image'):
-            result['cache_buster'] = datetime.now().timestamp()
+        # Images are fetched separately so the browser can load and cache them in parallel
+        if result.get('success'):
+            result['images'] = {
+                layer: url_for('satellite_tile', layer=layer, bbox_hash=result['bbox_hash'], date=result['date'])
+                for layer in result.pop('layers')
+            }
         
         return jsonify(result)
         
@@ -1332,6 +1506,36 @@ def get_satellite_data():
             'error': str(e)
         }), 500
 
+@app.route('/api/satellite-trend/<field_id>')
+def get_satellite_trend(field_id):
+    """NDVI history for a field from the time-series store"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    days = min(request.args.get('days', 180, type=int), 3650)
+    try:
+        trend = satellite_service.get_ndvi_trend(field_id, days=days)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({'success': True, 'field_id': field_id, 'days': days, 'trend': trend})
+
+@app.route('/satellite/tile/<layer>/<bbox_hash>/<date>.jpg')
+def satellite_tile(layer, bbox_hash, date):
+    """Satellite tile from the disk cache; a tile for a given date never changes"""
+    from flask import send_file, abort
+    
+    # Same login as the satellite page that hands out these URLs
+    if 'user_id' not in session:
+        abort(401)
+    path = satellite_service.get_tile(layer, bbox_hash, date)
+    if not path:
+        abort(404)
+    
+    response = send_file(path, mimetype='image/jpeg', conditional=True, max_age=31536000)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
 @app.route('/api/generate-qr', methods=['POST'])
 def api_generate_qr():
     """API endpoint to generate QR code for passport"""
@@ -1346,8 +1550,6 @@ def api_generate_qr():
         if not passport_id:
             return jsonify({'success': False, 'error': 'Passport ID required'}), 400
         
-        # Generate QR code directly
-        from services.qr_service import generate_qr_code
         from supabase_models.digital_passport import DigitalPassport
         
         # Get passport details
@@ -1360,13 +1562,10 @@ def api_generate_qr():
         if not farmer:
             return jsonify({'success': False, 'error': 'Farmer not found'}), 404
         
-        # Create QR data - direct link to PDF certificate
-        certificate_url = f"{request.host_url}certificate/{passport_id}"
-        qr_image = generate_qr_code(certificate_url)
-        
+        # QR image links directly to the PDF certificate
         return jsonify({
             'success': True,
-            'qr_code': qr_image,
+            'qr_code_url': url_for('qr_image', token_id=passport_id, fmt='png'),
             'qr_url': f"/verify/{passport_id}",
             'certificate_url': f"/certificate/{passport_id}"
         })
@@ -1382,12 +1581,13 @@ def api_generate_qr():
 def download_certificate(token_id):
     """Generate and download PDF certificate"""
     try:
-        from services.pdf_certificate import generate_certificate_pdf
+        from services.pdf_certificate import get_certificate_file
+        from services import passport_claims
         from supabase_models.digital_passport import DigitalPassport
-        from flask import Response
+        from flask import send_file
         
-        # Get passport details
-        passport = DigitalPassport.get_by_token_id(token_id)
+        # Get passport details (shared with verify scans through the cache)
+        passport = DigitalPassport.get_cached_by_token_id(token_id)
         if not passport:
             return jsonify({'error': 'Passport not found'}), 404
         
@@ -1412,15 +1612,19 @@ def download_certificate(token_id):
             'farming_experience_years': getattr(farmer, 'farming_experience_years', 0)
         }
         
-        # QR data for verification
-        verify_url = f"{request.host_url}verify/{token_id}"
+        # QR data for verification, with the signed claim for offline checks
+        verify_url = passport_claims.signed_url(public_url(f"verify/{token_id}"), passport, farmer.name)
         
-        # Generate PDF
-        pdf_data = generate_certificate_pdf(passport_data, farmer_data, verify_url)
+        # Cached by content hash; only generated when the data changes
+        pdf_path, content_hash = get_certificate_file(passport_data, farmer_data, verify_url)
         
-        # Return PDF as download
-        response = Response(pdf_data, mimetype='application/pdf')
-        response.headers['Content-Disposition'] = f'attachment; filename="crop_certificate_{token_id}.pdf"'
+        # Streamed from disk; If-None-Match / If-Modified-Since get a 304
+        response = send_file(
+            pdf_path, mimetype='application/pdf', as_attachment=True,
+            download_name=f"crop_certificate_{token_id}.pdf",
+            etag=content_hash[:32], conditional=True
+        )
+        response.headers['Cache-Control'] = 'public, no-cache'
         return response
         
     except Exception as e:
@@ -1431,11 +1635,10 @@ def download_certificate(token_id):
 def generate_qr_label(token_id):
     """Generate printable QR label for crop packaging"""
     try:
-        from services.qr_service import generate_qr_code
         from supabase_models.digital_passport import DigitalPassport
         
-        # Get passport details
-        passport = DigitalPassport.get_by_token_id(token_id)
+        # Get passport details (shared with verify scans through the cache)
+        passport = DigitalPassport.get_cached_by_token_id(token_id)
         if not passport:
             return jsonify({'error': 'Passport not found'}), 404
         
@@ -1444,9 +1647,8 @@ def generate_qr_label(token_id):
         if not farmer:
             return jsonify({'error': 'Farmer not found'}), 404
         
-        # Generate QR code for certificate
-        certificate_url = f"{request.host_url}certificate/{token_id}"
-        qr_image = generate_qr_code(certificate_url)
+        # QR code for the certificate, fetched by the browser as a cached image
+        qr_image = url_for('qr_image', token_id=token_id, fmt='svg')
         
         # Create printable label HTML
         label_html = f'''
@@ -1584,6 +1786,98 @@ def generate_qr_label(token_id):
 # All routes are defined directly in this file - no blueprints needed
 
 # Test QR generation endpoint
+@app.route('/api/qr-labels', methods=['POST'])
+def create_label_sheet():
+    """Multi-up A4 label sheet for many passports; large sheets become a background job"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    from services import label_sheet, passport_claims
+    from supabase_models.digital_passport import DigitalPassport
+    from flask import Response
+    
+    data = request.get_json(silent=True) or {}
+    user_id = str(session['user_id'])
+    if data.get('all'):
+        # Every passport of the caller, not just the page on screen
+        own = DigitalPassport.get_by_farmer_id(user_id)
+        token_ids = list(dict.fromkeys(p.nft_token_id for p in own if p.nft_token_id))
+    else:
+        token_ids = list(dict.fromkeys(str(t) for t in data.get('token_ids', []) if t))
+    if not token_ids:
+        return jsonify({'success': False, 'error': 'token_ids required'}), 400
+    if len(token_ids) > label_sheet.MAX_LABELS:
+        return jsonify({'success': False, 'error': f'At most {label_sheet.MAX_LABELS} labels per sheet'}), 400
+    
+    # Only the caller's own passports; anything else is reported as missing
+    if data.get('all'):
+        passports = {p.nft_token_id: p for p in own}
+    else:
+        passports = {p.nft_token_id: p for p in DigitalPassport.get_by_token_ids(token_ids) if str(p.farmer_id) == user_id}
+    farmer = get_supabase_farmer(user_id)
+    
+    labels = []
+    for token_id in token_ids:
+        passport = passports.get(token_id)
+        if not passport:
+            continue
+        labels.append({
+            'token_id': token_id,
+            'url': passport_claims.signed_url(public_url(f"verify/{token_id}"), passport, getattr(farmer, 'name', '')),
+            'crop_type': passport.crop_type,
+            'season': passport.season,
+            'farmer': getattr(farmer, 'name', ''),
+            'place': f"{getattr(farmer, 'place', '') or ''} {getattr(farmer, 'pincode', '') or ''}".strip(),
+        })
+    missing = [token_id for token_id in token_ids if token_id not in passports]
+    if not labels:
+        return jsonify({'success': False, 'error': 'Passports not found', 'missing': missing}), 404
+    
+    if len(labels) <= label_sheet.INLINE_LIMIT:
+        response = Response(label_sheet.build_sheet(labels), mimetype='application/pdf')
+        response.headers['Content-Disposition'] = f'attachment; filename="qr_labels_{len(labels)}.pdf"'
+        return response
+    
+    job_id = label_sheet.start_job(labels, owner=user_id)
+    if not job_id:
+        return jsonify({'success': False, 'error': 'Too many label jobs, try again shortly'}), 503
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'total': len(labels),
+        'missing': missing,
+        'status_url': url_for('label_sheet_status', job_id=job_id)
+    }), 202
+
+@app.route('/api/qr-labels/<job_id>')
+def label_sheet_status(job_id):
+    """Progress of a background label sheet job"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    from services import label_sheet
+    
+    job = label_sheet.get_job(job_id)
+    if not job or job.get('owner') != str(session['user_id']):
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] == 'done':
+        job['pdf_url'] = url_for('label_sheet_pdf', job_id=job_id)
+    return jsonify(dict(job, success=True))
+
+@app.route('/api/qr-labels/<job_id>.pdf')
+def label_sheet_pdf(job_id):
+    from services import label_sheet
+    from flask import send_file, abort
+    
+    if 'user_id' not in session:
+        abort(401)
+    job = label_sheet.get_job(job_id)
+    path = label_sheet.get_job_pdf(job_id)
+    if not path or job.get('owner') != str(session['user_id']):
+        abort(404)
+    return send_file(path, mimetype='application/pdf', as_attachment=True,
+                     download_name=f"qr_labels_{job_id[:8]}.pdf", conditional=True)
+
 @app.route('/test-qr')
 def test_qr():
     """Test QR code generation"""
@@ -1,23 +1,181 @@
 import os
+import threading
+import time
+from collections import defaultdict
+
+import httpx
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
 load_dotenv()
 
+try:
+    import h2  # noqa: F401 - httpx only negotiates HTTP/2 when h2 is installed
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class QueryStats:
+    """Per-table (and per-route) Supabase request counts and latencies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.tables = defaultdict(lambda: {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            self.routes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, table, route, elapsed_ms, failed=False):
+        with self._lock:
+            stats = self.tables[table]
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            if failed:
+                stats['errors'] += 1
+            if route:
+                self.routes[route][table] += 1
+
+    def snapshot(self):
+        with self._lock:
+            tables = {
+                table: dict(stats, avg_ms=round(stats['total_ms'] / stats['count'], 2) if stats['count'] else 0.0)
+                for table, stats in self.tables.items()
+            }
+            routes = {route: dict(counts) for route, counts in self.routes.items()}
+        return {'tables': tables, 'routes': routes}
+
+
+def _table_from_path(path):
+    # /rest/v1/<table>, /rest/v1/rpc/<function>, /auth/v1/..., /storage/v1/...
+    parts = [p for p in path.split('/') if p]
+    if len(parts) >= 3 and parts[0] == 'rest':
+        return f"rpc:{parts[3]}" if parts[2] == 'rpc' and len(parts) > 3 else parts[2]
+    return parts[0] if parts else 'unknown'
+
+
+def _current_route():
+    try:
+        from flask import has_request_context, request
+        if has_request_context():
+            return request.endpoint or request.path
+    except ImportError:
+        pass
+    return None
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Shared connection pool that times every request by table"""
+
+    def __init__(self, transport, stats):
+        self._transport = transport
+        self._stats = stats
+
+    def handle_request(self, request):
+        table = _table_from_path(request.url.path)
+        route = _current_route()
+        started = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            self._stats.record(table, route, (time.perf_counter() - started) * 1000, failed=True)
+            raise
+        self._stats.record(table, route, (time.perf_counter() - started) * 1000,
+                           failed=response.status_code >= 400)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
 class SupabaseConfig:
     def __init__(self):
         self.url = os.getenv('SUPABASE_URL')
         self.anon_key = os.getenv('SUPABASE_ANON_KEY')
         self.service_key = os.getenv('SUPABASE_SERVICE_KEY')
-        
+        self.pool_size = int(os.getenv('SUPABASE_POOL_SIZE', 10))
+        self.keepalive_connections = int(os.getenv('SUPABASE_KEEPALIVE_CONNECTIONS', 5))
+        self.keepalive_expiry = float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY', 30))
+        self.timeout = float(os.getenv('SUPABASE_TIMEOUT', 10))
+        self.http2 = os.getenv('SUPABASE_HTTP2', 'true').lower() == 'true' and HTTP2_AVAILABLE
+
         if not all([self.url, self.anon_key]):
             raise ValueError("Missing Supabase configuration")
-    
-    def get_client(self, use_service_key=False):
-        key = self.service_key if use_service_key else self.anon_key
-        return create_client(self.url, key)
 
-# Global Supabase client
+
+class SupabaseClientPool:
+    """One pooled HTTP transport shared by every Supabase client in the process"""
+
+    def __init__(self, config):
+        self.config = config
+        self.stats = QueryStats()
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._transport = self._create_transport()
+        # Connections must not be shared across a gunicorn fork
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _create_transport(self):
+        return InstrumentedTransport(
+            httpx.HTTPTransport(
+                http2=self.config.http2,
+                limits=httpx.Limits(
+                    max_connections=self.config.pool_size,
+                    max_keepalive_connections=self.config.keepalive_connections,
+                    keepalive_expiry=self.config.keepalive_expiry
+                )
+            ),
+            self.stats
+        )
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self.stats = QueryStats()
+        self._transport = self._create_transport()
+        for client in self._clients.values():
+            # The old sessions wrap the parent's transport: closing them here
+            # would shut down connections the parent is still using
+            self._attach(client, close_old=False)
+
+    def _attach(self, client, close_old=True):
+        """Point the client's PostgREST session at the shared transport"""
+        postgrest = client.postgrest
+        old_session = postgrest.session
+        postgrest.session = httpx.Client(
+            base_url=old_session.base_url,
+            headers=old_session.headers,
+            timeout=self.config.timeout,
+            transport=self._transport
+        )
+        if close_old:
+            # The client's own session and connection pool are not used again
+            old_session.close()
+
+    def get_client(self, key=None, use_service_key=False) -> Client:
+        key = key or (self.config.service_key if use_service_key else self.config.anon_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = create_client(self.config.url, key)
+                self._attach(client)
+                self._clients[key] = client
+            return client
+
+
+# Global Supabase client pool
 supabase_config = SupabaseConfig()
-supabase: Client = supabase_config.get_client()
-supabase_admin: Client = supabase_config.get_client(use_service_key=True)
\ No newline at end of file
+supabase_pool = SupabaseClientPool(supabase_config)
+supabase: Client = supabase_pool.get_client()
+supabase_admin: Client = supabase_pool.get_client(use_service_key=True)
+
+
+def get_supabase_client(use_service_key=False) -> Client:
+    return supabase_pool.get_client(use_service_key=use_service_key)
+
+
+def get_query_stats():
+    return supabase_pool.stats.snapshot()
@@ -19,9 +19,16 @@ def create_passport_table():
             created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
         );
         
+        -- Set by the mint queue: pending / submitted / minted / failed
+        ALTER TABLE digital_passports ADD COLUMN IF NOT EXISTS transaction_hash VARCHAR(100);
+        ALTER TABLE digital_passports ADD COLUMN IF NOT EXISTS mint_status VARCHAR(20) DEFAULT 'minted';
+        -- Batched anchoring: {root, index, leaf, path, manifest}
+        ALTER TABLE digital_passports ADD COLUMN IF NOT EXISTS merkle_proof JSONB;
+        
         -- Create index for faster queries
         CREATE INDEX IF NOT EXISTS idx_digital_passports_farmer_id ON digital_passports(farmer_id);
         CREATE INDEX IF NOT EXISTS idx_digital_passports_token_id ON digital_passports(nft_token_id);
+        CREATE INDEX IF NOT EXISTS idx_digital_passports_farmer_created_id ON digital_passports(farmer_id, created_at DESC, id DESC);
         """
         
         result = supabase_admin.rpc('exec_sql', {'sql': sql}).execute()
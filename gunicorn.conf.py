@@ -1,3 +1,5 @@
+import os
+
 # Gunicorn configuration for production
 bind = "0.0.0.0:8000"
 workers = 1  # Single worker for memory efficiency
@@ -9,4 +11,24 @@ max_requests = 500  # Restart workers more frequently
 max_requests_jitter = 50
 preload_app = True
 worker_tmp_dir = "/dev/shm"  # Use RAM for temp files
-worker_memory_limit = 400  # MB limit per worker
\ No newline at end of file
+worker_memory_limit = 400  # MB limit per worker
+
+def when_ready(server):
+    """Import lazily loaded services in the master so forked workers inherit them"""
+    warm_up = os.getenv('WARM_UP_SERVICES', 'all')
+    if preload_app and warm_up:
+        from services.registry import registry
+        load_times = registry.warm_up(warm_up)
+        server.log.info(f"Warmed up services: {load_times}")
+
+def post_fork(server, worker):
+    """Start per-worker background threads
+
+    The blockchain status refresher, so the first page render already has a
+    snapshot, and the mint queue worker, so jobs left in the queue by a
+    restart or a recycled worker are resumed without waiting for a new mint.
+    """
+    from services.blockchain.status_monitor import blockchain_status
+    from services.blockchain.mint_queue import mint_queue
+    blockchain_status.start()
+    mint_queue.start()
@@ -0,0 +1,10 @@
+"""
+Performance tooling for Krishi Sahayak.
+
+    python -m krishi_perf startup            # import-time + first-request report
+    python -m krishi_perf startup --help
+    python -m krishi_perf ndvi               # NDVI engine benchmark on large rasters
+    python -m krishi_perf wms                # WMS fetch layer against a local stub server
+    python -m krishi_perf mint               # passport mint queue against a stub dev chain
+    python -m krishi_perf ipfs               # IPFS pin dedupe/batching against a stub Pinata API
+"""
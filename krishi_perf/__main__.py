@@ -0,0 +1,21 @@
+import argparse
+import sys
+
+from krishi_perf import ipfs, mint, ndvi, startup, wms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m krishi_perf', description='Krishi Sahayak performance tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    startup.add_arguments(commands.add_parser('startup', help='Profile worker import time and first-request latency'))
+    ndvi.add_arguments(commands.add_parser('ndvi', help='Benchmark the NDVI/EVI and zonal statistics engine'))
+    wms.add_arguments(commands.add_parser('wms', help='Check concurrent, cached WMS fetching against a stub server'))
+    ipfs.add_arguments(commands.add_parser('ipfs', help='Check IPFS pin dedupe and batching against a stub Pinata API'))
+    mint.add_arguments(commands.add_parser('mint', help='Check the passport mint queue against a stub dev chain'))
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
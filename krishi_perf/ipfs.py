@@ -0,0 +1,148 @@
+"""
+IPFS pinning check against a local stub Pinata API.
+
+Starts a stub pinJSONToIPFS endpoint that answers after a fixed delay and
+measures services.blockchain.ipfs_pinning: pinning N distinct documents
+one at a time versus as one concurrent batch, re-submitting the same
+metadata (should make no request), metadata with its keys in a different
+order (same content, same CID), and the latency/bytes counters.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.blockchain.ipfs_pinning import PinataClient
+
+
+class StubPinataHandler(BaseHTTPRequestHandler):
+    delay = 0.1
+    requests_seen = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        type(self).requests_seen += 1
+        time.sleep(self.delay)
+        content = json.dumps(json.loads(body)['pinataContent'], sort_keys=True).encode()
+        reply = json.dumps({'IpfsHash': 'Qm' + hashlib.sha256(content).hexdigest()[:44], 'PinSize': len(content)}).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_pinata(delay):
+    StubPinataHandler.delay = delay
+    StubPinataHandler.requests_seen = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubPinataHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _metadata(i, batch):
+    return {
+        'name': f"Rice Crop Passport {batch}-{i}",
+        'description': 'Digital certificate for Rice grown in Kharif',
+        'attributes': [{'trait_type': 'Crop Type', 'value': 'Rice'}, {'trait_type': 'Serial', 'value': i}],
+    }
+
+
+def run_check(count=20, delay=0.1):
+    server, url = start_stub_pinata(delay)
+    cache_dir = tempfile.mkdtemp(prefix='krishi-ipfs-')
+    try:
+        client = PinataClient('key', 'secret', url, cache_dir=cache_dir)
+
+        started = time.perf_counter()
+        for i in range(count):
+            client.pin_json(_metadata(i, 'sequential'))
+        sequential_ms = (time.perf_counter() - started) * 1000
+
+        batch = [_metadata(i, 'batch') for i in range(count)]
+        started = time.perf_counter()
+        cids = client.pin_many(batch)
+        batch_ms = (time.perf_counter() - started) * 1000
+
+        before = StubPinataHandler.requests_seen
+        started = time.perf_counter()
+        repeated = client.pin_many(batch)
+        repeat_ms = (time.perf_counter() - started) * 1000
+        repeat_requests = StubPinataHandler.requests_seen - before
+
+        # Same content with the keys in another order
+        reordered = {key: batch[0][key] for key in reversed(list(batch[0]))}
+        before = StubPinataHandler.requests_seen
+        reordered_cid = client.pin_json(reordered)
+        reordered_requests = StubPinataHandler.requests_seen - before
+
+        # A new process (fresh memory) still finds the pins on disk
+        fresh = PinataClient('key', 'secret', url, cache_dir=cache_dir)
+        before = StubPinataHandler.requests_seen
+        fresh_cids = fresh.pin_many(batch)
+        fresh_requests = StubPinataHandler.requests_seen - before
+
+        stats = client.summary()
+        checks = {
+            'repeat_skips_network': repeat_requests == 0 and repeated == cids,
+            'key_order_independent': reordered_requests == 0 and reordered_cid == cids[0],
+            'disk_cache_survives_restart': fresh_requests == 0 and fresh_cids == cids,
+            'batch_faster_than_sequential': batch_ms < sequential_ms,
+        }
+        return {
+            'count': count,
+            'stub_delay_ms': delay * 1000,
+            'sequential_ms': round(sequential_ms, 1),
+            'batch_ms': round(batch_ms, 1),
+            'repeat_ms': round(repeat_ms, 2),
+            'pins': stats['pins'],
+            'cache_hits': stats['cache_hits'],
+            'bytes_sent': stats['bytes_sent'],
+            'pin_ms_avg': stats['pin_ms_avg'],
+            'pin_ms_max': round(stats['pin_ms_max'], 1),
+            'checks': checks,
+        }
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def format_report(result):
+    lines = [
+        f"IPFS pinning check ({result['count']} documents, stub latency {result['stub_delay_ms']:.0f} ms)",
+        f"  one at a time      : {result['sequential_ms']:>8.1f} ms",
+        f"  concurrent batch   : {result['batch_ms']:>8.1f} ms",
+        f"  identical re-submit: {result['repeat_ms']:>8.2f} ms",
+        f"  {result['pins']} pins, {result['cache_hits']} cache hits, {result['bytes_sent']} bytes sent, "
+        f"pin latency avg {result['pin_ms_avg']} ms / max {result['pin_ms_max']} ms",
+        '',
+    ]
+    for name, ok in result['checks'].items():
+        lines.append(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return '\n'.join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument('--count', type=int, default=20, help='Number of metadata documents to pin')
+    parser.add_argument('--delay', type=float, default=0.1, help='Stub Pinata latency per request in seconds')
+    parser.add_argument('--output', help='Optional JSON output path')
+    parser.set_defaults(func=command)
+
+
+def command(args):
+    result = run_check(count=args.count, delay=args.delay)
+    print(format_report(result))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0 if all(result['checks'].values()) else 1
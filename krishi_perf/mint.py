@@ -0,0 +1,389 @@
+"""
+Passport mint queue check against a local dev chain stand-in.
+
+Starts a stub JSON-RPC node (unlocked dev account, batch requests, a new
+block every --block-time seconds) and compares minting N passports the
+old way, send then wait for the receipt inside the request, with
+services.blockchain.mint_queue: how long the request itself takes, how
+long until every passport is confirmed, and how many receipt round-trips
+the worker needs. Also checks that a job left in the queue by one process
+is picked up by a fresh queue over the same database.
+
+A second stub (with per-request latency) compares concurrent sends that
+ask the node for a nonce each time against the local NonceManager:
+nonce collisions, RPC requests per transaction, and whether a nonce
+released by a failed send is reused so the account has no gap.
+
+Finally the queue runs in batch mode: --batch passports become one
+pinned manifest and one Merkle-root transaction, and every passport's
+stored inclusion proof is checked against that root.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.blockchain import merkle
+from services.blockchain.mint_queue import MintQueue
+from services.blockchain.nonce_manager import NonceManager
+from services.blockchain.rpc import JSONRPCClient
+
+DEV_ACCOUNT = '0x' + '11' * 20
+
+
+class StubChain:
+    """Just enough of an Ethereum node for the mint path"""
+
+    def __init__(self, block_time, latency=0.0):
+        self.block_time = block_time
+        self.latency = latency
+        self.started = time.monotonic()
+        self.transactions = {}
+        self.used_nonces = set()
+        self.lock = threading.Lock()
+        self.http_requests = 0
+        self.receipt_calls = 0
+
+    def block_number(self):
+        return int((time.monotonic() - self.started) / self.block_time)
+
+    def pending_nonce(self):
+        nonce = 0
+        while nonce in self.used_nonces:
+            nonce += 1
+        return nonce
+
+    def handle(self, method, params):
+        if method == 'eth_sendTransaction':
+            with self.lock:
+                nonce = params[0].get('nonce')
+                nonce = self.pending_nonce() if nonce is None else int(nonce, 16)
+                if nonce in self.used_nonces:
+                    raise ValueError('nonce too low')
+                self.used_nonces.add(nonce)
+                tx_hash = '0x' + hashlib.sha256(f"{nonce}:{params[0].get('data')}".encode()).hexdigest()
+                # Included in the block after the current one
+                self.transactions[tx_hash] = (nonce, self.block_number() + 1)
+            return tx_hash
+        if method == 'eth_getTransactionReceipt':
+            self.receipt_calls += 1
+            nonce, block = self.transactions.get(params[0], (None, None))
+            if block is None or block > self.block_number():
+                return None
+            if any(n not in self.used_nonces for n in range(nonce)):
+                # A missing lower nonce holds the transaction in the mempool
+                return None
+            return {'transactionHash': params[0], 'blockNumber': hex(block), 'status': '0x1'}
+        if method == 'eth_getTransactionCount':
+            with self.lock:
+                return hex(self.pending_nonce())
+        if method == 'eth_blockNumber':
+            return hex(self.block_number())
+        raise ValueError(f"method {method} not supported")
+
+
+class StubRPCHandler(BaseHTTPRequestHandler):
+    chain = None
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        type(self).chain.http_requests += 1
+        time.sleep(self.chain.latency)
+        calls = request if isinstance(request, list) else [request]
+        replies = []
+        for call in calls:
+            try:
+                replies.append({'jsonrpc': '2.0', 'id': call['id'], 'result': self.chain.handle(call['method'], call['params'])})
+            except ValueError as e:
+                replies.append({'jsonrpc': '2.0', 'id': call['id'], 'error': {'code': -32601, 'message': str(e)}})
+        body = json.dumps(replies if isinstance(request, list) else replies[0]).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_chain(block_time, latency=0.0):
+    StubRPCHandler.chain = StubChain(block_time, latency)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubRPCHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, StubRPCHandler.chain, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class DevChainClient:
+    """The mint queue's chain interface over a dev node's unlocked account"""
+
+    def __init__(self, url):
+        self.rpc = JSONRPCClient(url)
+        self.nonces = NonceManager(lambda: int(self.rpc.call('eth_getTransactionCount', DEV_ACCOUNT, 'pending'), 16))
+        self.manifests = []
+
+    def send(self, payload, nonce):
+        data = f"PASSPORT:{payload['crop_type']}:{payload['season']}:{payload['ipfs_hash']}"
+        return self.rpc.call('eth_sendTransaction', {
+            'from': DEV_ACCOUNT, 'to': DEV_ACCOUNT, 'data': '0x' + data.encode().hex(), 'nonce': hex(nonce)
+        })
+
+    def submit_mint(self, payload):
+        nonce = self.nonces.allocate()
+        try:
+            return self.send(payload, nonce)
+        except Exception as e:
+            self.nonces.failed(nonce, e)
+            raise
+
+    def _sign(self, data):
+        # The dev node signs with its unlocked account; the stub's hash is known up front
+        nonce = self.nonces.allocate()
+        data = '0x' + data.encode().hex()
+        return {'tx_hash': '0x' + hashlib.sha256(f"{nonce}:{data}".encode()).hexdigest(), 'nonce': nonce, 'data': data}
+
+    def sign_mint(self, payload):
+        return self._sign(f"PASSPORT:{payload['crop_type']}:{payload['season']}:{payload['ipfs_hash']}")
+
+    def sign_anchor(self, merkle_root, manifest):
+        self.manifests.append(manifest)
+        manifest_cid = 'Qm' + hashlib.sha256(merkle.canonical_json(manifest).encode()).hexdigest()[:44]
+        return dict(self._sign(f"ANCHOR:{merkle_root}:{manifest_cid}"), manifest=manifest_cid)
+
+    def send_signed(self, signed):
+        return self.rpc.call('eth_sendTransaction', {
+            'from': DEV_ACCOUNT, 'to': DEV_ACCOUNT, 'data': signed['data'], 'nonce': hex(signed['nonce'])
+        })
+
+    def release_signed(self, signed, error):
+        self.nonces.failed(signed['nonce'], error)
+
+    def submit_mint_unmanaged(self, payload):
+        # The old path: ask the node for the nonce before every send
+        nonce = int(self.rpc.call('eth_getTransactionCount', DEV_ACCOUNT, 'pending'), 16)
+        return self.send(payload, nonce)
+
+    def get_receipts(self, tx_hashes):
+        return self.rpc.get_receipts(tx_hashes)
+
+    def wait_for_receipt(self, tx_hash, poll=0.1):
+        # What web3's wait_for_transaction_receipt does inside the request
+        while True:
+            receipt = self.get_receipts([tx_hash])[tx_hash]
+            if receipt:
+                return receipt
+            time.sleep(poll)
+
+
+def _payload(i):
+    return {'crop_type': 'Rice', 'season': 'Kharif', 'ipfs_hash': f"Qm{i:044d}"}
+
+
+def _concurrent_sends(send, sends, threads):
+    def attempt(i):
+        try:
+            send(_payload(i))
+            return True
+        except Exception:
+            return False
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(attempt, range(sends)))
+    return results.count(True), time.perf_counter() - started
+
+
+def run_nonce_check(sends=40, threads=4, latency=0.005):
+    result = {}
+    for mode in ('unmanaged', 'managed'):
+        server, chain, url = start_stub_chain(block_time=0.05, latency=latency)
+        try:
+            client = DevChainClient(url)
+            send = client.submit_mint if mode == 'managed' else client.submit_mint_unmanaged
+            ok, elapsed = _concurrent_sends(send, sends, threads)
+            result[mode] = {
+                'accepted': ok,
+                'collisions': sends - ok,
+                'rpc_per_tx': round(chain.http_requests / max(ok, 1), 2),
+                'tx_per_s': round(ok / elapsed, 1),
+            }
+            if mode == 'managed':
+                # A send that never reached the node gives its nonce back
+                lost = client.nonces.allocate()
+                client.nonces.failed(lost, ConnectionError('connection reset'))
+                client.submit_mint(_payload(sends))
+                result['gap_reused'] = lost in chain.used_nonces
+                result['nonces_contiguous'] = chain.used_nonces == set(range(len(chain.used_nonces)))
+        finally:
+            server.shutdown()
+    return result
+
+
+def run_batch_check(passports=200, block_time=0.1):
+    server, chain, url = start_stub_chain(block_time)
+    work_dir = tempfile.mkdtemp(prefix='krishi-mint-batch-')
+    try:
+        client = DevChainClient(url)
+        rows = {}
+        queue = MintQueue(path=os.path.join(work_dir, 'batch.sqlite3'), chain=client,
+                          on_update=lambda job: rows.__setitem__(job['token_id'], job),
+                          mode='batch', batch_window=0.2, max_batch=passports, poll_interval=block_time)
+        queue._pid = os.getpid()  # driven by hand below
+        for i in range(passports):
+            queue.enqueue(f"KS-BATCH-{i:04d}", {'metadata': {'name': 'Rice Crop Passport', 'serial': i}})
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + 10
+        while len(rows) < passports and time.monotonic() < deadline:
+            queue.run_once()
+            time.sleep(block_time / 2)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        proofs = [job['proof'] for job in rows.values() if job['status'] == 'confirmed']
+        root = client.manifests[0]['merkle_root'] if client.manifests else None
+        tampered = dict(proofs[0], leaf=merkle.leaf_hash({'token_id': 'KS-FORGED', 'metadata': {}})) if proofs else None
+        return {
+            'passports': passports,
+            'transactions': len(chain.transactions),
+            'manifests': len(client.manifests),
+            'proof_depth': len(proofs[0]['path']) if proofs else 0,
+            'confirm_ms': round(elapsed_ms, 1),
+            'all_confirmed': len(proofs) == passports,
+            'proofs_valid': bool(proofs) and all(
+                proof['root'] == root and merkle.verify(proof['leaf'], proof['path'], proof['root']) for proof in proofs
+            ),
+            'forgery_rejected': bool(tampered) and not merkle.verify(tampered['leaf'], tampered['path'], tampered['root']),
+        }
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_check(count=20, block_time=0.5, batch=200):
+    server, chain, url = start_stub_chain(block_time)
+    work_dir = tempfile.mkdtemp(prefix='krishi-mint-')
+    try:
+        client = DevChainClient(url)
+
+        # Blocking: each request sends and waits for its own receipt
+        started = time.perf_counter()
+        blocking_request_ms = []
+        for i in range(min(count, 5)):
+            request_started = time.perf_counter()
+            client.wait_for_receipt(client.submit_mint(_payload(i)))
+            blocking_request_ms.append((time.perf_counter() - request_started) * 1000)
+        blocking_per_mint_ms = (time.perf_counter() - started) * 1000 / len(blocking_request_ms)
+
+        # Queued: requests only enqueue; the worker submits and polls in batches
+        updates = {}
+        queue = MintQueue(path=os.path.join(work_dir, 'mint.sqlite3'), chain=client,
+                          on_update=lambda job: updates.__setitem__(job['token_id'], job['status']),
+                          poll_interval=block_time / 5)
+        receipt_calls_before, http_before = chain.receipt_calls, chain.http_requests
+        started = time.perf_counter()
+        enqueue_ms = []
+        for i in range(count):
+            request_started = time.perf_counter()
+            queue.enqueue(f"KS-TEST-{i:04d}", _payload(i))
+            enqueue_ms.append((time.perf_counter() - request_started) * 1000)
+        deadline = time.monotonic() + 30 * block_time + 10
+        while queue.counts().get('confirmed', 0) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        queued_total_ms = (time.perf_counter() - started) * 1000
+        receipt_polls = queue.stats['receipt_polls']
+
+        # A job recorded by one process is finished by another over the same file
+        recorder = MintQueue(path=os.path.join(work_dir, 'restart.sqlite3'), chain=client, on_update=None)
+        recorder._pid = os.getpid()  # record without starting a worker
+        recorder.enqueue('KS-RESTART', _payload(count))
+        # Started the way a fresh worker starts it (post_fork), with nothing new enqueued
+        resumed = MintQueue(path=recorder.path, chain=client, on_update=None, poll_interval=block_time / 5)
+        resumed.start()
+        deadline = time.monotonic() + 10 * block_time + 5
+        while (resumed.get('KS-RESTART') or {}).get('status') != 'confirmed' and time.monotonic() < deadline:
+            time.sleep(block_time / 5)
+
+        nonces = run_nonce_check()
+        batched = run_batch_check(passports=batch)
+
+        enqueue_ms.sort()
+        checks = {
+            'all_confirmed': queue.counts() == {'confirmed': count},
+            'rows_updated': len(updates) == count and set(updates.values()) == {'confirmed'},
+            'receipts_batched': receipt_polls < count,
+            'request_does_not_wait': enqueue_ms[-1] < block_time * 1000,
+            'resumed_after_restart': resumed.get('KS-RESTART')['status'] == 'confirmed',
+            'no_nonce_collisions': nonces['managed']['collisions'] == 0,
+            'nonce_gap_filled': nonces['gap_reused'] and nonces['nonces_contiguous'],
+            'batch_one_transaction': batched['transactions'] == 1 and batched['manifests'] == 1,
+            'batch_all_confirmed': batched['all_confirmed'],
+            'batch_proofs_valid': batched['proofs_valid'] and batched['forgery_rejected'],
+        }
+        return {
+            'count': count,
+            'block_time_ms': block_time * 1000,
+            'blocking_request_ms': round(sum(blocking_request_ms) / len(blocking_request_ms), 1),
+            'blocking_total_estimate_ms': round(blocking_per_mint_ms * count, 1),
+            'enqueue_p50_ms': round(enqueue_ms[len(enqueue_ms) // 2], 2),
+            'enqueue_max_ms': round(enqueue_ms[-1], 2),
+            'queued_total_ms': round(queued_total_ms, 1),
+            'receipt_polls': receipt_polls,
+            'receipt_lookups': chain.receipt_calls - receipt_calls_before,
+            'rpc_http_requests': chain.http_requests - http_before,
+            'nonces': nonces,
+            'batch': batched,
+            'checks': checks,
+        }
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def format_report(result):
+    lines = [
+        f"Mint queue check ({result['count']} passports, stub block time {result['block_time_ms']:.0f} ms)",
+        f"  blocking request      : {result['blocking_request_ms']:>8.1f} ms per mint "
+        f"(~{result['blocking_total_estimate_ms']:.0f} ms for all, one at a time)",
+        f"  queued request        : {result['enqueue_p50_ms']:>8.2f} ms p50, {result['enqueue_max_ms']:.2f} ms max",
+        f"  queued, all confirmed : {result['queued_total_ms']:>8.1f} ms",
+        f"  receipt polls         : {result['receipt_polls']} batched round-trip(s) for "
+        f"{result['receipt_lookups']} lookups ({result['rpc_http_requests']} RPC requests in total)",
+        '  concurrent sends (4 threads):',
+    ]
+    for mode in ('unmanaged', 'managed'):
+        stats = result['nonces'][mode]
+        lines.append(f"    {mode:<9} : {stats['accepted']} accepted, {stats['collisions']} nonce collision(s), "
+                     f"{stats['rpc_per_tx']} RPC/tx, {stats['tx_per_s']} tx/s")
+    batched = result['batch']
+    lines.append(f"  batch mode            : {batched['passports']} passports -> {batched['transactions']} transaction(s), "
+                 f"{batched['manifests']} manifest pin(s), proof depth {batched['proof_depth']}, "
+                 f"confirmed in {batched['confirm_ms']:.0f} ms")
+    lines.append('')
+    for name, ok in result['checks'].items():
+        lines.append(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return '\n'.join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument('--count', type=int, default=20, help='Number of passports to mint')
+    parser.add_argument('--block-time', type=float, default=0.5, help='Stub chain block time in seconds')
+    parser.add_argument('--batch', type=int, default=200, help='Passports per batch in the batch-mode check')
+    parser.add_argument('--output', help='Optional JSON output path')
+    parser.set_defaults(func=command)
+
+
+def command(args):
+    result = run_check(count=args.count, block_time=args.block_time, batch=args.batch)
+    print(format_report(result))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0 if all(result['checks'].values()) else 1
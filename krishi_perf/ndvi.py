@@ -0,0 +1,131 @@
+"""
+NDVI engine benchmark.
+
+Times services.vegetation_index on synthetic red/NIR rasters of growing
+size, split into square fields so zonal statistics have real work to do,
+and compares against a per-pixel Python loop on a small crop to show the
+vectorisation speed-up. Results can be saved as JSON and diffed.
+"""
+
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from services.vegetation_index import compute_indices, zonal_stats
+
+DEFAULT_SIZES = [512, 2048, 4096]
+PYTHON_SAMPLE = 256
+
+
+def synthetic_scene(size, fields=16, seed=0):
+    """Red/NIR reflectance with a vegetation gradient, noise and a grid of field labels"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    vigour = 0.5 + 0.4 * np.sin(3 * x) * np.cos(2 * y)
+    nir = np.clip(0.25 + 0.35 * vigour + rng.normal(0, 0.03, (size, size)), 0, 1).astype(np.float32)
+    red = np.clip(0.12 - 0.08 * vigour + rng.normal(0, 0.01, (size, size)), 0, 1).astype(np.float32)
+
+    per_side = max(1, int(math.sqrt(fields)))
+    cell = size // per_side
+    rows = np.minimum(np.arange(size) // cell, per_side - 1)
+    zones = (rows[:, None] * per_side + rows[None, :] + 1).astype(np.int32)
+    return red, nir, zones
+
+
+def python_ndvi_mean(red, nir):
+    """Per-pixel reference implementation"""
+    total = 0.0
+    count = 0
+    for red_row, nir_row in zip(red.tolist(), nir.tolist()):
+        for r, n in zip(red_row, nir_row):
+            if n + r:
+                total += (n - r) / (n + r)
+                count += 1
+    return total / count if count else float('nan')
+
+
+def _timed(func, *args, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def run_benchmark(sizes=None, fields=16, repeat=3):
+    results = []
+    for size in sizes or DEFAULT_SIZES:
+        red, nir, zones = synthetic_scene(size, fields)
+        indices_ms, (ndvi, _) = _timed(compute_indices, red, nir, repeat=repeat)
+        zonal_ms, stats = _timed(zonal_stats, ndvi, zones, repeat=repeat)
+        pixels = size * size
+        results.append({
+            'size': size,
+            'pixels': pixels,
+            'zones': len(stats),
+            'indices_ms': round(indices_ms, 2),
+            'zonal_ms': round(zonal_ms, 2),
+            'mpixels_per_s': round(pixels / ((indices_ms + zonal_ms) / 1000) / 1e6, 1),
+        })
+
+    sample = min(PYTHON_SAMPLE, max(sizes or DEFAULT_SIZES))
+    red, nir, _ = synthetic_scene(sample, fields)
+    python_ms, _ = _timed(python_ndvi_mean, red, nir, repeat=1)
+    numpy_ms, _ = _timed(lambda: np.nanmean(compute_indices(red, nir)[0]), repeat=repeat)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'numpy': np.__version__,
+        'fields': fields,
+        'results': results,
+        'python_reference': {
+            'size': sample,
+            'python_ms': round(python_ms, 2),
+            'numpy_ms': round(numpy_ms, 2),
+            'speedup': round(python_ms / numpy_ms, 1) if numpy_ms else None,
+        },
+    }
+
+
+def format_report(result):
+    lines = [
+        f"NDVI engine benchmark ({result['timestamp']}, NumPy {result['numpy']}, {result['fields']} fields)",
+        f"  {'raster':>11} {'indices':>10} {'zonal':>10} {'throughput':>14}",
+    ]
+    for row in result['results']:
+        lines.append(
+            f"  {row['size']:>5}x{row['size']:<5} {row['indices_ms']:>8.1f}ms {row['zonal_ms']:>8.1f}ms "
+            f"{row['mpixels_per_s']:>9.1f} Mpx/s"
+        )
+    ref = result['python_reference']
+    lines += [
+        '',
+        f"Per-pixel Python vs NumPy on {ref['size']}x{ref['size']}: "
+        f"{ref['python_ms']:.1f}ms vs {ref['numpy_ms']:.2f}ms ({ref['speedup']}x)",
+    ]
+    return '\n'.join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument('--size', type=int, action='append', dest='sizes', help='Raster edge in pixels (repeatable)')
+    parser.add_argument('--fields', type=int, default=16, help='Number of fields (zones) per raster')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    parser.add_argument('--output', help='Optional JSON output path')
+    parser.set_defaults(func=command)
+
+
+def command(args):
+    result = run_benchmark(sizes=args.sizes, fields=args.fields, repeat=args.repeat)
+    print(format_report(result))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nJSON report written to {args.output}")
+    return 0
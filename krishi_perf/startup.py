@@ -0,0 +1,267 @@
+"""
+Startup profiler.
+
+Boots the Flask app in a fresh interpreter with `-X importtime`, then
+issues the first request to a set of key routes through the test client.
+Supabase and every outbound HTTP call are pointed at a local stub server
+so the numbers measure our own code, not the network. Produces a sorted
+text report and a JSON file that can be diffed between commits.
+"""
+
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ROUTES = [
+    '/',
+    '/dashboard',
+    '/community',
+    '/passport',
+    '/market',
+    '/weather',
+    '/satellite-monitor',
+    '/api/market-insights',
+]
+
+STUB_FARMER_ID = '00000000-0000-0000-0000-00000000f00d'
+
+RESULT_MARKER = '__KRISHI_PERF_RESULT__'
+
+
+def _fake_jwt():
+    # supabase-py validates the key format, not the signature
+    def part(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).decode().rstrip('=')
+    return f"{part({'alg': 'HS256', 'typ': 'JWT'})}.{part({'role': 'anon'})}.c2lnbmF0dXJl"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers Supabase REST calls with a demo farmer and everything else with empty JSON"""
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        if self.path.startswith('/rest/v1/farmers'):
+            body = [{
+                'id': STUB_FARMER_ID, 'clerk_user_id': 'perf-user', 'name': 'Perf Farmer',
+                'place': 'Pune', 'pincode': '411001', 'preferred_language': 'en', 'crops': []
+            }]
+        elif self.path.startswith('/rest/v1/'):
+            body = []
+        else:
+            body = {}
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# Runs inside the profiled interpreter
+CHILD_SCRIPT = r'''
+import json, os, sys, time
+from urllib.parse import urlsplit, urlunsplit
+
+stub = os.environ.get('KRISHI_PERF_STUB_URL')
+if stub:
+    import requests.sessions
+    _original_request = requests.sessions.Session.request
+    stub_parts = urlsplit(stub)
+
+    def _stubbed_request(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        if parts.hostname not in ('127.0.0.1', 'localhost'):
+            url = urlunsplit((stub_parts.scheme, stub_parts.netloc, parts.path, parts.query, ''))
+        kwargs['timeout'] = 5
+        return _original_request(self, method, url, *args, **kwargs)
+
+    requests.sessions.Session.request = _stubbed_request
+
+module_name, app_name = sys.argv[1].split(':')
+started = time.perf_counter()
+module = __import__(module_name, fromlist=[app_name])
+app = getattr(module, app_name)
+import_ms = (time.perf_counter() - started) * 1000
+
+client = app.test_client()
+with client.session_transaction() as session:
+    session['clerk_user_id'] = 'perf-user'
+    session['user_id'] = os.environ['KRISHI_PERF_FARMER_ID']
+
+requests_timing = []
+for route in json.loads(sys.argv[2]):
+    t0 = time.perf_counter()
+    try:
+        status = client.get(route).status_code
+    except Exception as e:
+        status = f'error: {e}'
+    first_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    try:
+        client.get(route)
+    except Exception:
+        pass
+    warm_ms = (time.perf_counter() - t0) * 1000
+    requests_timing.append({'route': route, 'status': status,
+                            'first_ms': round(first_ms, 2), 'warm_ms': round(warm_ms, 2)})
+
+registry_times = {}
+try:
+    from services.registry import registry
+    registry_times = registry.load_times
+except Exception:
+    pass
+
+print('__KRISHI_PERF_RESULT__' + json.dumps({
+    'app_import_ms': round(import_ms, 2),
+    'requests': requests_timing,
+    'lazy_service_load_ms': registry_times,
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into a list of {module, self_ms, cumulative_ms, depth}"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            name = name[1:]  # drop the separator space, keep the indentation
+            depth = (len(name) - len(name.lstrip(' '))) // 2
+            modules.append({
+                'module': name.strip(),
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': depth,
+            })
+        except ValueError:
+            continue
+    return modules
+
+
+def run_startup_profile(app='complete_app:app', routes=None, stub=True, python=sys.executable):
+    routes = routes or DEFAULT_ROUTES
+    env = dict(os.environ)
+    env['KRISHI_PERF_FARMER_ID'] = STUB_FARMER_ID
+    env['WARM_UP_SERVICES'] = ''
+
+    server = None
+    if stub:
+        server = start_stub_server()
+        stub_url = f"http://127.0.0.1:{server.server_address[1]}"
+        env.update({
+            'KRISHI_PERF_STUB_URL': stub_url,
+            'SUPABASE_URL': stub_url,
+            'SUPABASE_ANON_KEY': _fake_jwt(),
+            'SUPABASE_SERVICE_KEY': _fake_jwt(),
+            'SUPABASE_HTTP2': 'false',
+            'MONAD_RPC_URL': stub_url,
+        })
+
+    started = time.perf_counter()
+    try:
+        proc = subprocess.run(
+            [python, '-X', 'importtime', '-c', CHILD_SCRIPT, app, json.dumps(routes)],
+            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=300
+        )
+    finally:
+        if server:
+            server.shutdown()
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    result_line = next((line for line in proc.stdout.splitlines() if line.startswith(RESULT_MARKER)), None)
+    if proc.returncode != 0 or result_line is None:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError('Profiled app failed to start:\n' + '\n'.join(errors[-30:]))
+
+    result = json.loads(result_line[len(RESULT_MARKER):])
+    modules = parse_importtime(proc.stderr)
+    result.update({
+        'app': app,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'stubbed_upstreams': stub,
+        'process_wall_ms': round(wall_ms, 2),
+        'modules': sorted(modules, key=lambda m: m['cumulative_ms'], reverse=True),
+    })
+    return result
+
+
+def format_report(result, top=25):
+    lines = [
+        f"Startup profile for {result['app']} ({result['timestamp']}, Python {result['python']})",
+        f"  process wall time : {result['process_wall_ms']:.0f} ms",
+        f"  app import        : {result['app_import_ms']:.0f} ms",
+        '',
+        f"Slowest imports (top {top} by cumulative time):",
+        f"  {'cumulative':>11} {'self':>9}  module",
+    ]
+    for module in result['modules'][:top]:
+        lines.append(f"  {module['cumulative_ms']:>9.1f}ms {module['self_ms']:>7.1f}ms  {'  ' * module['depth']}{module['module']}")
+
+    lines += ['', 'First request latency:', f"  {'first':>9} {'warm':>9}  status  route"]
+    for req in sorted(result['requests'], key=lambda r: r['first_ms'], reverse=True):
+        lines.append(f"  {req['first_ms']:>7.1f}ms {req['warm_ms']:>7.1f}ms  {str(req['status']):<6}  {req['route']}")
+
+    if result.get('lazy_service_load_ms'):
+        lines += ['', 'Lazily loaded services:']
+        for module, ms in sorted(result['lazy_service_load_ms'].items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"  {ms:>9.1f}ms  {module}")
+
+    return '\n'.join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument('--app', default='complete_app:app', help='WSGI app to boot (module:attr)')
+    parser.add_argument('--route', action='append', dest='routes', default=[],
+                        help='Extra route to time in addition to the defaults (repeatable)')
+    parser.add_argument('--output', help='JSON output path (default perf/startup-<timestamp>.json)')
+    parser.add_argument('--top', type=int, default=25, help='Number of imports to show')
+    parser.add_argument('--no-stub', action='store_true', help='Use real upstream services')
+    parser.set_defaults(func=command)
+
+
+def command(args):
+    try:
+        routes = DEFAULT_ROUTES + [route for route in args.routes if route not in DEFAULT_ROUTES]
+        result = run_startup_profile(app=args.app, routes=routes, stub=not args.no_stub)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    output = args.output or os.path.join(
+        PROJECT_ROOT, 'perf', f"startup-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print(format_report(result, top=args.top))
+    print(f"\nJSON report written to {output}")
+    return 0
@@ -0,0 +1,155 @@
+"""
+WMS fetch layer check against a local stub server.
+
+Starts a stub WMS that answers GetMap with a small JPEG after a fixed
+delay, then measures services.wms_client: the layers for one farm fetched
+one after another versus concurrently over the pooled client, the cost
+of a disk-cache hit, and how many downloads a cluster of nearby farms
+needs once their bboxes are snapped to the shared grid.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from services.tile_cache import TileCache
+from services.wms_client import WMSClient, snap_bbox
+
+# Tiny JPEG payload; the client only checks the Content-Type
+STUB_JPEG = bytes.fromhex(
+    'ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912'
+    '130f141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27393d38323c2e333432ffc0000b080001'
+    '000101011100ffc4001f0000010501010101010100000000000000000102030405060708090a0bffc400b51000020103'
+    '03020403050504040000017d01020300041105122131410613516107227114328191a1082342b1c11552d1f024336272'
+    '82090a161718191a25262728292a3435363738393a434445464748494a535455565758595a636465666768696a737475'
+    '767778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9'
+    'cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9faffda0008010100003f00fbd3ffd9'
+)
+
+LAYERS = ('vegetation', 'truecolor', 'bands121')
+
+
+class StubWMSHandler(BaseHTTPRequestHandler):
+    delay = 0.2
+    requests_seen = []
+
+    def do_GET(self):
+        params = {k.upper(): v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        type(self).requests_seen.append(params)
+        time.sleep(self.delay)
+
+        if params.get('REQUEST') != 'GetMap' or 'LAYERS' not in params:
+            body = b'<ServiceExceptionReport><ServiceException>Bad request</ServiceException></ServiceExceptionReport>'
+            content_type = 'application/vnd.ogc.se_xml'
+        else:
+            body = STUB_JPEG
+            content_type = 'image/jpeg'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_wms(delay):
+    StubWMSHandler.delay = delay
+    StubWMSHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubWMSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/wms"
+
+
+def _farm_bbox(lat, lon, offset=0.002):
+    return (lon - offset, lat - offset, lon + offset, lat + offset)
+
+
+def run_check(delay=0.2, farms=10):
+    server, url = start_stub_wms(delay)
+    cache_dir = tempfile.mkdtemp(prefix='krishi-wms-')
+    try:
+        client = WMSClient(url, cache=TileCache(root=cache_dir))
+        bbox = snap_bbox(_farm_bbox(18.52, 73.85))
+
+        started = time.perf_counter()
+        for layer in LAYERS:
+            client.get_map(layer, bbox, '2024-01-01')
+        sequential_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        tiles = client.fetch_concurrently(lambda layer: client.get_tile(layer, bbox, '2024-01-02'), LAYERS)
+        concurrent_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        cached = client.fetch_concurrently(lambda layer: client.get_tile(layer, bbox, '2024-01-02'), LAYERS)
+        cached_ms = (time.perf_counter() - started) * 1000
+
+        # Farms a few hundred metres apart inside one grid cell
+        before = len(StubWMSHandler.requests_seen)
+        cells = set()
+        for i in range(farms):
+            farm = snap_bbox(_farm_bbox(18.505 + 0.001 * (i % 5), 73.805 + 0.001 * (i // 5)))
+            cells.add(farm)
+            client.fetch_concurrently(lambda layer: client.get_tile(layer, farm, '2024-01-03'), LAYERS)
+        nearby_downloads = len(StubWMSHandler.requests_seen) - before
+
+        first = StubWMSHandler.requests_seen[0]
+        checks = {
+            'getmap_params_ok': first.get('SRS') == 'EPSG:4326' and first.get('TIME') == '2024-01-01',
+            'all_tiles_cached': all(tiles.values()) and tiles == cached,
+            'nearby_farms_share_tiles': nearby_downloads == len(cells) * len(LAYERS),
+        }
+        return {
+            'stub_delay_ms': delay * 1000,
+            'layers': list(LAYERS),
+            'sequential_ms': round(sequential_ms, 1),
+            'concurrent_ms': round(concurrent_ms, 1),
+            'cache_hit_ms': round(cached_ms, 2),
+            'nearby_farms': farms,
+            'grid_cells': len(cells),
+            'nearby_downloads': nearby_downloads,
+            'checks': checks,
+        }
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def format_report(result):
+    lines = [
+        f"WMS fetch check (stub latency {result['stub_delay_ms']:.0f} ms, layers {', '.join(result['layers'])})",
+        f"  sequential fetch : {result['sequential_ms']:>8.1f} ms",
+        f"  concurrent fetch : {result['concurrent_ms']:>8.1f} ms",
+        f"  disk cache hit   : {result['cache_hit_ms']:>8.2f} ms",
+        f"  {result['nearby_farms']} nearby farms -> {result['grid_cells']} grid cell(s), "
+        f"{result['nearby_downloads']} download(s)",
+        '',
+    ]
+    for name, ok in result['checks'].items():
+        lines.append(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return '\n'.join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument('--delay', type=float, default=0.2, help='Stub server latency per request in seconds')
+    parser.add_argument('--farms', type=int, default=10, help='Number of nearby farms to simulate')
+    parser.add_argument('--output', help='Optional JSON output path')
+    parser.set_defaults(func=command)
+
+
+def command(args):
+    result = run_check(delay=args.delay, farms=args.farms)
+    print(format_report(result))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0 if all(result['checks'].values()) else 1
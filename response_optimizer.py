@@ -0,0 +1,116 @@
+"""
+Response compression and conditional GET helpers for the Flask app.
+
+`init_app(app)` installs an after_request hook that gzip- or brotli-encodes
+text, HTML, JSON and JS responses above a size threshold, following the
+client's Accept-Encoding. `conditional` marks JSON endpoints whose payload
+comes from cached data: they get a strong ETag and answer a matching
+If-None-Match with 304, so unchanged data costs only headers on slow
+rural connections.
+"""
+
+import gzip
+import hashlib
+import os
+from functools import wraps
+
+from flask import request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+
+# Suffix appended to a strong ETag when the body is sent encoded (RFC 9110 §8.8.3)
+ENCODING_SUFFIX = {'br': '-br', 'gzip': '-gzip'}
+
+
+def choose_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    offered = {}
+    for part in (accept_encoding or '').split(','):
+        pieces = part.strip().split(';')
+        coding = pieces[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        offered[coding] = q
+
+    wildcard = offered.get('*', 0.0)
+    candidates = (['br'] if BROTLI_AVAILABLE else []) + ['gzip']
+    best = max(candidates, key=lambda c: offered.get(c, wildcard))
+    return best if offered.get(best, wildcard) > 0 else None
+
+
+def compress_response(response):
+    if (response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=min(COMPRESS_LEVEL, 11))
+    else:
+        compressed = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag + ENCODING_SUFFIX[encoding])
+    return response
+
+
+def conditional(view):
+    """Strong ETag + 304 handling for GET JSON endpoints"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from flask import make_response
+
+        response = make_response(view(*args, **kwargs))
+        if request.method != 'GET' or response.status_code != 200:
+            return response
+
+        etag = hashlib.sha256(response.get_data()).hexdigest()[:32]
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+
+        # Accept the tag back in any encoded variant we may have sent
+        variants = {etag} | {etag + suffix for suffix in ENCODING_SUFFIX.values()}
+        if any(tag in request.if_none_match for tag in variants):
+            response.status_code = 304
+            response.set_data(b'')
+            response.headers.pop('Content-Type', None)
+        return response
+    return wrapper
+
+
+def init_app(app):
+    app.after_request(compress_response)
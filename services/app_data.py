@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Private on-disk locations for app state.
+
+Anything the app later trusts (Jinja bytecode, queued mint jobs, pinned
+CIDs) must not live where another local user can create or replace it,
+as a fixed name in the world-writable temp directory would allow. State
+that has to outlive a restart or redeploy goes under KRISHI_DATA_DIR
+(default ~/.local/share/krishi-sahayak, or $XDG_DATA_HOME/krishi-sahayak).
+"""
+
+import os
+import stat
+
+APP_DATA_DIR = os.getenv('KRISHI_DATA_DIR') or os.path.join(
+    os.getenv('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share'),
+    'krishi-sahayak'
+)
+
+
+def private_dir(path):
+    """path as a directory only this user can write, or None if someone else owns it"""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+            return None
+        if stat.S_IMODE(st.st_mode) & 0o077:
+            os.chmod(path, 0o700)
+        return path
+    except OSError:
+        return None
+
+
+def app_data_path(name):
+    """Path for name inside the private app data directory, or None if it is not safe"""
+    directory = private_dir(APP_DATA_DIR)
+    return os.path.join(directory, name) if directory else None
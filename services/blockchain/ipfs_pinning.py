@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Pinata JSON pinning with content-addressed dedupe.
+
+Metadata is serialized canonically (sorted keys, fixed separators) and
+keyed by the SHA-256 of those bytes. CIDs that Pinata has already
+returned are kept in memory and in a small on-disk cache, so pinning the
+same metadata again, for example on a retried request, makes no network
+call at all. Several documents can be pinned at once: the cache misses go
+to Pinata concurrently over one pooled session.
+
+Pin latency and request bytes are counted in `stats`.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.app_data import APP_DATA_DIR, private_dir
+from services.blockchain.merkle import canonical_json
+
+# Cached CIDs get anchored on chain, so only a directory this user owns is trusted;
+# without one, CIDs are remembered in memory only
+PIN_CACHE_DIR = private_dir(os.getenv('IPFS_PIN_CACHE_DIR') or os.path.join(APP_DATA_DIR, 'ipfs-pins'))
+PIN_WORKERS = int(os.getenv('IPFS_PIN_WORKERS', 4))
+
+
+def content_key(metadata):
+    return hashlib.sha256(canonical_json(metadata).encode('utf-8')).hexdigest()
+
+
+class PinningError(Exception):
+    pass
+
+
+class PinataClient:
+    def __init__(self, api_key, secret_key, api_endpoint='https://api.pinata.cloud',
+                 cache_dir=PIN_CACHE_DIR, workers=PIN_WORKERS, timeout=10):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.url = f"{api_endpoint.rstrip('/')}/pinning/pinJSONToIPFS"
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.timeout = timeout
+        self._cids = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self._executor = None
+        self.stats = {'cache_hits': 0, 'pins': 0, 'errors': 0, 'bytes_sent': 0, 'pin_ms_total': 0.0, 'pin_ms_max': 0.0}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ipfs-pin')
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def cached_cid(self, key):
+        cid = self._cids.get(key)
+        if cid or not self.cache_dir:
+            return cid
+        try:
+            with open(self._cache_path(key)) as f:
+                cid = f.read().strip()
+        except OSError:
+            return None
+        self._cids[key] = cid
+        return cid
+
+    def _remember(self, key, cid):
+        self._cids[key] = cid
+        if not self.cache_dir:
+            return
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w') as f:
+            f.write(cid)
+        os.replace(tmp_path, path)
+
+    def _pin(self, key, metadata, body):
+        self._ensure_started()
+        payload = (
+            '{"pinataContent":' + body + ',"pinataMetadata":'
+            + canonical_json({'name': f"crop-passport-{metadata.get('name', 'unknown')}-{datetime.now().isoformat()}",
+                              'keyvalues': {'sha256': key}})
+            + '}'
+        ).encode('utf-8')
+        headers = {
+            'pinata_api_key': self.api_key,
+            'pinata_secret_api_key': self.secret_key,
+            'Content-Type': 'application/json'
+        }
+        started = time.perf_counter()
+        try:
+            response = self._session.post(self.url, data=payload, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            cid = response.json()['IpfsHash']
+        except (requests.RequestException, ValueError, KeyError) as e:
+            self.stats['errors'] += 1
+            raise PinningError(f"Pinata pin failed: {e}") from e
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats['pin_ms_total'] += elapsed_ms
+            self.stats['pin_ms_max'] = max(self.stats['pin_ms_max'], elapsed_ms)
+            self.stats['bytes_sent'] += len(payload)
+
+        self.stats['pins'] += 1
+        self._remember(key, cid)
+        return cid
+
+    def pin_json(self, metadata):
+        """CID for metadata, pinning it only if this content was never pinned before"""
+        return self.pin_many([metadata])[0]
+
+    def pin_many(self, documents):
+        """CIDs for several documents; cache misses are pinned concurrently, duplicates once.
+
+        Raises PinningError if any pin failed, after the others have completed.
+        """
+        keys = [content_key(document) for document in documents]
+        missing = {}
+        for key, document in zip(keys, documents):
+            if self.cached_cid(key):
+                self.stats['cache_hits'] += 1
+            elif key not in missing:
+                missing[key] = document
+
+        if len(missing) == 1:
+            key, document = next(iter(missing.items()))
+            self._pin(key, document, canonical_json(document))
+        elif missing:
+            self._ensure_started()
+            futures = [self._executor.submit(self._pin, key, document, canonical_json(document))
+                       for key, document in missing.items()]
+            # Every pin finishes (and is cached) before a failure is raised, so
+            # callers can still read the CIDs that did pin with cached_cid()
+            errors = [future.exception() for future in futures]
+            failed = [error for error in errors if error is not None]
+            if failed:
+                raise failed[0]
+        return [self.cached_cid(key) for key in keys]
+
+    def summary(self):
+        pins = self.stats['pins'] or 1
+        return dict(self.stats, pin_ms_avg=round(self.stats['pin_ms_total'] / pins, 1))
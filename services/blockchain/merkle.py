@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Merkle trees for batched passport anchoring.
+
+A batch of passports is committed on chain as a single root. Each
+passport keeps its leaf hash and the sibling path up to the root, so it
+can be checked on its own against the anchored root without the rest of
+the batch.
+
+Leaves and inner nodes are hashed with different prefixes (0x00 / 0x01)
+so an inner node can never be passed off as a leaf. An odd node at the
+end of a level is carried up unchanged.
+"""
+
+import hashlib
+import json
+
+
+def canonical_json(data):
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def leaf_hash(data):
+    return hashlib.sha256(b'\x00' + canonical_json(data).encode('utf-8')).hexdigest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(b'\x01' + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def build_levels(leaves):
+    """All levels of the tree, leaves first and [root] last"""
+    if not leaves:
+        raise ValueError('Cannot build a Merkle tree without leaves')
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def proof_path(levels, index):
+    """Sibling hashes from leaf `index` up to the root: [[side, hash]]"""
+    path = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append(['left' if sibling < index else 'right', level[sibling]])
+        index //= 2
+    return path
+
+
+def verify(leaf, path, root):
+    current = leaf
+    for side, sibling in path:
+        current = node_hash(sibling, current) if side == 'left' else node_hash(current, sibling)
+    return current == root
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Persistent queue for passport minting.
+
+A mint request only records a job (SQLite, shared by every gunicorn
+worker on the host) and returns; the passport row starts out as
+"pending". A background worker claims pending jobs, submits their
+transactions without waiting, and polls the receipts of everything in
+flight with one batched RPC call per round, updating the digital_passports
+row once a transaction is mined (or has failed).
+
+With MINT_MODE=batch, passports are not sent one transaction each.
+Pending jobs are collected for up to MINT_BATCH_WINDOW seconds (or until
+MINT_MAX_BATCH have queued); their metadata goes into one manifest pinned
+to IPFS, and a single transaction anchors the batch's Merkle root. Every
+passport row gets its leaf and inclusion proof, so it can be verified
+against the anchored root on its own.
+
+Job states: pending -> submitting -> submitted -> confirmed | failed.
+A job stuck in "submitting" longer than the claim lease (its worker died
+mid-send) is handed back to "pending".
+
+Transactions are signed first and stored with the job (signed_tx) before
+they are broadcast. A send that fails, or times out after the node may
+already have accepted it, is retried by broadcasting that same signed
+transaction again, never by signing a new one, so a passport cannot be
+minted twice under two nonces. Only one process per host runs
+the worker at a time (a lock file next to the database), which keeps the
+account's nonces with a single NonceManager. Workers start the thread
+after fork (gunicorn post_fork), so jobs persisted before a restart are
+resumed straight away; enqueue() also starts it in other setups.
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+
+from services.blockchain import merkle
+from services.blockchain.nonce_manager import is_nonce_error
+from services.app_data import app_data_path
+from services.registry import lazy_import
+
+# Private and persistent: jobs must survive a redeploy, and no other local user may plant them
+MINT_QUEUE_DB = os.getenv('MINT_QUEUE_DB') or app_data_path('mint-queue.sqlite3')
+BATCH_SIZE = int(os.getenv('MINT_BATCH_SIZE', 20))
+POLL_INTERVAL = float(os.getenv('MINT_POLL_INTERVAL', 2.0))
+RECEIPT_TIMEOUT = float(os.getenv('MINT_RECEIPT_TIMEOUT', 300))
+MAX_ATTEMPTS = int(os.getenv('MINT_MAX_ATTEMPTS', 3))
+MINT_MODE = os.getenv('MINT_MODE', 'single')
+BATCH_WINDOW = float(os.getenv('MINT_BATCH_WINDOW', 60))
+MAX_BATCH = int(os.getenv('MINT_MAX_BATCH', 1000))
+CLAIM_LEASE = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mint_jobs (
+    token_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    tx_hash TEXT,
+    block_number INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    submitted_at REAL,
+    proof TEXT,
+    signed_tx TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_mint_jobs_status ON mint_jobs(status, updated_at);
+"""
+
+COLUMNS = ('token_id', 'payload', 'status', 'attempts', 'tx_hash', 'block_number', 'error',
+           'created_at', 'updated_at', 'submitted_at', 'proof', 'signed_tx')
+
+
+def _is_batch_job(job):
+    # Batch mode queues {'metadata': ...}; single mode queues crop/season/ipfs_hash
+    return 'metadata' in job['payload']
+
+
+def update_passport(job):
+    """Default on_update: mirror a job's state into its digital_passports row"""
+    from supabase_models.digital_passport import DigitalPassport
+
+    fields = {'mint_status': 'minted' if job['status'] == 'confirmed' else job['status']}
+    if job.get('tx_hash'):
+        fields['transaction_hash'] = job['tx_hash']
+    if job.get('proof'):
+        # Batched passports live in the batch manifest
+        fields['ipfs_hash'] = job['proof']['manifest']
+        fields['merkle_proof'] = job['proof']
+    if not DigitalPassport.update_by_token_id(job['token_id'], fields):
+        print(f"[mint-queue] no passport row updated for {job['token_id']} ({job['status']})")
+
+
+class MintQueue:
+    def __init__(self, path=MINT_QUEUE_DB, chain=None, on_update=update_passport,
+                 batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL,
+                 receipt_timeout=RECEIPT_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                 mode=MINT_MODE, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.path = path
+        # Anything with sign_mint(payload) and, for batch mode, sign_anchor(root, manifest)
+        # returning a JSON-able signed transaction {'tx_hash', ...; 'manifest' for anchors},
+        # send_signed(signed) -> tx_hash, release_signed(signed, error) and get_receipts(tx_hashes)
+        self.chain = chain or lazy_import('services.blockchain.monad_service', 'monad_service')
+        self.on_update = on_update
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+        self.max_attempts = max_attempts
+        self.mode = mode
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._initialized = False
+        self.stats = {'submitted': 0, 'confirmed': 0, 'failed': 0, 'receipt_polls': 0, 'batches': 0}
+
+    def _connect(self):
+        if not self.path:
+            raise RuntimeError('No private directory for the mint queue; set MINT_QUEUE_DB or KRISHI_DATA_DIR')
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(mint_jobs)')}
+            for column in ('proof', 'signed_tx'):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE mint_jobs ADD COLUMN {column} TEXT')
+            self._initialized = True
+        return conn
+
+    def enqueue(self, token_id, payload):
+        """Record a mint job and wake the worker; returns the job"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO mint_jobs (token_id, payload, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (token_id, json.dumps(payload, sort_keys=True), 'pending', now, now)
+            )
+        finally:
+            conn.close()
+        self.start()
+        self._wake.set()
+        return self.get(token_id)
+
+    def get(self, token_id):
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM mint_jobs WHERE token_id = ?', (token_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._job(row) if row else None
+
+    def counts(self):
+        conn = self._connect()
+        try:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM mint_jobs GROUP BY status').fetchall())
+        finally:
+            conn.close()
+
+    def _job(self, row):
+        job = {column: row[column] for column in COLUMNS}
+        job['payload'] = json.loads(job['payload'])
+        job['proof'] = json.loads(job['proof']) if job['proof'] else None
+        job['signed_tx'] = json.loads(job['signed_tx']) if job['signed_tx'] else None
+        return job
+
+    def _set(self, conn, token_id, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        conn.execute(f"UPDATE mint_jobs SET {assignments} WHERE token_id = ?", (*fields.values(), token_id))
+
+    def _claim(self, conn, limit, window=0):
+        """Atomically move up to `limit` pending jobs to submitting.
+
+        With a window, nothing is claimed until the oldest pending job has
+        waited that long or `limit` jobs are queued.
+        """
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                "UPDATE mint_jobs SET status = 'pending', updated_at = ? WHERE status = 'submitting' AND updated_at < ?",
+                (now, now - CLAIM_LEASE)
+            )
+            rows = []
+            pending, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM mint_jobs WHERE status = 'pending'"
+            ).fetchone()
+            if pending and (pending >= limit or oldest <= now - window):
+                rows = conn.execute(
+                    "SELECT * FROM mint_jobs WHERE status = 'pending' ORDER BY created_at LIMIT ?", (limit,)
+                ).fetchall()
+            for row in rows:
+                conn.execute(
+                    "UPDATE mint_jobs SET status = 'submitting', attempts = attempts + 1, updated_at = ? WHERE token_id = ?",
+                    (now, row['token_id'])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [self._job(row) for row in rows]
+
+    def _finish(self, conn, token_id, **fields):
+        self._set(conn, token_id, **fields)
+        job = self._job(conn.execute('SELECT * FROM mint_jobs WHERE token_id = ?', (token_id,)).fetchone())
+        self.stats[job['status']] += 1
+        self._notify(job)
+
+    def _notify(self, job):
+        if not self.on_update:
+            return
+        try:
+            self.on_update(job)
+        except Exception as e:
+            print(f"[mint-queue] passport update failed for {job['token_id']}: {e}")
+
+    def _submit_failed(self, conn, job, error):
+        if job['attempts'] + 1 < self.max_attempts:
+            # Back to pending; a stored signed_tx is broadcast again, not re-signed
+            self._set(conn, job['token_id'], status='pending', error=str(error))
+        elif job.get('signed_tx'):
+            # The node may have taken it even though the send failed: stop
+            # broadcasting and let the receipt (or its timeout) decide
+            self._set(conn, job['token_id'], status='submitted', submitted_at=time.time(), error=str(error))
+        else:
+            self._finish(conn, job['token_id'], status='failed', error=str(error))
+
+    def _broadcast(self, conn, jobs, signed):
+        """Send one stored signed transaction for jobs; True once the node has it"""
+        resend = all(job['signed_tx'] for job in jobs)
+        try:
+            self.chain.send_signed(signed)
+        except Exception as e:
+            if resend and is_nonce_error(e):
+                # 'already known' / 'nonce too low' for a transaction sent before:
+                # the node has it or has already mined it
+                pass
+            elif is_nonce_error(e):
+                # A new transaction rejected for its nonce never got in: sign again next round
+                self.chain.release_signed(signed, e)
+                for job in jobs:
+                    self._set(conn, job['token_id'], signed_tx=None, tx_hash=None, proof=None)
+                    self._submit_failed(conn, dict(job, signed_tx=None), e)
+                return False
+            else:
+                for job in jobs:
+                    self._submit_failed(conn, dict(job, signed_tx=signed), e)
+                if jobs[0]['attempts'] + 1 >= self.max_attempts:
+                    # No more resends; if the node did take it, the next send hits a nonce error and resyncs
+                    self.chain.release_signed(signed, e)
+                return False
+
+        now = time.time()
+        conn.execute('BEGIN')
+        for job in jobs:
+            self._set(conn, job['token_id'], status='submitted', tx_hash=signed['tx_hash'], submitted_at=now, error=None)
+        conn.execute('COMMIT')
+        self.stats['submitted'] += len(jobs)
+        return True
+
+    def _store_signed(self, conn, jobs, signed, proofs=None):
+        # Written before broadcasting, so a retry can only ever resend this transaction
+        conn.execute('BEGIN')
+        for index, job in enumerate(jobs):
+            fields = {'signed_tx': json.dumps(signed), 'tx_hash': signed['tx_hash']}
+            if proofs:
+                fields['proof'] = json.dumps(proofs[index])
+            self._set(conn, job['token_id'], **fields)
+        conn.execute('COMMIT')
+
+    def submit_pending(self, conn):
+        """Send every claimed job; returns how many were claimed.
+
+        The payload, not the current mode, decides how a job goes out, so
+        jobs queued before MINT_MODE changed still send: {'metadata'} jobs
+        are anchored together, the rest are minted one transaction each.
+        """
+        if self.mode == 'batch':
+            jobs = self._claim(conn, self.max_batch, self.batch_window)
+        else:
+            jobs = self._claim(conn, self.batch_size)
+
+        # Jobs already signed go out again with exactly that transaction
+        signed_groups = {}
+        for job in jobs:
+            if job['signed_tx']:
+                signed_groups.setdefault(job['signed_tx']['tx_hash'], []).append(job)
+        for group in signed_groups.values():
+            if self._broadcast(conn, group, group[0]['signed_tx']) and not _is_batch_job(group[0]):
+                self._notify(dict(group[0], status='submitted'))
+
+        fresh = [job for job in jobs if not job['signed_tx']]
+        for job in fresh:
+            if not _is_batch_job(job):
+                self._submit_single(conn, job)
+        batch = [job for job in fresh if _is_batch_job(job)]
+        if batch and self._anchor(conn, batch):
+            self.stats['batches'] += 1
+        return len(jobs)
+
+    def _submit_single(self, conn, job):
+        try:
+            signed = self.chain.sign_mint(job['payload'])
+        except Exception as e:
+            # Includes payloads sign_mint cannot read: failed once attempts run out
+            self._submit_failed(conn, job, e)
+            return
+        self._store_signed(conn, [job], signed)
+        if self._broadcast(conn, [job], signed):
+            self._notify(dict(job, status='submitted', tx_hash=signed['tx_hash']))
+
+    def _anchor(self, conn, jobs):
+        """Anchor jobs with one manifest pin and one root transaction"""
+        leaves = [merkle.leaf_hash({'token_id': job['token_id'], 'metadata': job['payload']['metadata']}) for job in jobs]
+        levels = merkle.build_levels(leaves)
+        root = levels[-1][0]
+        manifest = {
+            'name': f"passport-batch-{root[:12]}",
+            'merkle_root': root,
+            'leaf': 'sha256(0x00 || canonical JSON of {token_id, metadata})',
+            'passports': [
+                {'token_id': job['token_id'], 'leaf': leaf, 'metadata': job['payload']['metadata']}
+                for job, leaf in zip(jobs, leaves)
+            ]
+        }
+        try:
+            signed = self.chain.sign_anchor(root, manifest)
+        except Exception as e:
+            for job in jobs:
+                self._submit_failed(conn, job, e)
+            return False
+
+        # Rows are written once, on confirmation, with the proof
+        proofs = [{'root': root, 'index': index, 'leaf': leaf,
+                   'path': merkle.proof_path(levels, index), 'manifest': signed['manifest']}
+                  for index, leaf in enumerate(leaves)]
+        self._store_signed(conn, jobs, signed, proofs)
+        return self._broadcast(conn, jobs, signed)
+
+    def poll_receipts(self, conn):
+        """One batched receipt lookup for the oldest in-flight transactions"""
+        tx_hashes = [row[0] for row in conn.execute(
+            "SELECT tx_hash FROM mint_jobs WHERE status = 'submitted' GROUP BY tx_hash "
+            "ORDER BY MIN(submitted_at) LIMIT ?", (self.batch_size,)
+        )]
+        if not tx_hashes:
+            return 0
+        self.stats['receipt_polls'] += 1
+        receipts = self.chain.get_receipts(tx_hashes)
+        settled = 0
+        now = time.time()
+        for tx_hash in tx_hashes:
+            receipt = receipts.get(tx_hash)
+            # A batch anchor settles every passport in it
+            rows = conn.execute(
+                "SELECT token_id, submitted_at FROM mint_jobs WHERE status = 'submitted' AND tx_hash = ?", (tx_hash,)
+            ).fetchall()
+            for row in rows:
+                if receipt:
+                    if receipt['status'] == 1:
+                        self._finish(conn, row['token_id'], status='confirmed', block_number=receipt['block_number'])
+                    else:
+                        self._finish(conn, row['token_id'], status='failed', block_number=receipt['block_number'],
+                                     error='Transaction reverted')
+                    settled += 1
+                elif now - row['submitted_at'] > self.receipt_timeout:
+                    self._finish(conn, row['token_id'], status='failed',
+                                 error=f"Not mined within {self.receipt_timeout:.0f}s")
+                    settled += 1
+        return settled
+
+    def run_once(self):
+        """One worker round: submit newly queued jobs, then poll receipts"""
+        conn = self._connect()
+        try:
+            submitted = self.submit_pending(conn)
+            settled = self.poll_receipts(conn)
+            in_flight = conn.execute(
+                "SELECT COUNT(*) FROM mint_jobs WHERE status IN ('pending', 'submitting', 'submitted')"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return {'submitted': submitted, 'settled': settled, 'in_flight': in_flight}
+
+    def start(self):
+        """Start the worker thread in this process (idempotent, fork-aware)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wake = threading.Event()
+            threading.Thread(target=self._run, name='mint-queue', daemon=True).start()
+
+    def _run(self):
+        with open(self.path + '.lock', 'a') as lock_file:
+            # One submitting worker per host: nonces are allocated in-process, so
+            # the other gunicorn workers wait here and take over if this one exits
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            while True:
+                try:
+                    round_result = self.run_once()
+                except Exception as e:
+                    print(f"[mint-queue] worker round failed: {e}")
+                    traceback.print_exc()
+                    round_result = {'submitted': 0}
+                full_claim = self.max_batch if self.mode == 'batch' else self.batch_size
+                if round_result['submitted'] < full_claim:
+                    # Jobs queued by other processes are seen on the next poll
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+
+
+# Global instance
+mint_queue = MintQueue()
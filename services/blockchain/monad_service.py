@@ -5,11 +5,16 @@ Handles all blockchain interactions for crop passports
 
 import json
 import os
-import requests
 import hashlib
+import uuid
 from datetime import datetime
+import requests
 from dotenv import load_dotenv
 
+from services.blockchain.ipfs_pinning import PinataClient, PinningError, content_key
+from services.blockchain.nonce_manager import NonceManager
+from services.blockchain.rpc import JSONRPCClient
+
 # Try to import web3, fallback to mock if not available
 try:
     from web3 import Web3
@@ -31,8 +36,16 @@ except ImportError:
 # Load environment variables
 load_dotenv()
 
+
+def _hex(value):
+    # HexBytes.hex() dropped the 0x prefix in hexbytes 1.0
+    text = value.hex()
+    return text if text.startswith('0x') else '0x' + text
+
 class MonadBlockchainService:
     def __init__(self):
+        self.rpc = JSONRPCClient(MONAD_TESTNET_CONFIG['rpc_url'])
+        self.nonces = NonceManager(lambda: self.w3.eth.get_transaction_count(self.account.address, 'pending'))
         if WEB3_AVAILABLE:
             try:
                 self.w3 = Web3(Web3.HTTPProvider(MONAD_TESTNET_CONFIG['rpc_url']))
@@ -133,52 +146,54 @@ class MonadBlockchainService:
         except:
             return 1.5  # Mock balance
     
+    def get_status(self):
+        """Connection and account balance in one batched RPC round-trip"""
+        if not WEB3_AVAILABLE or not self.w3:
+            return {'connected': True, 'account': self.account.address, 'balance': 1.5, 'block_number': None}  # Mock status
+        block_number, balance_wei = self.rpc.batch([
+            ('eth_blockNumber', ()),
+            ('eth_getBalance', (self.account.address, 'latest'))
+        ])
+        if isinstance(block_number, Exception):
+            raise block_number
+        return {
+            'connected': True,
+            'account': self.account.address,
+            'balance': None if isinstance(balance_wei, Exception) else int(balance_wei, 16) / 10 ** 18,
+            'block_number': int(block_number, 16)
+        }
+    
     def upload_to_ipfs(self, metadata):
         """Upload passport metadata to IPFS via Pinata"""
-        try:
-            pinata_api_key = os.getenv('PINATA_API_KEY')
-            pinata_secret_key = os.getenv('PINATA_SECRET_KEY')
-            
-            if pinata_api_key and pinata_secret_key:
-                # Try real IPFS upload
-                headers = {
-                    'pinata_api_key': pinata_api_key,
-                    'pinata_secret_api_key': pinata_secret_key,
-                    'Content-Type': 'application/json'
-                }
-                
-                data = {
-                    'pinataContent': metadata,
-                    'pinataMetadata': {
-                        'name': f"crop-passport-{metadata.get('name', 'unknown')}-{datetime.now().isoformat()}"
-                    }
-                }
-                
-                try:
-                    response = requests.post(
-                        'https://api.pinata.cloud/pinning/pinJSONToIPFS',
-                        headers=headers,
-                        json=data,
-                        timeout=10
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        return {'ipfs_hash': result['IpfsHash']}
-                except Exception as e:
-                    print(f"Real IPFS failed, using mock: {e}")
-            
-            # Mock IPFS upload
-            content_hash = hashlib.sha256(json.dumps(metadata).encode()).hexdigest()
-            ipfs_hash = f"Qm{content_hash[:44]}"
-            print(f"Mock IPFS upload: {ipfs_hash}")
-            return {'ipfs_hash': ipfs_hash}
-                
-        except Exception as e:
-            # Fallback to mock
-            content_hash = hashlib.sha256(json.dumps(metadata).encode()).hexdigest()
-            ipfs_hash = f"Qm{content_hash[:44]}"
-            return {'ipfs_hash': ipfs_hash}
+        return self.upload_many_to_ipfs([metadata])[0]
+    
+    def upload_many_to_ipfs(self, documents):
+        """Pin several metadata documents; already pinned content is served from the local CID cache"""
+        pinata = self._get_pinata()
+        cids = [None] * len(documents)
+        if pinata:
+            try:
+                return [{'ipfs_hash': cid} for cid in pinata.pin_many(documents)]
+            except (PinningError, OSError) as e:
+                # Documents that did pin keep their real CIDs; only the failed ones are mocked
+                cids = [pinata.cached_cid(content_key(document)) for document in documents]
+                print(f"Real IPFS failed for {cids.count(None)} of {len(documents)} documents, using mock: {e}")
+        
+        # Mock IPFS upload, addressed by the canonical content hash
+        results = [{'ipfs_hash': cid or f"Qm{content_key(document)[:44]}"} for cid, document in zip(cids, documents)]
+        mocked = [result['ipfs_hash'] for cid, result in zip(cids, results) if not cid]
+        print(f"Mock IPFS upload: {', '.join(mocked)}")
+        return results
+    
+    def _get_pinata(self):
+        pinata_api_key = os.getenv('PINATA_API_KEY')
+        pinata_secret_key = os.getenv('PINATA_SECRET_KEY')
+        if not (pinata_api_key and pinata_secret_key):
+            return None
+        if getattr(self, '_pinata', None) is None:
+            self._pinata = PinataClient(pinata_api_key, pinata_secret_key,
+                                        IPFS_CONFIG.get('api_endpoint', 'https://api.pinata.cloud'))
+        return self._pinata
     
     def create_passport_metadata(self, crop_data, farmer_data):
         """Create standardized metadata for crop passport"""
@@ -201,66 +216,145 @@ class MonadBlockchainService:
         }
     
     def mint_passport(self, crop_data, farmer_data):
-        """Mint a new crop passport NFT"""
+        """Prepare a new crop passport for minting; returns at once with status 'pending'.
+
+        The result's 'mint_job' is handed to queue_mint() once the passport
+        row exists, so the worker never updates a row that is not there yet.
+        """
+        from services.blockchain.mint_queue import mint_queue
+        
         try:
             print(f"Minting passport: {crop_data['crop_type']} - {crop_data['season']}")
             
-            # Create and upload metadata to IPFS
             metadata = self.create_passport_metadata(crop_data, farmer_data)
-            ipfs_result = self.upload_to_ipfs(metadata)
-            
-            if 'error' in ipfs_result:
-                return ipfs_result
+            # Stable id for the passport row and its QR code; the transaction is
+            # submitted and confirmed by the mint queue worker
+            token_id = f"KS-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
             
-            ipfs_hash = ipfs_result['ipfs_hash']
-            
-            if WEB3_AVAILABLE and self.w3:
-                # Real blockchain transaction
-                try:
-                    transaction = {
-                        'from': self.account.address,
-                        'to': self.account.address,
-                        'data': '0x' + f"PASSPORT:{crop_data['crop_type']}:{crop_data['season']}:{ipfs_hash}".encode('utf-8').hex(),
-                        'gas': 50000,
-                        'gasPrice': self.w3.eth.gas_price,
-                        'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                        'chainId': self.chain_id,
-                        'value': 0
-                    }
-                    
-                    signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-                    tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-                    receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-                    
-                    token_id = int(receipt.blockNumber)
-                    tx_hash_hex = receipt.transactionHash.hex()
-                    
-                except Exception as e:
-                    print(f"Real blockchain failed, using mock: {e}")
-                    # Fallback to mock
-                    tx_data = f"{crop_data['crop_type']}{crop_data['season']}{datetime.now().isoformat()}"
-                    tx_hash_hex = f"0x{hashlib.sha256(tx_data.encode()).hexdigest()}"
-                    token_id = int(hashlib.sha256(tx_data.encode()).hexdigest()[:8], 16) % 10000
+            if mint_queue.mode == 'batch':
+                # Pinned with the rest of its batch in one manifest
+                ipfs_hash = None
+                mint_job = {'metadata': metadata}
             else:
-                # Mock blockchain transaction
-                tx_data = f"{crop_data['crop_type']}{crop_data['season']}{datetime.now().isoformat()}"
-                tx_hash_hex = f"0x{hashlib.sha256(tx_data.encode()).hexdigest()}"
-                token_id = int(hashlib.sha256(tx_data.encode()).hexdigest()[:8], 16) % 10000
-            
-            print(f"✅ Passport minted successfully! Token ID: {token_id}")
+                ipfs_result = self.upload_to_ipfs(metadata)
+                
+                if 'error' in ipfs_result:
+                    return ipfs_result
+                
+                ipfs_hash = ipfs_result['ipfs_hash']
+                mint_job = {
+                    'crop_type': crop_data['crop_type'],
+                    'season': crop_data['season'],
+                    'ipfs_hash': ipfs_hash
+                }
             
             return {
                 'success': True,
+                'status': 'pending',
                 'token_id': token_id,
-                'transaction_hash': tx_hash_hex,
+                'transaction_hash': None,
                 'ipfs_hash': ipfs_hash,
-                'explorer_url': f"{MONAD_TESTNET_CONFIG['explorer_url']}/tx/{tx_hash_hex}"
+                'explorer_url': None,
+                'mint_job': mint_job
             }
                 
         except Exception as e:
             print(f"Minting exception: {e}")
             return {'error': f'Minting failed: {str(e)}'}
     
+    def queue_mint(self, mint_result):
+        """Hand a prepared mint (from mint_passport) to the mint queue worker"""
+        from services.blockchain.mint_queue import mint_queue
+        
+        mint_queue.enqueue(mint_result['token_id'], mint_result['mint_job'])
+        print(f"⏳ Passport queued for minting. Token ID: {mint_result['token_id']}")
+    
+    def sign_mint(self, payload):
+        """Signed mint transaction for the mint queue, not yet sent: {'tx_hash', 'raw', 'nonce'}"""
+        return self._sign_data(f"PASSPORT:{payload['crop_type']}:{payload['season']}:{payload['ipfs_hash']}")
+    
+    def sign_anchor(self, merkle_root, manifest):
+        """Pin a batch manifest and sign (not send) the transaction anchoring its root"""
+        ipfs_result = self.upload_to_ipfs(manifest)
+        if 'error' in ipfs_result:
+            raise RuntimeError(ipfs_result['error'])
+        manifest_cid = ipfs_result['ipfs_hash']
+        return dict(self._sign_data(f"ANCHOR:{merkle_root}:{manifest_cid}"), manifest=manifest_cid)
+    
+    def _sign_data(self, tx_data):
+        if not (WEB3_AVAILABLE and self.w3):
+            # Mock blockchain transaction
+            return {'tx_hash': f"0x{hashlib.sha256(tx_data.encode('utf-8')).hexdigest()}", 'raw': None, 'nonce': None}
+        
+        # Allocated locally so several mints can be in flight without colliding
+        nonce = self.nonces.allocate()
+        try:
+            transaction = {
+                'from': self.account.address,
+                'to': self.account.address,
+                'data': '0x' + tx_data.encode('utf-8').hex(),
+                'gas': 50000,
+                'gasPrice': self.w3.eth.gas_price,
+                'nonce': nonce,
+                'chainId': self.chain_id,
+                'value': 0
+            }
+            
+            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
+        except Exception as e:
+            self.nonces.failed(nonce, e)
+            raise
+        raw_transaction = getattr(signed_txn, 'raw_transaction', None) or signed_txn.rawTransaction
+        return {'tx_hash': _hex(signed_txn.hash), 'raw': _hex(raw_transaction), 'nonce': nonce}
+    
+    def send_signed(self, signed):
+        """Broadcast a transaction from sign_mint/sign_anchor; sending the same one again is harmless"""
+        if signed['raw'] is None:
+            return signed['tx_hash']
+        self.w3.eth.send_raw_transaction(signed['raw'])
+        return signed['tx_hash']
+    
+    def release_signed(self, signed, error):
+        """Give up on a signed transaction the node did not take, so its nonce is not left as a gap"""
+        if signed.get('nonce') is not None:
+            self.nonces.failed(signed['nonce'], error)
+    
+    def get_receipts(self, tx_hashes):
+        """{tx_hash: {'status', 'block_number'} or None} for many transactions in one RPC round-trip"""
+        if not (WEB3_AVAILABLE and self.w3):
+            # Mock transactions are mined immediately
+            return {tx_hash: {'status': 1, 'block_number': int(tx_hash[2:10], 16) % 10000} for tx_hash in tx_hashes}
+        return self.rpc.get_receipts(tx_hashes)
+    
+    def anchor_matches(self, tx_hash, merkle_root, manifest_cid):
+        """True if tx_hash is our transaction anchoring exactly this root and manifest"""
+        if not tx_hash:
+            return False
+        tx_data = f"ANCHOR:{merkle_root}:{manifest_cid}"
+        if not (WEB3_AVAILABLE and self.w3):
+            # Mock transaction hashes are the hash of their data
+            return tx_hash == f"0x{hashlib.sha256(tx_data.encode('utf-8')).hexdigest()}"
+        try:
+            transaction = self.rpc.call('eth_getTransactionByHash', tx_hash)
+        except Exception as e:
+            print(f"Anchor lookup failed for {tx_hash}: {e}")
+            return False
+        return bool(transaction) and (
+            transaction.get('from', '').lower() == self.account.address.lower()
+            and transaction.get('input') == '0x' + tx_data.encode('utf-8').hex()
+        )
+    
+    def fetch_from_ipfs(self, cid):
+        """A pinned JSON document from the IPFS gateway, or None"""
+        gateway = IPFS_CONFIG.get('gateway', 'https://gateway.pinata.cloud/ipfs/')
+        try:
+            response = requests.get(f"{gateway.rstrip('/')}/{cid}", timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"IPFS fetch failed for {cid}: {e}")
+            return None
+    
     def get_passport_details(self, token_id):
         """Get passport details from blockchain"""
         try:
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Local nonce allocation for the minting account.
+
+Asking the node for get_transaction_count before every send costs a
+round-trip and hands the same nonce to two concurrent sends. Instead the
+next nonce is read from the chain once (on first use, or after a nonce
+error) and then handed out under a lock, so many transactions can be in
+flight at once.
+
+A nonce that was allocated but never reached the node (the send failed
+for another reason) would leave a gap that stalls every later
+transaction from the account, so it is given back and reused by the next
+allocation before any new nonce.
+"""
+
+import heapq
+import threading
+
+# Node error messages that mean our view of the account nonce is wrong
+NONCE_ERRORS = ('nonce too low', 'nonce too high', 'already known', 'replacement transaction underpriced',
+                'invalid nonce')
+
+
+def is_nonce_error(error):
+    message = str(error).lower()
+    return any(text in message for text in NONCE_ERRORS)
+
+
+class NonceManager:
+    def __init__(self, fetch_pending_nonce):
+        # fetch_pending_nonce() -> the chain's next nonce, counting the mempool
+        self.fetch_pending_nonce = fetch_pending_nonce
+        self._lock = threading.Lock()
+        self._next = None
+        self._gaps = []
+        self.stats = {'allocated': 0, 'gaps_filled': 0, 'syncs': 0}
+
+    def _sync_locked(self):
+        chain_next = int(self.fetch_pending_nonce())
+        self.stats['syncs'] += 1
+        # Returned nonces the chain has since used are no longer gaps
+        self._gaps = [nonce for nonce in self._gaps if nonce >= chain_next]
+        heapq.heapify(self._gaps)
+        self._next = max(chain_next, self._next or 0) if self._gaps else chain_next
+
+    def sync(self):
+        """Re-read the account nonce from the chain"""
+        with self._lock:
+            self._sync_locked()
+
+    def reset(self):
+        """Forget local state; the next allocation syncs from the chain"""
+        with self._lock:
+            self._next = None
+            self._gaps = []
+
+    def allocate(self):
+        with self._lock:
+            if self._next is None:
+                self._sync_locked()
+            self.stats['allocated'] += 1
+            if self._gaps:
+                self.stats['gaps_filled'] += 1
+                return heapq.heappop(self._gaps)
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce):
+        """Give back a nonce whose transaction was never accepted by the node"""
+        with self._lock:
+            if self._next is None:
+                return
+            if nonce == self._next - 1:
+                self._next = nonce
+            elif nonce < self._next and nonce not in self._gaps:
+                heapq.heappush(self._gaps, nonce)
+
+    def failed(self, nonce, error):
+        """Record a failed send: resync on nonce errors, otherwise release the nonce"""
+        if is_nonce_error(error):
+            self.reset()
+        else:
+            self.release(nonce)
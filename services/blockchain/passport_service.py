@@ -6,7 +6,9 @@ import json
 import uuid
 from datetime import datetime
 from supabase_models.digital_passport import DigitalPassport
+from services.blockchain import merkle
 from services.blockchain.monad_service import monad_service
+from services.blockchain.status_monitor import blockchain_status
 
 class PassportService:
     
@@ -43,17 +45,26 @@ class PassportService:
                     'nft_token_id': str(blockchain_result['token_id']),
                     'ipfs_hash': blockchain_result['ipfs_hash'],
                     'transaction_hash': blockchain_result['transaction_hash'],
+                    'mint_status': blockchain_result.get('status', 'minted'),
                     'verified': False
                 }
                 
                 passport = DigitalPassport.create(passport_data)
                 print(f"Passport saved to database: {passport.id if passport else 'Failed'}")
+                if not passport:
+                    return {
+                        'success': False,
+                        'error': 'Failed to save passport'
+                    }
+                
+                # Queued only once the row exists for the worker to update
+                monad_service.queue_mint(blockchain_result)
                 
                 return {
                     'success': True,
                     'passport': passport,
                     'blockchain_data': blockchain_result,
-                    'message': 'Digital passport created and minted on MONAD blockchain!'
+                    'message': 'Digital passport created; minting on MONAD blockchain is in progress'
                 }
             else:
                 # Blockchain failed - return error instead of mock
@@ -105,6 +116,27 @@ class PassportService:
                     }
                 }
             
+            # Queued passports: the row carries the mint state and transaction
+            if not token_id.isdigit():
+                passport = DigitalPassport.get_by_token_id(token_id)
+                if not passport:
+                    return {'success': False, 'error': 'Passport not found'}
+                verified = passport.mint_status == 'minted'
+                data = {
+                    'crop_type': passport.crop_type,
+                    'season': passport.season,
+                    'ipfs_hash': passport.ipfs_hash,
+                    'mint_status': passport.mint_status,
+                    'transaction_hash': passport.transaction_hash
+                }
+                proof = passport.merkle_proof
+                if proof:
+                    # Anchored in a batch: the passport's own leaf must lead to the anchored root
+                    data['merkle_root'] = proof['root']
+                    data['proof_valid'] = PassportService._batch_proof_valid(passport, proof)
+                    verified = verified and data['proof_valid']
+                return {'success': True, 'verified': verified, 'data': data}
+            
             # Try blockchain verification
             blockchain_result = monad_service.get_passport_details(int(token_id))
             
@@ -126,24 +158,45 @@ class PassportService:
                 'error': f'Verification failed: {str(e)}'
             }
     
+    @staticmethod
+    def _batch_proof_valid(passport, proof):
+        """Rebuild the passport's leaf and check it against the root its transaction anchored.
+
+        Nothing stored with the proof is trusted on its own: the root and
+        manifest must be what the passport's transaction put on chain, and
+        the leaf is recomputed from the passport's entry in that manifest.
+        """
+        if not monad_service.anchor_matches(passport.transaction_hash, proof['root'], proof['manifest']):
+            return False
+        manifest = monad_service.fetch_from_ipfs(proof['manifest']) or {}
+        entry = next((item for item in manifest.get('passports', [])
+                      if item.get('token_id') == passport.nft_token_id), None)
+        if not entry:
+            return False
+        attributes = {item.get('trait_type'): item.get('value') for item in entry['metadata'].get('attributes', [])}
+        if (attributes.get('Crop Type'), attributes.get('Season')) != (passport.crop_type, passport.season):
+            return False
+        leaf = merkle.leaf_hash({'token_id': passport.nft_token_id, 'metadata': entry['metadata']})
+        return merkle.verify(leaf, proof['path'], proof['root'])
+    
     @staticmethod
     def get_blockchain_status():
-        """Get current blockchain connection status"""
+        """Get current blockchain connection status (from the background refresher)"""
         try:
-            is_connected = monad_service.is_connected()
+            snapshot = blockchain_status.get()
             
             status = {
-                'connected': is_connected,
+                'connected': snapshot['connected'],
                 'network': 'MONAD Testnet',
-                'chain_id': 41454
+                'chain_id': 41454,
+                'checked_at': snapshot['checked_at'],
+                'stale': snapshot['stale']
             }
             
-            if monad_service.account:
-                balance = monad_service.get_balance(monad_service.account.address)
-                status.update({
-                    'account': monad_service.account.address,
-                    'balance': f"{balance:.4f} MON"
-                })
+            if snapshot.get('account'):
+                status['account'] = snapshot['account']
+            if snapshot.get('balance') is not None:
+                status['balance'] = f"{snapshot['balance']:.4f} MON"
             
             return status
             
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Minimal JSON-RPC client for the MONAD node.
+
+Used for the calls that benefit from batching (receipt polling) or that
+must not go through web3's per-call middleware. One pooled
+requests.Session per process, created lazily so it survives gunicorn's
+preload fork.
+"""
+
+import itertools
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RPCError(Exception):
+    pass
+
+
+class JSONRPCClient:
+    def __init__(self, url, timeout=None, pool_size=4):
+        self.url = url
+        self.timeout = timeout or float(os.getenv('MONAD_RPC_TIMEOUT', 10))
+        self.pool_size = pool_size
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self.stats = {'requests': 0, 'calls': 0, 'errors': 0}
+
+    def _get_session(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def _post(self, payload):
+        self.stats['requests'] += 1
+        try:
+            response = self._get_session().post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.stats['errors'] += 1
+            raise RPCError(f"RPC request failed: {e}") from e
+
+    def call(self, method, *params):
+        self.stats['calls'] += 1
+        reply = self._post({'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': list(params)})
+        if reply.get('error'):
+            self.stats['errors'] += 1
+            raise RPCError(f"{method}: {reply['error'].get('message', reply['error'])}")
+        return reply.get('result')
+
+    def batch(self, calls):
+        """Results for [(method, params)] in one HTTP request; an RPCError in place of failed calls"""
+        if not calls:
+            return []
+        self.stats['calls'] += len(calls)
+        requests_by_id = {next(self._ids): call for call in calls}
+        replies = self._post([
+            {'jsonrpc': '2.0', 'id': call_id, 'method': method, 'params': list(params)}
+            for call_id, (method, params) in requests_by_id.items()
+        ])
+        if isinstance(replies, dict):
+            # Nodes without batch support answer with a single error object
+            raise RPCError(f"Batch rejected: {replies.get('error', replies)}")
+
+        by_id = {reply.get('id'): reply for reply in replies}
+        results = []
+        for call_id, (method, _) in requests_by_id.items():
+            reply = by_id.get(call_id, {'error': {'message': 'missing reply'}})
+            if reply.get('error'):
+                self.stats['errors'] += 1
+                results.append(RPCError(f"{method}: {reply['error'].get('message', reply['error'])}"))
+            else:
+                results.append(reply.get('result'))
+        return results
+
+    def get_receipts(self, tx_hashes):
+        """{tx_hash: {'status', 'block_number'} or None while unmined}, one round-trip"""
+        tx_hashes = list(tx_hashes)
+        results = self.batch([('eth_getTransactionReceipt', (tx_hash,)) for tx_hash in tx_hashes])
+        receipts = {}
+        for tx_hash, result in zip(tx_hashes, results):
+            if isinstance(result, RPCError) or not result:
+                receipts[tx_hash] = None
+                continue
+            receipts[tx_hash] = {
+                'status': int(result.get('status') or '0x1', 16),
+                'block_number': int(result['blockNumber'], 16),
+            }
+        return receipts
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Blockchain status kept fresh in the background.
+
+Page renders used to ask the node whether it is connected and what the
+minting account's balance is, two live RPC calls before any HTML. A
+daemon thread now refreshes that snapshot every BLOCKCHAIN_STATUS_INTERVAL
+seconds and requests read it from memory, with the time it was taken, so
+a slow or unreachable node only ever delays the refresher.
+
+The thread starts in each worker after gunicorn's fork (post_fork), or
+lazily on the first read in other setups.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from services.registry import lazy_import
+
+STATUS_INTERVAL = float(os.getenv('BLOCKCHAIN_STATUS_INTERVAL', 30))
+
+monad_service = lazy_import('services.blockchain.monad_service', 'monad_service')
+
+
+class BlockchainStatusMonitor:
+    def __init__(self, fetch=None, interval=STATUS_INTERVAL):
+        # fetch() -> {'connected': bool, 'balance': float or None}
+        self.fetch = fetch or (lambda: monad_service.get_status())
+        self.interval = interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self.stats = {'refreshes': 0, 'errors': 0, 'last_refresh_ms': None}
+
+    def refresh(self):
+        started = time.perf_counter()
+        try:
+            status = dict(self.fetch())
+        except Exception as e:
+            self.stats['errors'] += 1
+            status = {'connected': False, 'error': str(e)}
+            # Keep the last known account and balance rather than blanking them
+            for key in ('account', 'balance'):
+                if self._snapshot and self._snapshot.get(key) is not None:
+                    status[key] = self._snapshot[key]
+        self.stats['refreshes'] += 1
+        self.stats['last_refresh_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        status['checked_at'] = time.time()
+        self._snapshot = status
+        return status
+
+    def start(self):
+        """Start the refresher in this process (idempotent, fork-aware)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._snapshot = None
+            threading.Thread(target=self._run, name='blockchain-status', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+
+    def get(self):
+        """Latest snapshot plus its age; never waits on the node"""
+        self.start()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'connected': None, 'balance': None, 'checked_at': None, 'age_seconds': None, 'stale': True}
+        age = time.time() - snapshot['checked_at']
+        return dict(
+            snapshot,
+            checked_at=datetime.fromtimestamp(snapshot['checked_at']).isoformat(timespec='seconds'),
+            age_seconds=round(age, 1),
+            stale=age > 2 * self.interval
+        )
+
+
+# Global instance
+blockchain_status = BlockchainStatusMonitor()
@@ -6,8 +6,12 @@ import json
 import uuid
 from datetime import datetime
 from supabase_models.digital_passport import DigitalPassport
-from services.blockchain.monad_service import monad_service
+from services.registry import lazy_import
+
+# web3 and the RPC provider are only set up when a blockchain call is made
+monad_service = lazy_import('services.blockchain.monad_service', 'monad_service')
 from services.qr_service import generate_qr_code
+from services.blockchain.status_monitor import blockchain_status
 
 class WorkingPassportService:
     
@@ -134,13 +138,14 @@ class WorkingPassportService:
             }
     
     @staticmethod
-    def get_user_passports(user_id):
-        """Get all passports for a user"""
+    def get_user_passports(user_id, limit=12, cursor=None):
+        """Get a page of passports for a user"""
         try:
-            passports = DigitalPassport.get_by_farmer_id(user_id)
+            passports, next_cursor = DigitalPassport.get_page_by_farmer_id(user_id, limit=limit, cursor=cursor)
             return {
                 'success': True,
-                'passports': passports
+                'passports': passports,
+                'next_cursor': next_cursor
             }
         except Exception as e:
             return {
@@ -152,7 +157,7 @@ class WorkingPassportService:
     def verify_passport(token_id):
         """Verify a passport"""
         try:
-            passport = DigitalPassport.get_by_token_id(token_id)
+            passport = DigitalPassport.get_cached_by_token_id(token_id)
             
             if passport:
                 return {
@@ -182,24 +187,24 @@ class WorkingPassportService:
     
     @staticmethod
     def get_blockchain_status():
-        """Get current system status"""
+        """Get current system status (from the background refresher, never a live RPC call)"""
         try:
-            is_connected = monad_service.is_connected()
+            snapshot = blockchain_status.get()
             
             status = {
-                'connected': is_connected,
+                'connected': snapshot['connected'],
                 'network': 'MONAD Testnet',
                 'chain_id': 10143,
                 'ipfs_enabled': True,
-                'database_enabled': True
+                'database_enabled': True,
+                'checked_at': snapshot['checked_at'],
+                'stale': snapshot['stale']
             }
             
-            if monad_service.account:
-                balance = monad_service.get_balance(monad_service.account.address)
-                status.update({
-                    'account': monad_service.account.address,
-                    'balance': f"{balance:.4f} MON"
-                })
+            if snapshot.get('account'):
+                status['account'] = snapshot['account']
+            if snapshot.get('balance') is not None:
+                status['balance'] = f"{snapshot['balance']:.4f} MON"
             
             return status
             
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+In-process caches for the community feed.
+
+Feed pages are stored against a version counter. Every write path in
+CommunityService (new post, new reply, votes) bumps the version, which
+invalidates all cached pages at once. Pages also carry a short max age
+so writes made by another gunicorn worker show up without a restart.
+"""
+
+import os
+import threading
+import time
+
+
+class FeedCache:
+    """Versioned cache of rendered feed pages keyed by (category, cursor)"""
+
+    def __init__(self, max_age=None, max_entries=256):
+        self.max_age = max_age if max_age is not None else int(os.getenv('COMMUNITY_FEED_MAX_AGE', 60))
+        self.max_entries = max_entries
+        self.version = 0
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get(self, category, cursor):
+        with self._lock:
+            entry = self._pages.get((category, cursor))
+            if not entry:
+                return None
+            version, stored_at, value = entry
+            if version != self.version or time.time() - stored_at > self.max_age:
+                del self._pages[(category, cursor)]
+                return None
+            return value
+
+    def set(self, category, cursor, value):
+        with self._lock:
+            if len(self._pages) >= self.max_entries:
+                oldest = min(self._pages, key=lambda key: self._pages[key][1])
+                del self._pages[oldest]
+            self._pages[(category, cursor)] = (self.version, time.time(), value)
+
+    def bump(self):
+        """Invalidate every cached page"""
+        with self._lock:
+            self.version += 1
+            self._pages.clear()
+            return self.version
+
+
+class TTLValue:
+    """A single cached value with a long time-to-live"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._value = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, loader):
+        with self._lock:
+            if self._value is None or time.time() - self._loaded_at > self.ttl:
+                value = loader()
+                if value is not None:
+                    self._value = value
+                    self._loaded_at = time.time()
+            return self._value
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+            self._loaded_at = 0
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Full-text search for community posts.
+
+Keeps an in-process inverted index over post titles, content and replies,
+ranked with BM25. Tokenization is Unicode aware so Devanagari and other
+Indic scripts keep their vowel signs and viramas inside a word instead of
+being split apart. Writes in this process update the index directly;
+writes made by other worker processes are picked up when the index is
+rebuilt after COMMUNITY_SEARCH_TTL seconds. That rebuild runs in a
+background thread and swaps in a fresh index, so searches keep being
+served from the previous one; only the very first build blocks. Set
+COMMUNITY_SEARCH_BACKEND=postgres to delegate to the
+`search_community_posts` RPC (see community_schema.sql) instead.
+"""
+
+import base64
+import json
+import math
+import os
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+# Zero-width joiners show up inside Indic words typed on phone keyboards
+_IGNORED_CHARS = {'‌', '‍', '﻿'}
+
+STOPWORDS = {
+    # English
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how',
+    'in', 'is', 'it', 'of', 'on', 'or', 'the', 'to', 'was', 'what', 'with',
+    # Hindi
+    'का', 'की', 'के', 'को', 'में', 'है', 'हैं', 'से', 'पर', 'और', 'भी',
+    'यह', 'वह', 'था', 'थी', 'थे', 'एक', 'लिए', 'क्या', 'कैसे', 'तो', 'ही',
+    'ने', 'हो', 'कर', 'करें', 'जो', 'मैं', 'हम', 'आप',
+}
+
+TITLE_BOOST = 2
+PAGE_SIZE = 20
+INDEX_TTL = int(os.getenv('COMMUNITY_SEARCH_TTL', 60))
+
+
+def tokenize(text):
+    """Split text into normalized search tokens.
+
+    Letters, digits and combining marks (matras, nukta, virama) form words;
+    everything else is a separator. Text is NFC-normalized and casefolded so
+    decomposed input and Latin case variants match the same token.
+    """
+    if not text:
+        return []
+
+    text = unicodedata.normalize('NFC', str(text)).casefold()
+    tokens = []
+    current = []
+
+    for char in text:
+        if char in _IGNORED_CHARS:
+            continue
+        category = unicodedata.category(char)
+        if category[0] in ('L', 'N', 'M'):
+            current.append(char)
+        elif current:
+            tokens.append(''.join(current))
+            current = []
+    if current:
+        tokens.append(''.join(current))
+
+    return [token for token in tokens if token not in STOPWORDS and not _is_lone_mark(token)]
+
+
+def _is_lone_mark(token):
+    return all(unicodedata.category(char)[0] == 'M' for char in token)
+
+
+def encode_cursor(score, post_id):
+    """Opaque cursor pointing just past (score, post_id) in ranked order"""
+    raw = json.dumps([round(score, 6), str(post_id)]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor; returns None if malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, post_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return float(score), str(post_id)
+    except Exception:
+        return None
+
+
+class CommunitySearchIndex:
+    """BM25 inverted index over community posts and their replies"""
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)   # term -> {post_id: term frequency}
+        self._doc_terms = {}                 # post_id -> {term: term frequency}
+        self._doc_lengths = {}               # post_id -> token count
+        self._posts = {}                     # post_id -> post row
+        self._total_length = 0
+        self.loaded = False
+        self.loaded_at = 0.0
+
+    def __len__(self):
+        return len(self._doc_lengths)
+
+    def add_post(self, post):
+        """Index (or re-index) a post row"""
+        post_id = str(post['id'])
+        tokens = tokenize(post.get('title')) * TITLE_BOOST + tokenize(post.get('content'))
+
+        with self._lock:
+            self._remove(post_id)
+            self._posts[post_id] = post
+            self._add_tokens(post_id, tokens)
+
+    def add_reply(self, reply):
+        """Fold a reply's text into its parent post's document"""
+        post_id = str(reply.get('post_id'))
+        with self._lock:
+            if post_id not in self._doc_lengths:
+                return
+            self._add_tokens(post_id, tokenize(reply.get('content')))
+
+    def remove_post(self, post_id):
+        with self._lock:
+            self._remove(str(post_id))
+
+    def update_post(self, post_id, fields):
+        """Merge changed columns (e.g. vote counts) into the stored row"""
+        with self._lock:
+            post = self._posts.get(str(post_id))
+            if post is not None:
+                post.update(fields)
+
+    def _add_tokens(self, post_id, tokens):
+        terms = self._doc_terms.setdefault(post_id, {})
+        for token in tokens:
+            terms[token] = terms.get(token, 0) + 1
+        for token, freq in terms.items():
+            self._postings[token][post_id] = freq
+
+        self._doc_lengths[post_id] = self._doc_lengths.get(post_id, 0) + len(tokens)
+        self._total_length += len(tokens)
+
+    def _remove(self, post_id):
+        terms = self._doc_terms.pop(post_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(post_id, None)
+                if not postings:
+                    del self._postings[token]
+        self._total_length -= self._doc_lengths.pop(post_id, 0)
+        self._posts.pop(post_id, None)
+
+    def search(self, query, category=None, limit=PAGE_SIZE, cursor=None):
+        """Rank posts for a query; returns (posts, next_cursor)"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], None
+
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count:
+                return [], None
+            avg_length = self._total_length / doc_count
+
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for post_id, freq in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[post_id] / avg_length)
+                    scores[post_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+            if category and category != 'all':
+                scores = {pid: s for pid, s in scores.items()
+                          if self._posts[pid].get('category') == category}
+
+            ranked = sorted(scores.items(), key=lambda item: (-round(item[1], 6), item[0]))
+
+            after = decode_cursor(cursor)
+            if after:
+                last_score, last_id = after
+                ranked = [(pid, s) for pid, s in ranked
+                          if (-round(s, 6), pid) > (-last_score, last_id)]
+
+            page = ranked[:limit]
+            posts = [dict(self._posts[pid], search_score=round(score, 4)) for pid, score in page]
+
+        next_cursor = None
+        if len(ranked) > limit and page:
+            next_cursor = encode_cursor(page[-1][1], page[-1][0])
+        return posts, next_cursor
+
+    def rebuild(self, posts, replies):
+        """Replace the index contents with a full snapshot"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._posts.clear()
+            self._total_length = 0
+            for post in posts:
+                self.add_post(post)
+            for reply in replies:
+                self.add_reply(reply)
+            self.loaded = True
+            self.loaded_at = time.time()
+
+    def is_stale(self, ttl):
+        return not self.loaded or time.time() - self.loaded_at >= ttl
+
+
+class CommunitySearch:
+    """Search front-end used by CommunityService"""
+
+    BATCH_SIZE = 500
+
+    def __init__(self, ttl=INDEX_TTL):
+        self.backend = os.getenv('COMMUNITY_SEARCH_BACKEND', 'local')
+        self.ttl = ttl
+        self.index = CommunitySearchIndex()
+        self._load_lock = threading.Lock()
+        # Writes made while a rebuild is fetching, replayed onto the new index
+        self._missed = None
+        self._missed_lock = threading.Lock()
+
+    def search(self, supabase, query, category=None, limit=PAGE_SIZE, cursor=None):
+        if self.backend == 'postgres':
+            return self._search_postgres(supabase, query, category, limit, cursor)
+
+        if not self.index.loaded:
+            # Nothing to serve yet: the first build is waited for
+            self._refresh(supabase)
+        elif self.index.is_stale(self.ttl):
+            self._refresh_in_background(supabase)
+        return self.index.search(query, category=category, limit=limit, cursor=cursor)
+
+    def _refresh(self, supabase):
+        # One rebuild at a time; requests that waited on it reuse the fresh index
+        with self._load_lock:
+            if self.index.is_stale(self.ttl):
+                self.load(supabase)
+
+    def _refresh_in_background(self, supabase):
+        if not self._load_lock.acquire(blocking=False):
+            return  # already rebuilding
+
+        def run():
+            try:
+                self.load(supabase)
+            except Exception as e:
+                # Keep serving the old index and try again after another TTL
+                self.index.loaded_at = time.time()
+                print(f"Community search index rebuild failed: {e}")
+            finally:
+                self._load_lock.release()
+
+        threading.Thread(target=run, name='community-search-rebuild', daemon=True).start()
+
+    def load(self, supabase):
+        """Build the local index from the community tables and swap it in"""
+        with self._missed_lock:
+            self._missed = []
+        try:
+            posts = self._fetch_all(supabase, 'community_posts', '*')
+            replies = self._fetch_all(supabase, 'community_replies', 'post_id, content')
+            index = CommunitySearchIndex(k1=self.index.k1, b=self.index.b)
+            index.rebuild(posts, replies)
+            with self._missed_lock:
+                for apply in self._missed:
+                    apply(index)
+                # A single reference swap: searches see either the old or the new index
+                self.index = index
+        finally:
+            with self._missed_lock:
+                self._missed = None
+        print(f"Community search index built: {len(self.index)} posts")
+
+    def _fetch_all(self, supabase, table, columns):
+        rows = []
+        start = 0
+        while True:
+            result = supabase.table(table).select(columns).order('id').range(start, start + self.BATCH_SIZE - 1).execute()
+            rows.extend(result.data or [])
+            if len(result.data or []) < self.BATCH_SIZE:
+                return rows
+            start += self.BATCH_SIZE
+
+    def _search_postgres(self, supabase, query, category, limit, cursor):
+        after = decode_cursor(cursor)
+        params = {
+            'search_query': ' '.join(tokenize(query)),
+            'search_category': category if category and category != 'all' else None,
+            'result_limit': limit + 1,
+            'after_rank': after[0] if after else None,
+            'after_id': after[1] if after else None,
+        }
+        rows = supabase.rpc('search_community_posts', params).execute().data or []
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['search_score'], rows[-1]['id'])
+        return rows, next_cursor
+
+    # Incremental updates from CommunityService write paths
+    def on_post_created(self, post):
+        if self.backend == 'local' and post:
+            self._apply(lambda index: index.add_post(post))
+
+    def on_reply_created(self, reply):
+        if self.backend == 'local' and reply:
+            self._apply(lambda index: index.add_reply(reply))
+
+    def on_post_updated(self, post_id, fields):
+        if self.backend == 'local':
+            self._apply(lambda index: index.update_post(post_id, fields))
+
+    def _apply(self, change):
+        with self._missed_lock:
+            if self.index.loaded:
+                change(self.index)
+            if self._missed is not None:
+                # The rebuild's snapshot may predate this write
+                self._missed.append(change)
+
+
+# Global instance
+community_search = CommunitySearch()
@@ -1,34 +1,75 @@
 #!/usr/bin/env python3
 import os
+import time
 import requests
 from datetime import datetime, timedelta
-from supabase import create_client, Client
+from supabase import Client
+from config.database import get_supabase_client
+from services.community_search import community_search
+from services.community_cache import FeedCache, TTLValue
+from services.task_queue import TaskQueue
+from supabase_models.pagination import apply_keyset, split_page
+
+CATEGORIES_TTL = 6 * 60 * 60  # Categories are effectively static
+# How long after posting a question without an AI reply still counts as pending
+AI_REPLY_PENDING_WINDOW = int(os.getenv('AI_REPLY_PENDING_WINDOW', 300))
+
+# AI replies are generated off the request path; Groq rate limits keep concurrency low
+ai_reply_queue = TaskQueue(
+    'ai-replies',
+    concurrency=int(os.getenv('AI_REPLY_WORKERS', 2)),
+    max_retries=int(os.getenv('AI_REPLY_RETRIES', 3))
+)
 
 class CommunityService:
     def __init__(self):
-        self.supabase_url = os.getenv('SUPABASE_URL', 'https://your-project.supabase.co')
-        self.supabase_key = os.getenv('SUPABASE_ANON_KEY', 'your-anon-key')
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        self.supabase: Client = get_supabase_client()
         self.groq_api_key = os.getenv('GROQ_API_KEY')
+        self.feed_cache = FeedCache()
+        self._categories = TTLValue(CATEGORIES_TTL)
+        self.ai_reply_status = {}
 
-    def get_posts(self, category=None, limit=20, offset=0):
-        """Get community posts with pagination"""
+    def get_posts(self, category=None, limit=20, cursor=None):
+        """Get community posts with keyset pagination"""
         try:
             query = self.supabase.table('community_posts').select('*')
             
             if category and category != 'all':
                 query = query.eq('category', category)
             
-            result = query.order('created_at', desc=True).range(offset, offset + limit - 1).execute()
+            result = apply_keyset(query, cursor, limit).execute()
+            posts, next_cursor = split_page(result.data, limit)
             
             return {
                 'success': True,
-                'posts': result.data,
-                'count': len(result.data)
+                'posts': posts,
+                'count': len(posts),
+                'next_cursor': next_cursor
             }
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def get_feed_page(self, category='all', cursor=None, per_page=10):
+        """Get a feed page with farmer info, served from cache until content changes"""
+        cached = self.feed_cache.get(category, cursor)
+        if cached is not None:
+            posts, next_cursor = cached
+            return {'success': True, 'posts': posts, 'count': len(posts), 'next_cursor': next_cursor, 'cached': True}
+        
+        result = self.get_posts(category=category, limit=per_page, cursor=cursor)
+        if not result['success']:
+            return result
+        
+        posts = result['posts']
+        for post in posts:
+            farmer_info = self.get_farmer_info(post['farmer_id'])
+            post['farmer_name'] = farmer_info['name']
+            post['farmer_place'] = farmer_info['place']
+            post['is_ai'] = farmer_info['is_ai']
+        
+        self.feed_cache.set(category, cursor, (posts, result['next_cursor']))
+        return {'success': True, 'posts': posts, 'count': len(posts), 'next_cursor': result['next_cursor'], 'cached': False}
+
     def create_post(self, farmer_id, title, content, category='general', tags=None, is_question=True):
         """Create a new community post"""
         try:
@@ -44,10 +85,14 @@ class CommunityService:
             
             result = self.supabase.table('community_posts').insert(post_data).execute()
             
-            # Generate AI response if it's a question
+            if result.data:
+                community_search.on_post_created(result.data[0])
+                self.feed_cache.bump()
+            
+            # Queue an AI response if it's a question
             if is_question and result.data:
                 post_id = result.data[0]['id']
-                self._generate_ai_response(post_id, title, content, category)
+                self.queue_ai_response(post_id, title, content, category)
             
             return {
                 'success': True,
@@ -88,6 +133,10 @@ class CommunityService:
             
             result = self.supabase.table('community_replies').insert(reply_data).execute()
             
+            if result.data:
+                community_search.on_reply_created(result.data[0])
+                self.feed_cache.bump()
+            
             return {
                 'success': True,
                 'reply': result.data[0] if result.data else None
@@ -115,6 +164,7 @@ class CommunityService:
             
             # Update post vote counts
             self._update_post_votes(post_id)
+            self.feed_cache.bump()
             
             return {'success': True}
         except Exception as e:
@@ -140,79 +190,128 @@ class CommunityService:
             
             # Update reply vote counts
             self._update_reply_votes(reply_id)
+            self.feed_cache.bump()
             
             return {'success': True}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
     def get_categories(self):
-        """Get all community categories"""
+        """Get all community categories (cached with a long TTL)"""
         try:
-            result = self.supabase.table('community_categories').select('*').order('name').execute()
+            categories = self._categories.get(self._load_categories)
             return {
                 'success': True,
-                'categories': result.data
+                'categories': categories or []
             }
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def search_posts(self, query, category=None):
-        """Search posts by title and content"""
+    def _load_categories(self):
+        result = self.supabase.table('community_categories').select('*').order('name').execute()
+        return result.data
+
+    def search_posts(self, query, category=None, limit=20, cursor=None):
+        """Search posts by title, content and replies, ranked by relevance"""
         try:
-            # Simple text search (Supabase full-text search would be better)
-            search_query = self.supabase.table('community_posts').select('*')
-            
-            if category and category != 'all':
-                search_query = search_query.eq('category', category)
-            
-            # Use ilike for case-insensitive search
-            search_query = search_query.or_(f'title.ilike.%{query}%,content.ilike.%{query}%')
-            
-            result = search_query.order('created_at', desc=True).execute()
+            posts, next_cursor = community_search.search(
+                self.supabase, query, category=category, limit=limit, cursor=cursor
+            )
             
             return {
                 'success': True,
-                'posts': result.data
+                'posts': posts,
+                'next_cursor': next_cursor
             }
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def _generate_ai_response(self, post_id, title, content, category):
-        """Generate AI response for a question"""
+    def queue_ai_response(self, post_id, title, content, category):
+        """Generate the AI reply in the background so posting returns immediately"""
+        if not self.groq_api_key:
+            return
+        self._prune_ai_reply_status()
+        self.ai_reply_status[str(post_id)] = ('pending', time.time())
+        if not ai_reply_queue.submit(self._generate_ai_response, post_id, title, content, category,
+                                     on_failure=self._ai_response_failed):
+            self.ai_reply_status[str(post_id)] = ('failed', time.time())
+
+    def get_ai_reply_status(self, post_id):
+        """Status of the AI reply for a post: pending, ready, failed or none"""
+        entry = self.ai_reply_status.get(str(post_id))
+        if entry and entry[0] == 'pending':
+            return 'pending'
+        if entry:
+            # Failures are reported once; 'ready' is in the database from here on
+            self.ai_reply_status.pop(str(post_id), None)
+            return entry[0]
+        
+        # Posted through another worker (or before a restart); fall back to the database
+        try:
+            result = self.supabase.table('community_replies').select('id').eq('post_id', post_id).eq('is_ai_response', True).limit(1).execute()
+            if result.data:
+                return 'ready'
+            post = self.supabase.table('community_posts').select('is_question, created_at').eq('id', post_id).limit(1).execute()
+            if self.groq_api_key and post.data and post.data[0].get('is_question') and self._is_recent(post.data[0].get('created_at')):
+                return 'pending'
+            return 'none'
+        except Exception:
+            return 'none'
+
+    @staticmethod
+    def _is_recent(created_at):
         try:
-            # Create farming expert prompt
-            prompt = f"""आप एक कृषि विशेषज्ञ हैं। एक किसान ने यह सवाल पूछा है:
+            created = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            return False
+        now = datetime.now(created.tzinfo) if created.tzinfo else datetime.now()
+        return now - created < timedelta(seconds=AI_REPLY_PENDING_WINDOW)
+
+    def _prune_ai_reply_status(self):
+        cutoff = time.time() - AI_REPLY_PENDING_WINDOW
+        for post_id, (_, updated) in list(self.ai_reply_status.items()):
+            if updated < cutoff:
+                self.ai_reply_status.pop(post_id, None)
+
+    def _ai_response_failed(self, post_id, title, content, category):
+        self.ai_reply_status[str(post_id)] = ('failed', time.time())
+
+    def _generate_ai_response(self, post_id, title, content, category):
+        """Generate AI response for a question (runs on the ai-replies queue)"""
+        # Create farming expert prompt
+        prompt = f"""आप एक कृषि विशेषज्ञ हैं। एक किसान ने यह सवाल पूछा है:
 
 शीर्षक: {title}
 सवाल: {content}
 श्रेणी: {category}
 
 कृपया हिंदी में व्यावहारिक और उपयोगी सलाह दें। 3-4 वाक्यों में जवाब दें।"""
-            
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.groq_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "llama-3.2-90b-text-preview",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 200,
-                "temperature": 0.8
-            }
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()
-                ai_response = result['choices'][0]['message']['content']
-                
-                # Create AI reply
-                self.create_reply(post_id, 'ai-moderator', ai_response, is_ai_response=True)
-            
-        except Exception as e:
-            print(f"AI response generation failed: {e}")
+        
+        url = "https://api.groq.com/openai/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.groq_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": "llama-3.2-90b-text-preview",
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 200,
+            "temperature": 0.8
+        }
+        
+        # Errors propagate so the queue can retry with backoff
+        response = requests.post(url, json=payload, headers=headers, timeout=10)
+        response.raise_for_status()
+        ai_response = response.json()['choices'][0]['message']['content']
+        
+        # Create AI reply
+        reply = self.create_reply(post_id, 'ai-moderator', ai_response, is_ai_response=True)
+        if not reply['success']:
+            raise RuntimeError(reply['error'])
+        
+        # The reply is in the database now, which is where other workers look too
+        self.ai_reply_status.pop(str(post_id), None)
 
     def _update_post_votes(self, post_id):
         """Update post vote counts"""
@@ -222,10 +321,12 @@ class CommunityService:
             downvotes = self.supabase.table('community_votes').select('*').eq('post_id', post_id).eq('vote_type', 'downvote').execute()
             
             # Update post
-            self.supabase.table('community_posts').update({
+            counts = {
                 'upvotes': len(upvotes.data),
                 'downvotes': len(downvotes.data)
-            }).eq('id', post_id).execute()
+            }
+            self.supabase.table('community_posts').update(counts).eq('id', post_id).execute()
+            community_search.on_post_updated(post_id, counts)
             
         except Exception as e:
             print(f"Vote update failed: {e}")
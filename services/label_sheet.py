@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Bulk QR label sheets for cooperatives.
+
+Turns a list of passports into a multi-up A4 PDF (3 x 7 labels per page,
+the common 63.5 x 38.1 mm adhesive sheet). QR encoding and PNG rendering,
+the expensive part, runs in chunks on a process pool; the parent then
+places the finished images with one ReportLab canvas.
+
+Small sheets are built inline. Larger ones run as background jobs whose
+progress is kept in a small JSON file next to the output, so a status
+poll that lands on any gunicorn worker sees the same job. Job files older
+than LABEL_SHEET_TTL seconds are removed whenever a new job starts.
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from io import BytesIO
+
+from services.task_queue import TaskQueue
+
+LABEL_SHEET_DIR = os.getenv('LABEL_SHEET_DIR') or os.path.join(tempfile.gettempdir(), 'krishi-label-sheets')
+LABEL_SHEET_WORKERS = int(os.getenv('LABEL_SHEET_WORKERS', min(4, os.cpu_count() or 1)))
+MAX_LABELS = int(os.getenv('LABEL_SHEET_MAX', 1000))
+# Sheets up to this many labels are returned directly instead of as a job
+INLINE_LIMIT = int(os.getenv('LABEL_SHEET_INLINE_LIMIT', 42))
+JOB_TTL = int(os.getenv('LABEL_SHEET_TTL', 24 * 60 * 60))
+CHUNK_SIZE = 21  # one page
+
+COLUMNS = 3
+ROWS = 7
+LABEL_WIDTH_MM = 63.5
+LABEL_HEIGHT_MM = 38.1
+COLUMN_GAP_MM = 2.5
+TOP_MARGIN_MM = 15.15
+LEFT_MARGIN_MM = 7.25
+
+label_sheet_queue = TaskQueue('label-sheets', concurrency=1, max_retries=0, max_pending=20)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def render_qr_chunk(labels):
+    """Process pool task: [(index, url)] -> [(index, png_bytes)]"""
+    import qrcode
+
+    rendered = []
+    for index, url in labels:
+        qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=6, border=1)
+        qr.add_data(url)
+        qr.make(fit=True)
+        buffer = BytesIO()
+        qr.make_image(fill_color='black', back_color='white').save(buffer, format='PNG')
+        rendered.append((index, buffer.getvalue()))
+    return rendered
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: forking a threaded web worker is unsafe
+            _pool = ProcessPoolExecutor(max_workers=LABEL_SHEET_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def render_qr_codes(urls, progress=None):
+    """PNG bytes for every URL, in order; progress(done, total) after each chunk"""
+    chunks = [list(enumerate(urls))[start:start + CHUNK_SIZE] for start in range(0, len(urls), CHUNK_SIZE)]
+    images = [None] * len(urls)
+    if len(chunks) <= 1 or LABEL_SHEET_WORKERS <= 1:
+        done = 0
+        for chunk in chunks:
+            for index, png in render_qr_chunk(chunk):
+                images[index] = png
+            done += len(chunk)
+            if progress:
+                progress(done, len(urls))
+        return images
+
+    done = 0
+    for future in as_completed([_get_pool().submit(render_qr_chunk, chunk) for chunk in chunks]):
+        chunk = future.result()
+        for index, png in chunk:
+            images[index] = png
+        done += len(chunk)
+        if progress:
+            progress(done, len(urls))
+    return images
+
+
+def layout_sheet(labels, images):
+    """A4 PDF with one label per (label dict, QR PNG) pair"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    pdf.setTitle('Krishi Sahayak QR labels')
+    page_height = A4[1]
+    qr_size = LABEL_HEIGHT_MM * mm - 6 * mm
+
+    for i, (label, png) in enumerate(zip(labels, images)):
+        slot = i % (COLUMNS * ROWS)
+        if i and slot == 0:
+            pdf.showPage()
+        column, row = slot % COLUMNS, slot // COLUMNS
+        x = (LEFT_MARGIN_MM + column * (LABEL_WIDTH_MM + COLUMN_GAP_MM)) * mm
+        y = page_height - (TOP_MARGIN_MM + (row + 1) * LABEL_HEIGHT_MM) * mm
+
+        pdf.setStrokeColorRGB(0.16, 0.65, 0.27)
+        pdf.roundRect(x + 1 * mm, y + 1 * mm, LABEL_WIDTH_MM * mm - 2 * mm, LABEL_HEIGHT_MM * mm - 2 * mm, 2 * mm)
+        pdf.drawImage(ImageReader(BytesIO(png)), x + 3 * mm, y + 3 * mm, qr_size, qr_size)
+
+        text_x = x + qr_size + 5 * mm
+        text_y = y + LABEL_HEIGHT_MM * mm - 8 * mm
+        pdf.setFillColorRGB(0.16, 0.65, 0.27)
+        pdf.setFont('Helvetica-Bold', 9)
+        pdf.drawString(text_x, text_y, _fit(label.get('crop_type'), 18))
+        pdf.setFillColorRGB(0.3, 0.3, 0.3)
+        pdf.setFont('Helvetica', 7)
+        for offset, line in enumerate((label.get('season'), label.get('farmer'), label.get('place'), label.get('token_id'))):
+            pdf.drawString(text_x, text_y - (offset + 1) * 3.6 * mm, _fit(line, 26))
+        pdf.setFillColorRGB(0, 0, 0)
+
+    pdf.save()
+    return buffer.getvalue()
+
+
+def _fit(value, width):
+    text = str(value or '')
+    return text if len(text) <= width else text[:width - 1] + '…'
+
+
+def build_sheet(labels, progress=None):
+    """PDF bytes for labels: [{'token_id', 'url', 'crop_type', 'season', 'farmer', 'place'}]"""
+    images = render_qr_codes([label['url'] for label in labels], progress)
+    return layout_sheet(labels, images)
+
+
+def _job_path(job_id, ext):
+    return os.path.join(LABEL_SHEET_DIR, f"{job_id}.{ext}")
+
+
+def _write_status(job_id, **status):
+    os.makedirs(LABEL_SHEET_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=LABEL_SHEET_DIR)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(dict(status, job_id=job_id, updated_at=datetime.now().isoformat(timespec='seconds')), f)
+    os.replace(tmp_path, _job_path(job_id, 'json'))
+
+
+def prune_jobs(max_age=JOB_TTL):
+    """Delete job status files and PDFs that have not changed for max_age seconds"""
+    cutoff = time.time() - max_age
+    try:
+        names = os.listdir(LABEL_SHEET_DIR)
+    except OSError:
+        return 0
+    removed = 0
+    for name in names:
+        path = os.path.join(LABEL_SHEET_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def get_job(job_id):
+    try:
+        uuid.UUID(job_id)
+        with open(_job_path(job_id, 'json')) as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+
+def get_job_pdf(job_id):
+    job = get_job(job_id)
+    if not job or job.get('status') != 'done':
+        return None
+    return _job_path(job_id, 'pdf')
+
+
+def _run_job(job_id, labels, owner):
+    total = len(labels)
+    _write_status(job_id, status='running', done=0, total=total, owner=owner)
+    try:
+        pdf_data = build_sheet(labels, lambda done, total: _write_status(job_id, status='running', done=done,
+                                                                         total=total, owner=owner))
+        fd, tmp_path = tempfile.mkstemp(dir=LABEL_SHEET_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pdf_data)
+        os.replace(tmp_path, _job_path(job_id, 'pdf'))
+        _write_status(job_id, status='done', done=total, total=total, owner=owner, pages=-(-total // (COLUMNS * ROWS)))
+    except Exception as e:
+        _write_status(job_id, status='failed', done=0, total=total, owner=owner, error=str(e))
+        raise
+
+
+def start_job(labels, owner):
+    """Queue a background sheet build for owner; returns the job id or None if the queue is full"""
+    prune_jobs()
+    job_id = str(uuid.uuid4())
+    _write_status(job_id, status='queued', done=0, total=len(labels), owner=owner)
+    if not label_sheet_queue.submit(_run_job, job_id, labels, owner):
+        _write_status(job_id, status='failed', done=0, total=len(labels), owner=owner,
+                      error='Too many label jobs, try again shortly')
+        return None
+    return job_id
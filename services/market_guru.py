@@ -1,8 +1,18 @@
 import os
+import threading
+import time
 import requests
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import random
 
+# Insights snapshots per crop list; prices move daily, not per page view.
+# An LRU bounded to MARKET_INSIGHTS_MAX crop lists, since every farmer's list is a key
+MARKET_INSIGHTS_TTL = int(os.getenv('MARKET_INSIGHTS_TTL', 15 * 60))
+MARKET_INSIGHTS_MAX = int(os.getenv('MARKET_INSIGHTS_MAX', 256))
+_insights_snapshots = OrderedDict()
+_insights_lock = threading.Lock()
+
 def get_ai_market_prediction(crop_name, current_price, user_location="India"):
     """Get AI-powered market prediction using Gemini"""
     
@@ -280,6 +290,27 @@ def get_real_market_price(crop_name):
     }.get(crop_name, 2000)
 
 def get_market_insights(user_crops):
+    """Get market insights, served from a snapshot for MARKET_INSIGHTS_TTL seconds"""
+    key = tuple(user_crops)
+    with _insights_lock:
+        snapshot = _insights_snapshots.get(key)
+        if snapshot and time.time() - snapshot[0] < MARKET_INSIGHTS_TTL:
+            _insights_snapshots.move_to_end(key)
+            return snapshot[1]
+    
+    insights = _build_market_insights(user_crops)
+    now = time.time()
+    with _insights_lock:
+        _insights_snapshots[key] = (now, insights)
+        _insights_snapshots.move_to_end(key)
+        # Expired snapshots go first, then the least recently used past the limit
+        for stale in [k for k, (stored_at, _) in _insights_snapshots.items() if now - stored_at >= MARKET_INSIGHTS_TTL]:
+            del _insights_snapshots[stale]
+        while len(_insights_snapshots) > MARKET_INSIGHTS_MAX:
+            _insights_snapshots.popitem(last=False)
+    return insights
+
+def _build_market_insights(user_crops):
     """Get real market insights with AI predictions"""
     
     insights = []
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Per-farm NDVI time series.
+
+Each farm (keyed by its bbox hash) has one flat binary file of fixed-size
+records, one per acquisition date, holding the zonal NDVI statistics.
+New acquisitions are appended with a single O_APPEND write, and reads map
+the file with np.memmap, so trend queries and baseline comparisons never
+touch imagery again and cost a few kilobytes of I/O per farm.
+
+A new observation is compared with the field's own seasonal baseline:
+the same time of year in earlier seasons when there is enough history,
+otherwise the recent weeks before it.
+"""
+
+import os
+import re
+import tempfile
+import threading
+from datetime import date as date_type, datetime, timedelta
+
+import numpy as np
+
+RECORD = np.dtype([
+    ('day', '<i4'),         # days since 1970-01-01
+    ('mean', '<f4'),
+    ('p10', '<f4'),
+    ('p50', '<f4'),
+    ('p90', '<f4'),
+    ('stressed', '<f4'),
+    ('vegetated', '<f4'),
+])
+
+SEASON_WINDOW_DAYS = 30
+RECENT_WINDOW_DAYS = 60
+MIN_BASELINE_POINTS = 3
+# A drop must exceed both this absolute NDVI change and 2 sigma of the baseline
+MIN_DROP = float(os.getenv('NDVI_MIN_DROP', 0.1))
+
+KEY_PATTERN = re.compile(r'^[0-9A-Za-z_-]{1,64}$')
+EPOCH = date_type(1970, 1, 1)
+
+
+def to_day(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y-%m-%d').date()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+def from_day(day):
+    return (EPOCH + timedelta(days=int(day))).isoformat()
+
+
+class NDVIHistory:
+    """Append-only NDVI statistics per farm with baseline change detection"""
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv('NDVI_HISTORY_DIR') or os.path.join(tempfile.gettempdir(), 'krishi-ndvi')
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        if not KEY_PATTERN.match(key or ''):
+            raise ValueError(f"Invalid farm key: {key!r}")
+        return os.path.join(self.root, f"{key}.ndvi")
+
+    def load(self, key):
+        """All records for a farm, sorted by day (latest value wins for repeated days)"""
+        path = self._path(key)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.zeros(0, dtype=RECORD)
+        count = size // RECORD.itemsize
+        if not count:
+            return np.zeros(0, dtype=RECORD)
+
+        records = np.array(np.memmap(path, dtype=RECORD, mode='r', shape=(count,)))
+        # Keep the last write for each day, then order by day
+        _, last = np.unique(records['day'][::-1], return_index=True)
+        return records[::-1][last]
+
+    def record(self, key, day, ndvi_stats):
+        """Store one acquisition and return its change assessment"""
+        day = to_day(day)
+        history = self.load(key)
+        existing = history[history['day'] == day]
+        assessment = self.assess(history[history['day'] != day], day, ndvi_stats['mean'])
+
+        row = np.zeros(1, dtype=RECORD)
+        row['day'] = day
+        row['mean'] = ndvi_stats['mean']
+        row['p10'] = ndvi_stats.get('p10', np.nan)
+        row['p50'] = ndvi_stats.get('p50', np.nan)
+        row['p90'] = ndvi_stats.get('p90', np.nan)
+        row['stressed'] = ndvi_stats.get('stressed_fraction', np.nan)
+        row['vegetated'] = ndvi_stats.get('vegetated_fraction', np.nan)
+
+        # Re-analysing a date with identical results is a no-op
+        if not (len(existing) and np.allclose(existing[-1]['mean'], row['mean'][0])):
+            self._append(key, row.tobytes())
+        return assessment
+
+    def _append(self, key, data):
+        with self._lock:
+            # A single O_APPEND write of one record cannot interleave with other workers
+            fd = os.open(self._path(key), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def assess(self, history, day, value):
+        """Compare an NDVI mean against the seasonal (or recent) baseline from history"""
+        earlier = history[history['day'] < day]
+        if not len(earlier):
+            return {'status': 'first_observation', 'baseline': None, 'change': None, 'significant_drop': False}
+
+        # Same time of year in previous seasons
+        offset = (day - earlier['day']) % 365
+        seasonal = earlier[(np.minimum(offset, 365 - offset) <= SEASON_WINDOW_DAYS) & (day - earlier['day'] > 300)]
+        if len(seasonal) >= MIN_BASELINE_POINTS:
+            baseline, kind = seasonal, 'seasonal'
+        else:
+            baseline, kind = earlier[day - earlier['day'] <= RECENT_WINDOW_DAYS], 'recent'
+            if not len(baseline):
+                baseline = earlier[-MIN_BASELINE_POINTS:]
+
+        means = baseline['mean'].astype(np.float64)
+        centre = float(np.median(means))
+        spread = float(np.std(means)) if len(means) > 1 else 0.0
+        change = float(value) - centre
+        threshold = max(MIN_DROP, 2 * spread)
+        return {
+            'status': 'drop' if change < -threshold else 'normal',
+            'baseline': round(centre, 4),
+            'baseline_kind': kind,
+            'baseline_points': int(len(means)),
+            'change': round(change, 4),
+            'threshold': round(threshold, 4),
+            'significant_drop': change < -threshold,
+        }
+
+    def trend(self, key, days=180, until=None):
+        """NDVI statistics for the last `days` days, straight from the stored series"""
+        history = self.load(key)
+        end = to_day(until or datetime.now())
+        window = history[(history['day'] > end - days) & (history['day'] <= end)]
+        return [{
+            'date': from_day(row['day']),
+            'mean': _number(row['mean']),
+            'p10': _number(row['p10']),
+            'p50': _number(row['p50']),
+            'p90': _number(row['p90']),
+            'stressed_fraction': _number(row['stressed']),
+        } for row in window]
+
+
+def _number(value):
+    # NaN marks a statistic that was not available; JSON has no NaN
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+
+# Global instance
+ndvi_history = NDVIHistory()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Signed passport claims for QR codes.
+
+Passport QR URLs (verify links) carry ?c=<claim>, a
+compact URL-safe token: base64url(canonical JSON of passport id, crop,
+season, farmer and issue date) plus a truncated HMAC-SHA256 over it. The
+verify page, or anything else holding PASSPORT_SIGNING_KEY such as an
+edge worker or an offline scanner app, can check it with no database
+access; only scans without a valid claim fall back to a lookup. Only
+minted passports are signed, so a valid claim also means the passport
+is on chain; pending or failed ones get plain links and a lookup that
+shows their state.
+
+Without PASSPORT_SIGNING_KEY, signing is off and QR codes carry the plain
+URLs.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+from types import SimpleNamespace
+
+from services.blockchain.merkle import canonical_json
+
+VERSION = 'v1'
+SIGNATURE_BYTES = 16
+
+
+def _signing_key():
+    key = os.getenv('PASSPORT_SIGNING_KEY')
+    return key.encode('utf-8') if key else None
+
+
+def signing_enabled():
+    return _signing_key() is not None
+
+
+def key_id():
+    """Short fingerprint of the signing key, or None when signing is off"""
+    key = _signing_key()
+    return hashlib.sha256(key).hexdigest()[:12] if key else None
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _signature(key, body):
+    return hmac.new(key, f"{VERSION}.{body}".encode('ascii'), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def sign_claim(token_id, crop_type, season, farmer, issued=None):
+    """Compact signed claim for a passport, or None when signing is not configured"""
+    key = _signing_key()
+    if not key:
+        return None
+    claim = {'p': str(token_id), 'c': crop_type or '', 's': season or '', 'f': farmer or ''}
+    if issued:
+        claim['d'] = str(issued)[:10]
+    body = _b64encode(canonical_json(claim).encode('utf-8'))
+    return f"{VERSION}.{body}.{_b64encode(_signature(key, body))}"
+
+
+def verify_claim(claim, token_id=None):
+    """The claim's fields if its signature is valid (and it is for token_id), else None"""
+    key = _signing_key()
+    if not key or not claim:
+        return None
+    try:
+        version, body, signature = claim.split('.')
+        if version != VERSION or not hmac.compare_digest(_b64decode(signature), _signature(key, body)):
+            return None
+        fields = json.loads(_b64decode(body))
+        if token_id is not None and fields['p'] != str(token_id):
+            return None
+    except (ValueError, TypeError, KeyError):
+        return None
+    return {
+        'token_id': fields['p'],
+        'crop_type': fields.get('c'),
+        'season': fields.get('s'),
+        'farmer': fields.get('f'),
+        'issued': fields.get('d'),
+    }
+
+
+def signed_url(url, passport, farmer_name):
+    """url with the passport's signed claim appended, or unchanged when signing is off
+    or the passport is not minted yet"""
+    if getattr(passport, 'mint_status', 'minted') != 'minted':
+        return url
+    claim = sign_claim(passport.nft_token_id, passport.crop_type, passport.season, farmer_name, passport.created_at)
+    return f"{url}?c={claim}" if claim else url
+
+
+def claim_passport(claim):
+    """Template object for verify.html built from a verified claim alone"""
+    return SimpleNamespace(
+        nft_token_id=claim['token_id'],
+        crop_type=claim['crop_type'],
+        season=claim['season'],
+        farmer_name=claim['farmer'],
+        created_at=claim['issued'],
+        ipfs_hash=None,
+    )
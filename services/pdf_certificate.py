@@ -1,5 +1,9 @@
 """
 PDF Certificate Generator for Digital Crop Passports
+
+Certificates only change when the passport or farmer data does, so they
+are cached on disk under a hash of that data (`get_certificate_file`).
+Paragraph and table styles are built once per process.
 """
 
 from reportlab.lib.pagesizes import A4
@@ -9,20 +13,21 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
+from functools import lru_cache
+import hashlib
+import json
 import qrcode
 from datetime import datetime
 import os
+import tempfile
 
-def generate_certificate_pdf(passport_data, farmer_data, qr_data):
-    """Generate a professional PDF certificate"""
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define styles
+# Bump when the layout changes so cached certificates are regenerated
+TEMPLATE_VERSION = 2
+CERTIFICATE_CACHE_DIR = os.getenv('CERTIFICATE_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'krishi-certificates')
+
+@lru_cache(maxsize=1)
+def _certificate_styles():
+    """Paragraph and table styles, built once per process"""
     styles = getSampleStyleSheet()
     
     # Custom styles
@@ -63,6 +68,58 @@ def generate_certificate_pdf(passport_data, farmer_data, qr_data):
         fontName='Helvetica'
     )
     
+    def info_table_style(label_colour):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), label_colour),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+    
+    return {
+        'title': title_style,
+        'subtitle': subtitle_style,
+        'header': header_style,
+        'normal': normal_style,
+        'certificate_table': info_table_style(colors.lightgrey),
+        'farmer_table': info_table_style(colors.lightblue),
+        'crop_table': info_table_style(colors.lightgreen),
+        'qr_table': TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+            ('ALIGN', (1, 0), (1, 0), 'LEFT'),
+        ]),
+    }
+
+def _issue_date(passport_data):
+    created_at = passport_data.get('created_at')
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except ValueError:
+            created_at = None
+    return created_at if isinstance(created_at, datetime) else None
+
+def generate_certificate_pdf(passport_data, farmer_data, qr_data):
+    """Generate a professional PDF certificate"""
+    
+    buffer = BytesIO()
+    # invariant=1 keeps the output byte-identical for identical input
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18, invariant=1)
+    
+    # Container for the 'Flowable' objects
+    elements = []
+    
+    styles = _certificate_styles()
+    title_style = styles['title']
+    subtitle_style = styles['subtitle']
+    header_style = styles['header']
+    normal_style = styles['normal']
+    # The certificate is dated by the passport, not by the download
+    issued = _issue_date(passport_data) or datetime.now()
+    
     # Header
     elements.append(Paragraph("🌾 DIGITAL CROP PASSPORT", title_style))
     elements.append(Paragraph("Blockchain Verified Agricultural Certificate", subtitle_style))
@@ -71,20 +128,13 @@ def generate_certificate_pdf(passport_data, farmer_data, qr_data):
     # Certificate Info
     cert_info = [
         ['Certificate ID:', passport_data.get('nft_token_id', 'N/A')],
-        ['Issue Date:', datetime.now().strftime('%B %d, %Y')],
+        ['Issue Date:', issued.strftime('%B %d, %Y')],
         ['Status:', '✅ VERIFIED & AUTHENTICATED'],
         ['Blockchain:', 'MONAD Testnet'],
     ]
     
     cert_table = Table(cert_info, colWidths=[2*inch, 3*inch])
-    cert_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    cert_table.setStyle(styles['certificate_table'])
     
     elements.append(cert_table)
     elements.append(Spacer(1, 20))
@@ -101,14 +151,7 @@ def generate_certificate_pdf(passport_data, farmer_data, qr_data):
     ]
     
     farmer_table = Table(farmer_info, colWidths=[2*inch, 3*inch])
-    farmer_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    farmer_table.setStyle(styles['farmer_table'])
     
     elements.append(farmer_table)
     elements.append(Spacer(1, 20))
@@ -125,14 +168,7 @@ def generate_certificate_pdf(passport_data, farmer_data, qr_data):
     ]
     
     crop_table = Table(crop_info, colWidths=[2*inch, 3*inch])
-    crop_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgreen),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    crop_table.setStyle(styles['crop_table'])
     
     elements.append(crop_table)
     elements.append(Spacer(1, 20))
@@ -156,11 +192,7 @@ def generate_certificate_pdf(passport_data, farmer_data, qr_data):
     ]
     
     qr_table = Table(qr_table_data, colWidths=[2*inch, 3.5*inch])
-    qr_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-        ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-    ]))
+    qr_table.setStyle(styles['qr_table'])
     
     elements.append(qr_table)
     elements.append(Spacer(1, 30))
@@ -170,7 +202,7 @@ def generate_certificate_pdf(passport_data, farmer_data, qr_data):
     <para align=center>
     <b>🌱 Krishi Sahayak - AI Farming Platform</b><br/>
     This certificate is issued by Krishi Sahayak and is blockchain verified.<br/>
-    Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}<br/>
+    Issued on {issued.strftime('%B %d, %Y')}<br/>
     <i>Empowering farmers with technology for sustainable agriculture</i>
     </para>
     """
@@ -184,4 +216,25 @@ def generate_certificate_pdf(passport_data, farmer_data, qr_data):
     pdf_data = buffer.getvalue()
     buffer.close()
     
-    return pdf_data
\ No newline at end of file
+    return pdf_data
+
+def certificate_key(passport_data, farmer_data, qr_data):
+    """Content hash of everything that appears on the certificate"""
+    payload = json.dumps(
+        {'v': TEMPLATE_VERSION, 'passport': passport_data, 'farmer': farmer_data, 'qr': qr_data},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_certificate_file(passport_data, farmer_data, qr_data):
+    """(path, key) of the cached certificate PDF, generating it on first use"""
+    key = certificate_key(passport_data, farmer_data, qr_data)
+    path = os.path.join(CERTIFICATE_CACHE_DIR, key[:2], f"{key}.pdf")
+    if not os.path.exists(path):
+        pdf_data = generate_certificate_pdf(passport_data, farmer_data, qr_data)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pdf_data)
+        os.replace(tmp_path, path)
+    return path, key
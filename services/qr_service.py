@@ -1,51 +1,161 @@
 """
 QR Code generation service
+
+Rendered codes are cached in memory (LRU) and on disk, keyed by
+(data, size, error correction, format), so a passport's QR is encoded
+once and then served as a plain image file by /qr/<token_id>.png|svg.
+A render can also be filed under a stable name (the plain URL behind a
+signed passport link), so it is found again without building the data.
 """
 
 import qrcode
 import base64
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
 from io import BytesIO
 
+QR_CACHE_DIR = os.getenv('QR_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'krishi-qr')
+QR_CACHE_SIZE = int(os.getenv('QR_CACHE_SIZE', 512))
+
+ERROR_CORRECTION = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+MIMETYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+class QRCache:
+    """In-memory LRU in front of a content-addressed directory of rendered codes"""
+
+    def __init__(self, directory=QR_CACHE_DIR, max_entries=QR_CACHE_SIZE):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'renders': 0}
+
+    def key(self, data, size, error_correction, fmt):
+        raw = f"{fmt}|{size}|{error_correction}|{data}".encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()
+
+    def path(self, key, fmt):
+        return os.path.join(self.directory, key[:2], f"{key}.{fmt}")
+
+    def named_path(self, name, size, error_correction, fmt):
+        key = self.key(f"name:{name}", size, error_correction, fmt)
+        return os.path.join(self.directory, 'named', key[:2], f"{key}.{fmt}")
+
+    def cached_path(self, data, size=10, error_correction='L', fmt='png', name=None):
+        """Path of an already rendered code (looked up by name when given), or None"""
+        if name:
+            path = self.named_path(name, size, error_correction, fmt)
+        else:
+            path = self.path(self.key(data, size, error_correction, fmt), fmt)
+        return path if os.path.exists(path) else None
+
+    def get(self, data, size=10, error_correction='L', fmt='png', name=None):
+        """(bytes, path) of a rendered QR code, also filed under name if given"""
+        key = self.key(data, size, error_correction, fmt)
+        path = self.path(key, fmt)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self._entries[key], path
+
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                image = f.read()
+            self.stats['disk_hits'] += 1
+        else:
+            image = _render(data, size, error_correction, fmt)
+            self.stats['renders'] += 1
+            _write(path, image)
+        if name:
+            named_path = self.named_path(name, size, error_correction, fmt)
+            if not os.path.exists(named_path):
+                _write(named_path, image)
+
+        with self._lock:
+            self._entries[key] = image
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return image, path
+
+
+def _write(path, image):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(image)
+    os.replace(tmp_path, path)
+
+
+def _render(data, size, error_correction, fmt):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=ERROR_CORRECTION[error_correction],
+        box_size=size,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    if fmt == 'svg':
+        from qrcode.image.svg import SvgPathImage
+        qr.make_image(image_factory=SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+qr_cache = QRCache()
+
+
+def get_qr_image(data, size=10, error_correction='L', fmt='png', name=None):
+    """Cached QR image bytes and the file they are stored in"""
+    return qr_cache.get(_qr_payload(data), size, error_correction, fmt, name)
+
+
+def cached_qr_file(data, size=10, error_correction='L', fmt='png', name=None):
+    return qr_cache.cached_path(_qr_payload(data), size, error_correction, fmt, name)
+
+
+def _qr_payload(data):
+    # Limit data size for QR code readability
+    data_str = str(data)
+    if len(data_str) > 1000:
+        # Truncate large data to essential info only
+        import json
+        try:
+            data_obj = json.loads(data_str)
+            essential_data = {
+                'passport_id': data_obj.get('passport_id', 'Unknown'),
+                'farmer': data_obj.get('farmer', {}).get('name', 'Unknown'),
+                'crop': data_obj.get('crop', {}).get('type', 'Unknown'),
+                'verified': True,
+                'verify_url': data_obj.get('verification', {}).get('verify_url', '')
+            }
+            data_str = json.dumps(essential_data)
+        except:
+            data_str = data_str[:500]  # Fallback truncation
+    return data_str
+
+
 def generate_qr_code(data, size=10):
     """Generate QR code as base64 image"""
     try:
-        # Limit data size for QR code readability
-        data_str = str(data)
-        if len(data_str) > 1000:
-            # Truncate large data to essential info only
-            import json
-            try:
-                data_obj = json.loads(data_str)
-                essential_data = {
-                    'passport_id': data_obj.get('passport_id', 'Unknown'),
-                    'farmer': data_obj.get('farmer', {}).get('name', 'Unknown'),
-                    'crop': data_obj.get('crop', {}).get('type', 'Unknown'),
-                    'verified': True,
-                    'verify_url': data_obj.get('verification', {}).get('verify_url', '')
-                }
-                data_str = json.dumps(essential_data)
-            except:
-                data_str = data_str[:500]  # Fallback truncation
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=size,
-            border=4,
-        )
-        qr.add_data(data_str)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
+        image, _ = get_qr_image(data, size)
+        img_str = base64.b64encode(image).decode()
+
         return f"data:image/png;base64,{img_str}"
-        
+
     except Exception as e:
         print(f"QR Code generation error: {e}")
         # Return a simple fallback QR code
@@ -54,13 +164,13 @@ def generate_qr_code(data, size=10):
             fallback_qr.add_data("QR Error - Contact Support")
             fallback_qr.make(fit=True)
             fallback_img = fallback_qr.make_image(fill_color="red", back_color="white")
-            
+
             buffer = BytesIO()
             fallback_img.save(buffer, format='PNG')
             buffer.seek(0)
             fallback_str = base64.b64encode(buffer.getvalue()).decode()
-            
+
             return f"data:image/png;base64,{fallback_str}"
         except:
             # Ultimate fallback - return a minimal data URL
-            return "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
\ No newline at end of file
+            return "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Lazy service registry.
+
+Heavy modules (Supabase clients, web3, reportlab, PIL) are imported on
+first use instead of at app import, so a fresh worker can start serving
+sooner. `lazy_import` returns a proxy that behaves like the real object
+(attribute access and calls are forwarded) and records how long the
+import took. `registry.warm_up()` loads everything up front, e.g. in the
+gunicorn master before workers fork.
+"""
+
+import importlib
+import threading
+import time
+
+
+class LazyObject:
+    """Proxy for `module_path.attr` that imports the module on first use"""
+
+    __slots__ = ('_registry', '_name', '_module_path', '_attr')
+
+    def __init__(self, registry, module_path, attr):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_module_path', module_path)
+        object.__setattr__(self, '_attr', attr)
+        object.__setattr__(self, '_name', f"{module_path}:{attr}")
+
+    def _resolve(self):
+        return self._registry.get(self._name)
+
+    def __getattr__(self, item):
+        return getattr(self._resolve(), item)
+
+    def __setattr__(self, item, value):
+        setattr(self._resolve(), item, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<lazy {self._name}>"
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self._entries = {}
+        self._loaded = {}
+        self._warmups = []
+        self._lock = threading.RLock()
+        self.load_times = {}
+
+    def register(self, module_path, attr):
+        name = f"{module_path}:{attr}"
+        self._entries[name] = (module_path, attr)
+        return LazyObject(self, module_path, attr)
+
+    def get(self, name):
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            return loaded
+
+        with self._lock:
+            if name not in self._loaded:
+                module_path, attr = self._entries[name]
+                started = time.perf_counter()
+                module = importlib.import_module(module_path)
+                self._loaded[name] = getattr(module, attr)
+                self.load_times.setdefault(module_path, round((time.perf_counter() - started) * 1000, 2))
+            return self._loaded[name]
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def add_warmup(self, func):
+        """Register extra work (cache priming etc.) to run during warm_up"""
+        self._warmups.append(func)
+        return func
+
+    def warm_up(self, names='all'):
+        """Import registered services now; names is 'all' or a comma-separated list of module paths"""
+        if not names:
+            return {}
+        wanted = None if names == 'all' else {n.strip() for n in names.split(',') if n.strip()}
+
+        for name, (module_path, _) in list(self._entries.items()):
+            if wanted is None or module_path in wanted or module_path.rsplit('.', 1)[-1] in wanted:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Warm-up failed for {name}: {e}")
+
+        for func in self._warmups:
+            try:
+                func()
+            except Exception as e:
+                print(f"Warm-up step {getattr(func, '__name__', func)} failed: {e}")
+
+        return dict(self.load_times)
+
+
+# Global registry
+registry = ServiceRegistry()
+
+
+def lazy_import(module_path, attr):
+    return registry.register(module_path, attr)
@@ -51,12 +51,13 @@ class SimplePassportService:
                 
                 # Store in memory for testing
                 passport_storage.append(passport_data)
+                monad_service.queue_mint(blockchain_result)
                 
                 return {
                     'success': True,
                     'passport': passport_data,
                     'blockchain_data': blockchain_result,
-                    'message': 'Digital passport created and minted on MONAD blockchain!'
+                    'message': 'Digital passport created; minting on MONAD blockchain is in progress'
                 }
             else:
                 # Fallback to mock implementation
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Small in-process background task queue.
+
+Runs slow side work (LLM calls, follow-up inserts) off the request path on
+a fixed number of daemon threads, retrying failed tasks with exponential
+backoff. Threads are started lazily in the process that first submits a
+task, so gunicorn's preload_app fork does not leave a dead pool behind.
+"""
+
+import os
+import queue
+import threading
+import time
+import traceback
+
+
+class TaskQueue:
+    def __init__(self, name, concurrency=2, max_retries=3, backoff=2.0, max_pending=500):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._threads = []
+        self.stats = {'submitted': 0, 'completed': 0, 'retried': 0, 'failed': 0, 'dropped': 0}
+
+    def submit(self, func, *args, on_failure=None, **kwargs):
+        """Queue func(*args, **kwargs); returns False if the queue is full"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((func, args, kwargs, on_failure, 0))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            print(f"[{self.name}] queue full, dropping task {getattr(func, '__name__', func)}")
+            return False
+        self.stats['submitted'] += 1
+        return True
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # First use in this process (or first use after a fork)
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._threads = []
+            for i in range(self.concurrency):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        work_queue = self._queue
+        while True:
+            func, args, kwargs, on_failure, attempt = work_queue.get()
+            try:
+                func(*args, **kwargs)
+                self.stats['completed'] += 1
+            except Exception as e:
+                if attempt < self.max_retries:
+                    self.stats['retried'] += 1
+                    delay = self.backoff * (2 ** attempt)
+                    print(f"[{self.name}] {getattr(func, '__name__', func)} failed ({e}), retrying in {delay:.0f}s")
+                    self._retry_later(delay, (func, args, kwargs, on_failure, attempt + 1))
+                else:
+                    self.stats['failed'] += 1
+                    print(f"[{self.name}] {getattr(func, '__name__', func)} gave up after {attempt + 1} attempts: {e}")
+                    traceback.print_exc()
+                    if on_failure:
+                        try:
+                            on_failure(*args, **kwargs)
+                        except Exception:
+                            pass
+            finally:
+                work_queue.task_done()
+
+    def _retry_later(self, delay, task):
+        # A timer keeps the worker free while the task backs off
+        timer = threading.Timer(delay, self._requeue, args=(task,))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, task):
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            self.stats['dropped'] += 1
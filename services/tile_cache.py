@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Disk cache for satellite tiles.
+
+Tiles are stored as <root>/<layer>/<bbox_hash>/<date>.jpg, so the same
+(layer, bbox, date) is rendered or downloaded once and then served
+straight from disk by every worker. Writes go through a temp file and
+os.replace, which makes concurrent renders of one tile harmless. The
+bbox behind each hash is kept next to its tiles so a tile URL can be
+rebuilt after the cache was pruned or the process restarted, along with
+the dates that were handed out for it, so a tile URL cannot be used to
+fetch imagery for a date nobody was given.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+
+BBOX_PRECISION = 5
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+HASH_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+PRUNE_EVERY = 100
+
+
+def normalize_bbox(bbox):
+    """(min_lon, min_lat, max_lon, max_lat) rounded so nearby floats share a key"""
+    if isinstance(bbox, str):
+        bbox = bbox.split(',')
+    return tuple(round(float(value), BBOX_PRECISION) for value in bbox)
+
+
+def bbox_hash(bbox):
+    key = ','.join(f"{value:.{BBOX_PRECISION}f}" for value in normalize_bbox(bbox))
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class TileCache:
+    """Content cache of tile images keyed by (layer, bbox_hash, date)"""
+
+    def __init__(self, root=None, max_tiles=None):
+        self.root = root or os.getenv('SATELLITE_TILE_DIR') or os.path.join(tempfile.gettempdir(), 'krishi-tiles')
+        self.max_tiles = max_tiles if max_tiles is not None else int(os.getenv('SATELLITE_TILE_MAX', 5000))
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, layer, tile_hash, date):
+        return os.path.join(self.root, layer, tile_hash, f"{date}.jpg")
+
+    def remember_bbox(self, bbox):
+        """Record the bbox behind a hash; returns the hash"""
+        tile_hash = bbox_hash(bbox)
+        meta_path = os.path.join(self.root, 'bbox', f"{tile_hash}.json")
+        if not os.path.exists(meta_path):
+            self._write(meta_path, json.dumps(normalize_bbox(bbox)).encode())
+        return tile_hash
+
+    def issue(self, tile_hash, date):
+        """Record that tile URLs for (tile_hash, date) were handed out"""
+        marker = os.path.join(self.root, 'bbox', tile_hash, date)
+        if not os.path.exists(marker):
+            self._write(marker, b'')
+
+    def was_issued(self, tile_hash, date):
+        if not (HASH_PATTERN.match(tile_hash or '') and DATE_PATTERN.match(date or '')):
+            return False
+        return os.path.exists(os.path.join(self.root, 'bbox', tile_hash, date))
+
+    def lookup_bbox(self, tile_hash):
+        if not HASH_PATTERN.match(tile_hash or ''):
+            return None
+        try:
+            with open(os.path.join(self.root, 'bbox', f"{tile_hash}.json")) as f:
+                return tuple(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def get(self, layer, tile_hash, date):
+        path = self.path(layer, tile_hash, date)
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+        return None
+
+    def put(self, layer, tile_hash, date, data):
+        path = self.path(layer, tile_hash, date)
+        self._write(path, data)
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self._prune()
+        return path
+
+    def get_or_create(self, layer, tile_hash, date, render):
+        """Path of the cached tile, calling render() -> bytes at most once per process"""
+        path = self.get(layer, tile_hash, date)
+        if path:
+            return path
+
+        with self._lock_for((layer, tile_hash, date)):
+            path = self.get(layer, tile_hash, date)
+            if path:
+                return path
+            self.misses += 1
+            data = render()
+            if data is None:
+                return None
+            return self.put(layer, tile_hash, date, data)
+
+    def stats(self):
+        return {'root': self.root, 'hits': self.hits, 'misses': self.misses}
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            if len(self._locks) > 1024:
+                self._locks.clear()
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _prune(self):
+        # Cheap size bound: drop the least recently written tiles past the limit
+        tiles = []
+        for dirpath, _, filenames in os.walk(self.root):
+            if os.path.basename(dirpath) == 'bbox' or dirpath == self.root:
+                continue
+            tiles += [os.path.join(dirpath, name) for name in filenames if name.endswith('.jpg')]
+        if len(tiles) <= self.max_tiles:
+            return
+        tiles.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in tiles[:len(tiles) - self.max_tiles]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Global instance
+tile_cache = TileCache()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Vegetation index engine for satellite crop health.
+
+Takes red and near-infrared (optionally blue) reflectance rasters and
+computes NDVI and EVI over the whole array in one vectorized NumPy pass,
+then reduces them to zonal statistics per field: mean, percentiles and the
+fraction of stressed pixels. `score_health` turns those statistics into
+the 0-100 health score and advice shown on the satellite monitor.
+
+Rasters can be any 2-D array-like; `load_band` reads single-band GeoTIFF
+(through rasterio when it is installed) or any image Pillow can open.
+"""
+
+import numpy as np
+
+# Reflectance below this NDVI is bare soil or water, not crop canopy
+VEGETATION_NDVI = 0.2
+# Canopy pixels below this NDVI are counted as stressed
+STRESS_NDVI = 0.4
+PERCENTILES = (10, 25, 50, 75, 90)
+# Index values are binned to 0.001 for percentiles
+HISTOGRAM_BINS = 2000
+MAX_DIRECT_LABEL = 1 << 20
+
+# MODIS EVI coefficients
+EVI_GAIN = 2.5
+EVI_C1 = 6.0
+EVI_C2 = 7.5
+EVI_L = 1.0
+
+
+def load_band(path, scale=None):
+    """Read a single-band raster as float32 reflectance (0-1)"""
+    if path.lower().endswith(('.tif', '.tiff')):
+        try:
+            import rasterio
+            with rasterio.open(path) as src:
+                band = src.read(1).astype(np.float32)
+                nodata = src.nodata
+            if nodata is not None:
+                band[band == nodata] = np.nan
+            return band * (scale or _default_scale(band))
+        except ImportError:
+            pass
+
+    from PIL import Image
+    with Image.open(path) as img:
+        if img.mode not in ('L', 'I', 'I;16', 'F'):
+            img = img.convert('L')
+        band = np.asarray(img, dtype=np.float32)
+    return band * (scale or _default_scale(band))
+
+
+def _default_scale(band):
+    # 8-bit PNG/JPEG, 16-bit integer reflectance (x10000) or already 0-1 floats
+    peak = np.nanmax(band) if band.size else 0
+    if peak <= 1.0:
+        return 1.0
+    if peak <= 255:
+        return 1.0 / 255
+    return 1.0 / 10000
+
+
+def compute_indices(red, nir, blue=None):
+    """NDVI and EVI for whole rasters; invalid pixels come back as NaN"""
+    red = np.asarray(red, dtype=np.float32)
+    nir = np.asarray(nir, dtype=np.float32)
+    if red.shape != nir.shape:
+        raise ValueError(f"Band shapes differ: red {red.shape}, nir {nir.shape}")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff = nir - red
+        ndvi = diff / (nir + red)
+        if blue is None:
+            # Two-band EVI (EVI2) when no blue band is available
+            evi = EVI_GAIN * diff / (nir + 2.4 * red + EVI_L)
+        else:
+            blue = np.asarray(blue, dtype=np.float32)
+            evi = EVI_GAIN * diff / (nir + EVI_C1 * red - EVI_C2 * blue + EVI_L)
+
+    ndvi[~np.isfinite(ndvi)] = np.nan
+    evi[~np.isfinite(evi)] = np.nan
+    np.clip(ndvi, -1.0, 1.0, out=ndvi)
+    np.clip(evi, -1.0, 1.0, out=evi)
+    return ndvi, evi
+
+
+def zonal_stats(index, zones=None):
+    """
+    Statistics of an index raster per zone.
+
+    `zones` is an integer label raster of the same shape (0 = outside any
+    field); without it the whole raster is one zone labelled 1. Returns
+    {label: {'mean', 'std', 'p10'..'p90', 'stressed_fraction', 'vegetated_fraction', 'pixels'}}.
+    """
+    values = np.asarray(index, dtype=np.float32).ravel()
+    labels = np.ones(values.shape, dtype=np.int64) if zones is None else np.asarray(zones).ravel().astype(np.int64)
+    if labels.shape != values.shape:
+        raise ValueError('Zone raster must match the index raster')
+
+    valid = np.isfinite(values) & (labels > 0)
+    values = values[valid]
+    labels = labels[valid]
+    if not values.size:
+        return {}
+
+    # Dense zone numbering without sorting the pixels
+    if labels.max() < MAX_DIRECT_LABEL:
+        present = np.bincount(labels) > 0
+        zone_ids = np.flatnonzero(present)
+        lookup = np.cumsum(present) - 1
+        zone_index = lookup[labels]
+    else:
+        zone_ids, zone_index = np.unique(labels, return_inverse=True)
+    zone_count = len(zone_ids)
+
+    counts = np.bincount(zone_index, minlength=zone_count)
+    sums = np.bincount(zone_index, weights=values, minlength=zone_count)
+    squares = np.bincount(zone_index, weights=values.astype(np.float64) ** 2, minlength=zone_count)
+    means = sums / counts
+    stds = np.sqrt(np.maximum(squares / counts - means ** 2, 0))
+    is_vegetated = values >= VEGETATION_NDVI
+    vegetated = np.bincount(zone_index, weights=is_vegetated, minlength=zone_count)
+    stressed = np.bincount(zone_index, weights=is_vegetated & (values < STRESS_NDVI), minlength=zone_count)
+
+    # Percentiles from a per-zone histogram: one O(n) pass, exact to half a bin
+    bins = np.clip(((values + 1.0) / 2.0 * HISTOGRAM_BINS).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+    histogram = np.bincount(zone_index * HISTOGRAM_BINS + bins, minlength=zone_count * HISTOGRAM_BINS)
+    cumulative = np.cumsum(histogram.reshape(zone_count, HISTOGRAM_BINS), axis=1)
+    bin_centres = (np.arange(HISTOGRAM_BINS) + 0.5) / HISTOGRAM_BINS * 2.0 - 1.0
+
+    percentiles = {}
+    for p in PERCENTILES:
+        targets = np.ceil(counts * p / 100.0).clip(min=1)
+        positions = np.array([np.searchsorted(cumulative[i], targets[i]) for i in range(zone_count)])
+        percentiles[p] = bin_centres[positions]
+
+    stats = {}
+    for i, zone in enumerate(zone_ids.tolist()):
+        zone_stats = {
+            'mean': round(float(means[i]), 4),
+            'std': round(float(stds[i]), 4),
+            'pixels': int(counts[i]),
+            'vegetated_fraction': round(float(vegetated[i] / counts[i]), 4),
+            'stressed_fraction': round(float(stressed[i] / vegetated[i]), 4) if vegetated[i] else 0.0,
+        }
+        for p in PERCENTILES:
+            zone_stats[f'p{p}'] = round(float(percentiles[p][i]), 4)
+        stats[zone] = zone_stats
+    return stats
+
+
+def analyze_bands(red, nir, blue=None, zones=None):
+    """NDVI/EVI statistics over all fields together, plus NDVI per zone when zones are given"""
+    ndvi, evi = compute_indices(red, nir, blue)
+    field_mask = None if zones is None else (np.asarray(zones) > 0)
+    field = zonal_stats(ndvi, field_mask)
+    return {
+        'ndvi': field.get(1, {}),
+        'evi': zonal_stats(evi, field_mask).get(1, {}),
+        'zones': zonal_stats(ndvi, zones) if zones is not None else {},
+        'shape': list(ndvi.shape),
+    }
+
+
+def score_health(ndvi_stats):
+    """0-100 health score plus Hindi labels and advice from NDVI statistics"""
+    if not ndvi_stats:
+        return None
+
+    mean = ndvi_stats['mean']
+    stressed = ndvi_stats['stressed_fraction']
+    vegetated = ndvi_stats['vegetated_fraction']
+
+    # Canopy vigour (NDVI 0.2 -> 0, 0.8 -> 100), penalised by stressed patches and bare ground
+    vigour = np.clip((mean - VEGETATION_NDVI) / 0.6, 0, 1) * 100
+    score = int(round(float(np.clip(vigour * (1 - 0.5 * stressed) * (0.5 + 0.5 * vegetated), 0, 100))))
+
+    if mean >= 0.6:
+        density, stage = 'घना', 'स्वस्थ वृद्धि'
+    elif mean >= 0.4:
+        density, stage = 'अच्छा', 'सक्रिय वृद्धि'
+    elif mean >= VEGETATION_NDVI:
+        density, stage = 'मध्यम', 'प्रारंभिक वृद्धि / तनाव'
+    else:
+        density, stage = 'कम', 'खाली खेत या कटाई'
+
+    recommendations = []
+    alerts = []
+    if stressed > 0.3:
+        recommendations.append('🚿 खेत के कमजोर हिस्सों में सिंचाई और पोषक तत्व जांचें')
+        alerts.append(f'⚠️ {stressed:.0%} फसल क्षेत्र तनाव में है')
+    if ndvi_stats['p10'] < VEGETATION_NDVI <= ndvi_stats['p50']:
+        recommendations.append('🔍 खेत में असमान वृद्धि - खाली या कमजोर पैच का निरीक्षण करें')
+    if mean >= 0.6 and stressed <= 0.1:
+        recommendations.append('✅ फसल स्वस्थ है, वर्तमान देखभाल जारी रखें')
+    if vegetated < 0.5:
+        recommendations.append('🌱 खेत का बड़ा हिस्सा बिना वनस्पति के है - बुवाई/अंकुरण जांचें')
+    if not recommendations:
+        recommendations.append('नियमित निगरानी करते रहें')
+
+    return {
+        'health_score': score,
+        'vegetation_density': density,
+        'growth_stage': stage,
+        'recommendations': recommendations,
+        'alerts': alerts or ['✅ उपग्रह डेटा सफलतापूर्वक प्राप्त'],
+    }
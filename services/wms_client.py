@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+WMS tile fetching for satellite imagery.
+
+Requests go through one pooled requests.Session (keep-alive, bounded
+connections) and are issued concurrently on a small thread pool, so the
+layers for a farm arrive in the time of the slowest one instead of their
+sum. Farm bounding boxes are snapped outward to a fixed grid before the
+request, which makes nearby farms ask for the identical tile; combined
+with the disk TileCache that means one download per (layer, grid cell,
+date) for every farm in that cell.
+"""
+
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.tile_cache import tile_cache
+
+# GIBS layers behind our layer names
+GIBS_LAYERS = {
+    'vegetation': 'MODIS_Terra_NDVI_8Day',
+    'truecolor': 'MODIS_Terra_CorrectedReflectance_TrueColor',
+    # Red in the R channel and near-infrared in G, used for NDVI/EVI
+    'bands121': 'MODIS_Terra_CorrectedReflectance_Bands121',
+}
+
+GRID_DEGREES = float(os.getenv('WMS_GRID_DEGREES', 0.02))
+
+
+def snap_bbox(bbox, grid=GRID_DEGREES):
+    """Expand (min_lon, min_lat, max_lon, max_lat) outward to whole grid cells"""
+    min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox)
+    snapped = (
+        math.floor(min_lon / grid) * grid,
+        math.floor(min_lat / grid) * grid,
+        math.ceil(max_lon / grid) * grid,
+        math.ceil(max_lat / grid) * grid,
+    )
+    return tuple(round(v, 6) for v in snapped)
+
+
+class WMSError(Exception):
+    pass
+
+
+class WMSClient:
+    """Concurrent, cached GetMap requests against one WMS endpoint"""
+
+    def __init__(self, base_url, cache=None, max_workers=None, pool_size=None, timeout=None, tile_size=512):
+        self.base_url = base_url
+        self.cache = cache or tile_cache
+        self.max_workers = max_workers or int(os.getenv('WMS_WORKERS', 4))
+        self.pool_size = pool_size or int(os.getenv('WMS_POOL_SIZE', 8))
+        self.timeout = timeout or float(os.getenv('WMS_TIMEOUT', 10))
+        self.tile_size = tile_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self._executor = None
+        self.stats = {'requests': 0, 'errors': 0}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Sockets and threads do not survive gunicorn's fork; build them per process
+            self._pid = os.getpid()
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='wms')
+
+    def get_map(self, layer, bbox, date):
+        """Download one GetMap image (JPEG bytes)"""
+        self._ensure_started()
+        params = {
+            'SERVICE': 'WMS',
+            'REQUEST': 'GetMap',
+            'VERSION': '1.1.1',
+            'LAYERS': GIBS_LAYERS.get(layer, layer),
+            'STYLES': '',
+            'SRS': 'EPSG:4326',
+            'BBOX': ','.join(str(v) for v in bbox),
+            'WIDTH': self.tile_size,
+            'HEIGHT': self.tile_size,
+            'FORMAT': 'image/jpeg',
+            'TIME': date,
+        }
+        self.stats['requests'] += 1
+        try:
+            response = self._session.get(self.base_url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.stats['errors'] += 1
+            raise WMSError(f"{layer} request failed: {e}") from e
+
+        # WMS servers report errors as XML with a 200 status
+        if not response.headers.get('Content-Type', '').startswith('image/'):
+            self.stats['errors'] += 1
+            raise WMSError(f"{layer}: {response.text[:200]}")
+        return response.content
+
+    def get_tile(self, layer, bbox, date):
+        """Cached tile path for a (snapped) bbox, downloading it on a miss"""
+        tile_hash = self.cache.remember_bbox(bbox)
+        return self.cache.get_or_create(layer, tile_hash, date, lambda: self.get_map(layer, bbox, date))
+
+    def fetch_concurrently(self, fetch, layers):
+        """Run fetch(layer) for every layer on the shared pool; {layer: result}"""
+        self._ensure_started()
+        futures = {layer: self._executor.submit(fetch, layer) for layer in layers}
+        return {layer: future.result() for layer, future in futures.items()}
@@ -74,7 +74,7 @@ function getCurrentPage() {
 // Register Service Worker for PWA
 function registerServiceWorker() {
     if ('serviceWorker' in navigator) {
-        navigator.serviceWorker.register('/static/js/sw.js')
+        navigator.serviceWorker.register('/sw.js')
             .then(registration => {
                 console.log('✅ Service Worker registered:', registration);
             })
@@ -1,51 +1,101 @@
 // Krishi Sahayak Service Worker
-const CACHE_NAME = 'krishi-sahayak-v1';
-const urlsToCache = [
-  '/',
-  '/static/css/styles.css',
-  '/static/js/app.js',
-  '/static/manifest.json',
-  '/dashboard',
-  '/scanner',
-  '/weather',
-  '/market',
-  '/passport'
-];
-
-// Install event
+//
+// Served from /sw.js, which prepends self.__PRECACHE__ = {version, urls, offline, snapshot}
+// built from the fingerprinted asset manifest (see asset_pipeline.py).
+const PRECACHE = self.__PRECACHE__ || null;
+const CACHE_PREFIX = 'krishi-';
+const SHELL_CACHE = PRECACHE ? `${CACHE_PREFIX}shell-${PRECACHE.version}` : null;
+const DATA_CACHE = `${CACHE_PREFIX}data`;
+
+// Install event: cache the app shell for this asset version
 self.addEventListener('install', event => {
+  if (!PRECACHE) {
+    self.skipWaiting();
+    return;
+  }
   event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then(cache => {
-        console.log('Opened cache');
-        return cache.addAll(urlsToCache);
-      })
+    caches.open(SHELL_CACHE)
+      .then(cache => cache.addAll(PRECACHE.urls))
+      .then(() => self.skipWaiting())
   );
 });
 
-// Fetch event
-self.addEventListener('fetch', event => {
-  event.respondWith(
-    caches.match(event.request)
-      .then(response => {
-        // Return cached version or fetch from network
-        return response || fetch(event.request);
+// Activate event: drop shells from older versions (and the old v1 cache)
+self.addEventListener('activate', event => {
+  event.waitUntil(
+    caches.keys().then(cacheNames => Promise.all(
+      cacheNames
+        .filter(name => name.startsWith('krishi') && name !== SHELL_CACHE && name !== DATA_CACHE)
+        .map(name => caches.delete(name))
+    )).then(() => {
+      // Loaded without a manifest (e.g. the old /static/js/sw.js registration): retire it
+      if (!PRECACHE) {
+        return self.registration.unregister();
       }
-    )
+      return self.clients.claim();
+    })
   );
 });
 
-// Activate event
-self.addEventListener('activate', event => {
-  event.waitUntil(
-    caches.keys().then(cacheNames => {
-      return Promise.all(
-        cacheNames.map(cacheName => {
-          if (cacheName !== CACHE_NAME) {
-            return caches.delete(cacheName);
-          }
-        })
-      );
+// Fingerprinted files never change, so the cache is authoritative
+function cacheFirst(request) {
+  return caches.match(request).then(cached => cached || fetch(request));
+}
+
+function storeSnapshot(response) {
+  return caches.open(DATA_CACHE).then(cache => cache.put(PRECACHE.snapshot, response));
+}
+
+// Always ask the server; keep the last good dashboard JSON for offline use
+function snapshotNetworkFirst(request) {
+  return fetch(request)
+    .then(response => {
+      if (response.ok) {
+        storeSnapshot(response.clone());
+      }
+      return response;
     })
-  );
-});
\ No newline at end of file
+    .catch(() => caches.open(DATA_CACHE)
+      .then(cache => cache.match(PRECACHE.snapshot))
+      .then(cached => cached || Response.error()));
+}
+
+// The dashboard page posts the data it was rendered from, so the snapshot is
+// kept fresh without asking the server to build the dashboard a second time
+self.addEventListener('message', event => {
+  const message = event.data || {};
+  if (!PRECACHE || message.type !== 'dashboard-snapshot' || !message.snapshot) {
+    return;
+  }
+  event.waitUntil(storeSnapshot(new Response(JSON.stringify(message.snapshot), {
+    headers: { 'Content-Type': 'application/json', 'Date': new Date().toUTCString() }
+  })));
+});
+
+// Pages are personalised: never cache them, fall back to the offline shell
+function navigationNetworkFirst(request) {
+  return fetch(request).catch(() => caches.match(PRECACHE.offline));
+}
+
+// Fetch event
+self.addEventListener('fetch', event => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (!PRECACHE || request.method !== 'GET' || url.origin !== self.location.origin) {
+    return;
+  }
+
+  if (url.pathname === '/logout') {
+    // The snapshot belongs to the farmer who is signing out
+    event.waitUntil(caches.delete(DATA_CACHE));
+    return;
+  }
+
+  if (request.mode === 'navigate') {
+    event.respondWith(navigationNetworkFirst(request));
+  } else if (url.pathname === PRECACHE.snapshot) {
+    event.respondWith(snapshotNetworkFirst(request));
+  } else if (url.pathname.startsWith('/static/')) {
+    event.respondWith(cacheFirst(request));
+  }
+});
@@ -1,4 +1,5 @@
 from config.database import supabase, supabase_admin
+from supabase_models.profile_cache import profile_cache
 from typing import Optional, Dict, List
 
 class Crop:
@@ -18,6 +19,7 @@ class Crop:
     @classmethod
     def create(cls, crop_data: Dict) -> 'Crop':
         result = supabase_admin.table('crops').insert(crop_data).execute()
+        profile_cache.invalidate(crop_data.get('farmer_id'))
         return cls(result.data[0]) if result.data else None
 
     @classmethod
@@ -27,8 +29,10 @@ class Crop:
 
     def update(self, update_data: Dict) -> bool:
         result = supabase_admin.table('crops').update(update_data).eq('id', self.id).execute()
+        profile_cache.invalidate(self.farmer_id)
         return bool(result.data)
 
     def delete(self) -> bool:
         result = supabase_admin.table('crops').delete().eq('id', self.id).execute()
+        profile_cache.invalidate(self.farmer_id)
         return bool(result.data)
\ No newline at end of file
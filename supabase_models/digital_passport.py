@@ -1,7 +1,13 @@
 from config.database import supabase, supabase_admin
-from typing import Optional, Dict, List
+from supabase_models.pagination import apply_keyset, split_page
+from supabase_models.profile_cache import ProfileCache
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
 import dateutil.parser
+import os
+
+# Verify scans hit the same few passports repeatedly; cache lookups by token id
+passport_cache = ProfileCache(ttl=int(os.getenv('PASSPORT_CACHE_TTL', 300)))
 
 class DigitalPassport:
     def __init__(self, data: Dict):
@@ -20,6 +26,11 @@ class DigitalPassport:
         else:
             self.created_at = created_at_str
         self.verified = data.get('verified', False)
+        self.transaction_hash = data.get('transaction_hash')
+        # pending / submitted while the mint queue works on it, then minted or failed
+        self.mint_status = data.get('mint_status') or 'minted'
+        # Inclusion proof when the passport was anchored as part of a batch
+        self.merkle_proof = data.get('merkle_proof')
 
     @classmethod
     def create(cls, passport_data: Dict) -> 'DigitalPassport':
@@ -54,10 +65,61 @@ class DigitalPassport:
             print(f"DEBUG: Supabase query error: {e}")
             return []
 
+    @classmethod
+    def get_page_by_farmer_id(cls, farmer_id: str, limit: int = 12, cursor: Optional[str] = None) -> Tuple[List['DigitalPassport'], Optional[str]]:
+        """Newest-first page of a farmer's passports plus the cursor for the next page"""
+        try:
+            query = supabase.table('digital_passports').select('*').eq('farmer_id', farmer_id)
+            result = apply_keyset(query, cursor, limit).execute()
+            rows, next_cursor = split_page(result.data, limit)
+            return [cls(passport) for passport in rows], next_cursor
+        except Exception as e:
+            print(f"DEBUG: Supabase query error: {e}")
+            return [], None
+
+    @classmethod
+    def count_by_farmer_id(cls, farmer_id: str) -> Optional[int]:
+        """Number of passports a farmer has, without fetching them"""
+        try:
+            result = supabase.table('digital_passports').select('id', count='exact').eq('farmer_id', farmer_id).limit(1).execute()
+            return result.count
+        except Exception as e:
+            print(f"DEBUG: Supabase count error: {e}")
+            return None
+
     @classmethod
     def get_by_token_id(cls, token_id: str) -> Optional['DigitalPassport']:
         try:
             result = supabase.table('digital_passports').select('*').eq('nft_token_id', token_id).execute()
             return cls(result.data[0]) if result.data else None
         except:
-            return None
\ No newline at end of file
+            return None
+
+    @classmethod
+    def get_cached_by_token_id(cls, token_id: str) -> Optional['DigitalPassport']:
+        """get_by_token_id through the process-level passport cache"""
+        return passport_cache.get(token_id, cls.get_by_token_id)
+
+    @classmethod
+    def get_by_token_ids(cls, token_ids: List[str]) -> List['DigitalPassport']:
+        """Passports for many token ids in one query (order of the input is not kept)"""
+        if not token_ids:
+            return []
+        try:
+            result = supabase.table('digital_passports').select('*').in_('nft_token_id', list(token_ids)).execute()
+            return [cls(passport) for passport in result.data] if result.data else []
+        except Exception as e:
+            print(f"DEBUG: Supabase query error: {e}")
+            return []
+
+    @classmethod
+    def update_by_token_id(cls, token_id: str, fields: Dict) -> bool:
+        try:
+            result = supabase_admin.table('digital_passports').update(fields).eq('nft_token_id', token_id).execute()
+            return bool(result.data)
+        except Exception as e:
+            print(f"DEBUG: Supabase update error: {e}")
+            return False
+        finally:
+            # After the write, so a lookup racing the update cannot re-cache the old row
+            passport_cache.invalidate(token_id)
@@ -1,4 +1,5 @@
 from config.database import supabase, supabase_admin
+from supabase_models.profile_cache import profile_cache
 from typing import Optional, Dict, List
 
 class Farmer:
@@ -15,6 +16,8 @@ class Farmer:
         self.farm_size_acres = data.get('farm_size_acres')
         self.farming_experience_years = data.get('farming_experience_years')
         self.preferred_language = data.get('preferred_language', 'en')
+        # Populated when loaded with an embedded crops select
+        self._crops = data.get('crops')
 
     @classmethod
     def create(cls, farmer_data: Dict) -> 'Farmer':
@@ -50,10 +53,27 @@ class Farmer:
         result = supabase.table('farmers').select('*').eq('id', farmer_id).execute()
         return cls(result.data[0]) if result.data else None
 
+    @classmethod
+    def get_profile(cls, farmer_id: str) -> Optional['Farmer']:
+        """Farmer with crops preloaded, served from the process profile cache"""
+        return profile_cache.get(farmer_id, cls._load_profile)
+
+    @classmethod
+    def _load_profile(cls, farmer_id: str) -> Optional['Farmer']:
+        result = supabase.table('farmers').select('*, crops(*)').eq('id', farmer_id).execute()
+        return cls(result.data[0]) if result.data else None
+
     def update(self, update_data: Dict) -> bool:
         result = supabase_admin.table('farmers').update(update_data).eq('id', self.id).execute()
+        profile_cache.invalidate(self.id)
         return bool(result.data)
 
+    def update_language(self, language: str) -> bool:
+        self.preferred_language = language
+        return self.update({'preferred_language': language})
+
     def get_crops(self) -> List[Dict]:
+        if self._crops is not None:
+            return list(self._crops)
         result = supabase.table('crops').select('*').eq('farmer_id', self.id).execute()
         return result.data or []
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Keyset (cursor) pagination helpers for Supabase queries.
+
+Listings are ordered newest first on (created_at, id). A cursor is the
+opaque encoding of the last row's (created_at, id), and the next page is
+fetched with a range filter on those columns instead of an OFFSET, so
+deep pages cost the same as the first one and concurrent inserts do not
+shift rows between pages.
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([str(row['created_at']), str(row['id'])]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Return (created_at, id) or None for a missing/malformed cursor
+
+    Cursors come back from clients and end up inside a PostgREST filter, so
+    both values are parsed and re-serialized rather than passed through.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at).isoformat(), str(uuid.UUID(row_id))
+    except Exception:
+        return None
+
+
+def apply_keyset(query, cursor: Optional[str], limit: int):
+    """Order newest first and seek past the cursor; fetches one extra row to detect a next page"""
+    after = decode_cursor(cursor)
+    if after:
+        created_at, row_id = after
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})'
+        )
+    return query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """Trim the look-ahead row and build the next cursor"""
+    rows = rows or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
@@ -0,0 +1,57 @@
+"""
+Process-level cache of farmer profiles.
+
+Stores each Farmer together with its crops (loaded with one embedded
+select) keyed by farmer id. Model write paths call invalidate() so the
+next read goes back to Supabase. The TTL only bounds staleness from
+writes made by other worker processes.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+PROFILE_TTL = int(os.getenv('PROFILE_CACHE_TTL', 300))
+
+
+class ProfileCache:
+    def __init__(self, ttl: int = PROFILE_TTL, max_entries: int = 2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, farmer_id: str, loader: Callable[[str], Optional[object]]):
+        key = str(farmer_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Load outside the lock so a slow query does not block other users
+        farmer = loader(key)
+        if farmer is not None:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                    del self._entries[oldest]
+                self._entries[key] = (time.time(), farmer)
+        return farmer
+
+    def invalidate(self, farmer_id: Optional[str]):
+        if farmer_id is None:
+            return
+        with self._lock:
+            self._entries.pop(str(farmer_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+profile_cache = ProfileCache()
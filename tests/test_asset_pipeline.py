@@ -0,0 +1,43 @@
+import re
+
+import asset_pipeline
+
+IMPORT_URL = re.compile(r"@import\s+url\((['\"])(.*?)\1\)")
+
+
+def _source_import_urls(relative_path):
+    return [url for _, url in IMPORT_URL.findall(asset_pipeline._read(relative_path))]
+
+
+def test_css_bundle_keeps_every_import_url_intact():
+    members = asset_pipeline.BUNDLES['base.css']
+    bundle = asset_pipeline._bundle_css([asset_pipeline.minify_css(asset_pipeline._read(m)) for m in members])
+
+    expected = list(dict.fromkeys(url for member in members for url in _source_import_urls(member)))
+    assert expected, 'base.css members should import the web fonts'
+
+    imports = re.match(r'(?:@import[^;]*?url\((["\']).*?\1\)[^;]*;)*', bundle).group(0)
+    assert [url for _, url in IMPORT_URL.findall(imports)] == expected
+    # Nothing from a split URL is left behind in the rules
+    assert 'display=swap' not in bundle[len(imports):]
+    assert '--primary-green' in bundle
+
+
+def test_import_with_semicolons_in_url_is_one_rule():
+    css = "@import url('https://fonts.example/css2?f=A:wght@300;400&display=swap');body{color:red}"
+    assert asset_pipeline._bundle_css([css]) == css
+
+
+def test_minify_js_keeps_template_literal_whitespace():
+    source = (
+        "function card(title) {\n"
+        "    return `\n"
+        "        <div>\n"
+        "\n"
+        "            ${title}\n"
+        "        </div>`;\n"
+        "}\n"
+    )
+    minified = asset_pipeline.minify_js(source)
+    assert "`\n        <div>\n\n            ${title}\n        </div>`" in minified
+    assert minified.startswith('function card(title) {\nreturn `')
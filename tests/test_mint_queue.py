@@ -0,0 +1,123 @@
+import hashlib
+import time
+
+from services.blockchain.mint_queue import MintQueue
+
+
+class FakeChain:
+    """Mines every broadcast transaction immediately"""
+
+    def __init__(self, lost_replies=0):
+        # Sends the node accepts but whose reply never arrives (e.g. a read timeout)
+        self.lost_replies = lost_replies
+        self.next_nonce = 0
+        self.mined = {}
+        self.released = []
+
+    def sign_mint(self, payload):
+        nonce = self.next_nonce
+        self.next_nonce += 1
+        tx_hash = '0x' + hashlib.sha256(f"{nonce}:{payload['ipfs_hash']}".encode()).hexdigest()
+        return {'tx_hash': tx_hash, 'nonce': nonce}
+
+    def send_signed(self, signed):
+        if signed['tx_hash'] in self.mined:
+            raise ValueError('already known')
+        self.mined[signed['tx_hash']] = signed['nonce']
+        if self.lost_replies:
+            self.lost_replies -= 1
+            raise TimeoutError('read timed out')
+        return signed['tx_hash']
+
+    def release_signed(self, signed, error):
+        self.released.append(signed['nonce'])
+
+    def get_receipts(self, tx_hashes):
+        return {tx_hash: {'status': 1, 'block_number': 1} if tx_hash in self.mined else None for tx_hash in tx_hashes}
+
+
+def _payload(i):
+    return {'crop_type': 'Rice', 'season': 'Kharif', 'ipfs_hash': f"Qm{i:044d}"}
+
+
+def _queue(path, chain, **kwargs):
+    queue = MintQueue(path=path, chain=chain, on_update=None, **kwargs)
+    queue.start = lambda: None  # driven by hand
+    return queue
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_persisted_jobs_resume_after_restart(tmp_path):
+    path = str(tmp_path / 'mint.sqlite3')
+    chain = FakeChain()
+
+    # The first process records jobs and goes away before its worker runs
+    before = _queue(path, chain)
+    for i in range(3):
+        before.enqueue(f"KS-{i}", _payload(i))
+    # ...one of them had already been sent
+    signed = chain.sign_mint(_payload(0))
+    conn = before._connect()
+    before._set(conn, 'KS-0', status='submitted', tx_hash=chain.send_signed(signed), submitted_at=time.time())
+    conn.close()
+
+    # A fresh worker starts its thread (as gunicorn's post_fork does) with nothing new enqueued
+    after = MintQueue(path=path, chain=chain, on_update=None, poll_interval=0.05)
+    after.start()
+
+    assert _wait_for(lambda: after.counts() == {'confirmed': 3})
+    assert len(chain.mined) == 3
+
+
+def test_send_timeout_is_retried_with_the_same_transaction(tmp_path):
+    chain = FakeChain(lost_replies=1)
+    queue = _queue(str(tmp_path / 'mint.sqlite3'), chain)
+    queue.enqueue('KS-1', _payload(1))
+
+    queue.run_once()  # accepted by the node, but the send raised
+    assert queue.get('KS-1')['status'] == 'pending'
+    queue.run_once()  # resent: 'already known', then confirmed
+
+    job = queue.get('KS-1')
+    assert job['status'] == 'confirmed'
+    assert list(chain.mined) == [job['tx_hash']]
+    assert chain.next_nonce == 1 and chain.released == []
+
+
+def test_signed_transaction_is_stored_before_broadcast(tmp_path):
+    chain = FakeChain()
+    queue = _queue(str(tmp_path / 'mint.sqlite3'), chain)
+    queue.enqueue('KS-1', _payload(1))
+
+    seen = {}
+    send = chain.send_signed
+
+    def inspect_then_send(signed):
+        seen.update(queue.get('KS-1'))
+        return send(signed)
+
+    chain.send_signed = inspect_then_send
+    queue.run_once()
+    assert seen['signed_tx']['tx_hash'] == seen['tx_hash'] == queue.get('KS-1')['tx_hash']
+
+
+def test_single_mode_jobs_still_send_in_batch_mode(tmp_path):
+    chain = FakeChain()
+    path = str(tmp_path / 'mint.sqlite3')
+    # Queued while MINT_MODE was single, then the workers restart in batch mode
+    _queue(path, chain).enqueue('KS-1', _payload(1))
+    queue = _queue(path, chain, mode='batch', batch_window=0)
+    queue.enqueue('KS-2', {'crop_type': 'Rice'})  # unreadable by sign_mint
+
+    for _ in range(queue.max_attempts):
+        queue.run_once()
+
+    assert queue.get('KS-1')['status'] == 'confirmed'
+    assert queue.get('KS-2')['status'] == 'failed'
+    assert queue.counts() == {'confirmed': 1, 'failed': 1}
@@ -0,0 +1,52 @@
+import base64
+import json
+
+from supabase_models.pagination import apply_keyset, decode_cursor, encode_cursor, split_page
+
+ROW = {'created_at': '2024-05-01T10:15:30.123456+00:00', 'id': '3f2b8c1e-8d4a-4c2e-9a57-1b6f0d9e2c41'}
+
+
+def _raw_cursor(created_at, row_id):
+    raw = json.dumps([created_at, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+class RecordingQuery:
+    def __init__(self):
+        self.filters = []
+
+    def or_(self, expression):
+        self.filters.append(expression)
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return self
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(ROW)) == (ROW['created_at'], ROW['id'])
+
+
+def test_split_page_builds_cursor_from_last_kept_row():
+    rows = [dict(ROW, id=f"00000000-0000-0000-0000-00000000000{i}") for i in range(3)]
+    page, cursor = split_page(rows, 2)
+    assert len(page) == 2
+    assert decode_cursor(cursor)[1] == rows[1]['id']
+
+
+def test_malicious_cursor_is_rejected():
+    injected = [
+        _raw_cursor('2024-05-01T10:15:30+00:00', 'x),farmer_id.neq.null,and(id.lt.z'),
+        _raw_cursor('2024-05-01",farmer_id.neq."x', ROW['id']),
+        _raw_cursor(123, ROW['id']),
+        'not-base64!!',
+    ]
+    for cursor in injected:
+        assert decode_cursor(cursor) is None
+
+        query = RecordingQuery()
+        apply_keyset(query, cursor, 10)
+        assert query.filters == []